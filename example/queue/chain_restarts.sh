@@ -0,0 +1,53 @@
+#!/bin/bash
+
+# predict the number of jobs still needed by a run in progress and submit them as a dependency chain
+#
+# usage: sh chain_restarts.sh JOB_SCRIPT [ARCHIVED_RUN_DIR ...]
+#
+# the job script must restart from the last snapshot (see auto_restart.sh), and OUTPUT_WALLTIME should be
+# set so that a snapshot is dumped shortly before the wall-time limit of each job
+
+
+JOB_WALLTIME=24         # wall-time limit of each job in hours
+JOB_OVERHEAD=1800       # wall time lost by each job in seconds (startup, restart, and work since the last snapshot)
+PREDICT=../../tool/analysis/gamer_predict_walltime.py   # path to the prediction tool
+SUBMIT=1                # 0/1 <==> only print the prediction/also submit the jobs
+
+
+JOB_SCRIPT=$1
+shift
+if [ -z "$JOB_SCRIPT" ]; then
+   printf "usage: sh %s JOB_SCRIPT [ARCHIVED_RUN_DIR ...]\n" $0
+   exit 1
+fi
+
+ARCHIVE=""
+if [ $# -gt 0 ]; then ARCHIVE="-a $*"; fi
+
+
+# set GAMER_REMAIN_WALLTIME, GAMER_REMAIN_STEP, GAMER_NJOB, and GAMER_NRESTART
+PREDICTION=$(python $PREDICT -i ./ $ARCHIVE -w $JOB_WALLTIME --overhead $JOB_OVERHEAD --shell) || exit 2
+eval "$PREDICTION"
+
+printf "remaining wall time %d s, %d steps --> %d job(s) of %s hours\n" \
+       $GAMER_REMAIN_WALLTIME $GAMER_REMAIN_STEP $GAMER_NJOB $JOB_WALLTIME
+
+if [ ${SUBMIT} -eq 0 ]; then exit 0; fi
+
+
+# submit each job after the previous one ends (with either SLURM or PBS)
+JOB_ID=""
+t=0
+while [ $t -lt ${GAMER_NJOB} ]; do
+   if command -v sbatch > /dev/null; then
+      if [ -z "$JOB_ID" ]; then JOB_ID=$(sbatch --parsable $JOB_SCRIPT)
+      else                      JOB_ID=$(sbatch --parsable --dependency=afterany:$JOB_ID $JOB_SCRIPT)
+      fi
+   else
+      if [ -z "$JOB_ID" ]; then JOB_ID=$(qsub $JOB_SCRIPT)
+      else                      JOB_ID=$(qsub -W depend=afterany:$JOB_ID $JOB_SCRIPT)
+      fi
+   fi
+   t=$((t+1))
+   printf "   submitted job %d/%d : %s\n" $t $GAMER_NJOB $JOB_ID
+done
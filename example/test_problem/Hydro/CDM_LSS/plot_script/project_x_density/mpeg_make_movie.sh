@@ -1,2 +1,4 @@
+# NOTE: tool/analysis/gamer_make_movie.py renders slices/projections of the snapshots in parallel and pipes
+#       the frames directly to ffmpeg without writing intermediate PNG files
 ffmpeg -framerate 5/1 -i Data_%06d_Particle_x_particle_mass.png -c:v libx264 -preset slow -tune animation \
        -pix_fmt yuv420p -s 1920x1200 CDM_projected_x_particle_density.mp4
\ No newline at end of file
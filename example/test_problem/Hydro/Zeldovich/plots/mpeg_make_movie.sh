@@ -1,2 +1,4 @@
+# NOTE: tool/analysis/gamer_make_movie.py renders slices/projections of the snapshots in parallel and pipes
+#       the frames directly to ffmpeg without writing intermediate PNG files
 ffmpeg -framerate 5/1 -i Combine_Data_%06d.png -c:v libx264 -preset slow -tune animation \
        -pix_fmt yuv420p -s 1502x852 Zeldovich_Collapse_Analysis.mp4
\ No newline at end of file
@@ -7,6 +7,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 # ref: https://yt-project.org/doc/examining/low_level_inspection.html#examining-grid-data-in-a-fixed-resolution-array
+# NOTE: tool/analysis/gamer_power_spectrum.py computes the same spectra without yt and transforms grids larger
+#       than the memory out of core. It also supports cross spectra and CIC particle spectra.
 
 
 # load the command-line parameters
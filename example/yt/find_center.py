@@ -2,6 +2,9 @@ import argparse
 import sys
 import yt
 
+# NOTE: tool/analysis/gamer_find_center.py computes the same quantities without yt in a single pass over
+#       each snapshot, processes multiple snapshots in parallel, and outputs them in the Record__Center format
+
 # load the command-line parameters
 parser = argparse.ArgumentParser( description='Output the center' )
 
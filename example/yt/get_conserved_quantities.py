@@ -2,6 +2,9 @@ import argparse
 import sys
 import yt
 
+# NOTE: tool/analysis/gamer_get_conserved_quantities.py computes the same quantities without yt
+#       in a single pass over each snapshot and processes multiple snapshots in parallel
+
 # load the command-line parameters
 parser = argparse.ArgumentParser( description='Output the conserved quantities' )
 
@@ -30,6 +33,12 @@ prefix      = args.prefix
 
 
 # define new fields
+def _elbdm_eta(ds):
+    # computed once per dataset instead of in every field function
+    if not hasattr( ds, '_gamer_elbdm_eta' ):
+        ds._gamer_elbdm_eta = ds.parameters['ELBDM_Mass']*ds.units.code_mass/(ds.parameters['ELBDM_PlanckConst']*ds.units.code_length**2*ds.units.code_mass/ds.units.code_time)
+    return ds._gamer_elbdm_eta
+
 def _kinetic_energy(field, data):
     return data['kinetic_energy_density']*data['cell_volume']
 
@@ -43,15 +52,15 @@ def _total_energy(field, data):
     return data['total_energy_density']*data['cell_volume'] + data['potential_energy']
 
 def _elbdm_momentum_x(field, data):
-    ELBDM_ETA = data.ds.parameters['ELBDM_Mass']*data.ds.units.code_mass/(data.ds.parameters['ELBDM_PlanckConst']*data.ds.units.code_length**2*data.ds.units.code_mass/data.ds.units.code_time)
+    ELBDM_ETA = _elbdm_eta( data.ds )
     return (data["Real"]*data["Imag_gradient_x"] - data["Imag"]*data["Real_gradient_x"])/ELBDM_ETA*data['cell_volume']
 
 def _elbdm_momentum_y(field, data):
-    ELBDM_ETA = data.ds.parameters['ELBDM_Mass']*data.ds.units.code_mass/(data.ds.parameters['ELBDM_PlanckConst']*data.ds.units.code_length**2*data.ds.units.code_mass/data.ds.units.code_time)
+    ELBDM_ETA = _elbdm_eta( data.ds )
     return (data["Real"]*data["Imag_gradient_y"] - data["Imag"]*data["Real_gradient_y"])/ELBDM_ETA*data['cell_volume']
 
 def _elbdm_momentum_z(field, data):
-    ELBDM_ETA = data.ds.parameters['ELBDM_Mass']*data.ds.units.code_mass/(data.ds.parameters['ELBDM_PlanckConst']*data.ds.units.code_length**2*data.ds.units.code_mass/data.ds.units.code_time)
+    ELBDM_ETA = _elbdm_eta( data.ds )
     return (data["Real"]*data["Imag_gradient_z"] - data["Imag"]*data["Real_gradient_z"])/ELBDM_ETA*data['cell_volume']
 
 def _elbdm_angular_momentum_x(field, data):
@@ -64,7 +73,7 @@ def _elbdm_angular_momentum_z(field, data):
     return (data['x']-data.ds.domain_center[0])*data['elbdm_momentum_y'] - (data['y']-data.ds.domain_center[1])*data['elbdm_momentum_x']
 
 def _elbdm_kinetic_energy(field, data):
-    ELBDM_ETA = data.ds.parameters['ELBDM_Mass']*data.ds.units.code_mass/(data.ds.parameters['ELBDM_PlanckConst']*data.ds.units.code_length**2*data.ds.units.code_mass/data.ds.units.code_time)
+    ELBDM_ETA = _elbdm_eta( data.ds )
     return 0.5*(data["Real_gradient_magnitude"]**2 + data["Imag_gradient_magnitude"]**2)/ELBDM_ETA**2*data['cell_volume']
 
 def _elbdm_total_energy(field, data):
@@ -0,0 +1,50 @@
+import argparse
+import sys
+from gamer_io import Catalog
+
+
+def main():
+   # load the command-line parameters
+   parser = argparse.ArgumentParser( description='Build or update the metadata catalog of all GAMER snapshots in a run directory' )
+
+   parser.add_argument( '-i', action='store', required=False, type=str, dest='run_dir',
+                        help='run directory [%(default)s]', default='./' )
+   parser.add_argument( '-n', action='store', required=False, type=int, dest='nproc',
+                        help='number of processes [%(default)d]', default=1 )
+   parser.add_argument( '-o', action='store', required=False, type=str, dest='filename_out',
+                        help='also output the catalog as a text table [none]', default=None )
+   parser.add_argument( '-q', '--quiet', action='store_true', dest='quiet',
+                        help='do not print the catalog [False]' )
+
+   args=parser.parse_args()
+
+   # take note
+   if not args.quiet:
+      print( '\nCommand-line arguments:' )
+      print( '-------------------------------------------------------------------' )
+      print( ' '.join(map(str, sys.argv)) )
+      print( '-------------------------------------------------------------------\n' )
+
+
+   cat = Catalog.update( args.run_dir, nproc=args.nproc )
+
+   header = '#%11s  %13s  %13s  %13s  %13s  %6s  %13s'%('DumpID', 'Step', 'Time', 'Redshift', 'Par_NPar', 'NLevel', 'FileSize')
+   nlevel = cat.entries.dtype['NPatch'].shape[0] if len(cat) > 0 else 0
+   header += ''.join( '  %10s'%('NPatch_Lv%02d'%lv) for lv in range(nlevel) )
+   lines  = [ ' %11d  %13d  %13.7e  %13.7e  %13d  %6d  %13d'%(e['DumpID'], e['Step'], e['Time'], e['Redshift'], e['Par_NPar'],
+                                                              e['NLevel'], e['FileSize'])
+              + ''.join( '  %10d'%n for n in e['NPatch'] ) for e in cat.entries ]
+
+   if not args.quiet:
+      print( header )
+      for line in lines: print( line )
+
+   if args.filename_out is not None:
+      with open( args.filename_out, 'w' ) as f:
+         f.write( header+'\n' )
+         for line in lines: f.write( line+'\n' )
+
+
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,111 @@
+import argparse
+import sys
+from gamer_io.compare import align, load_metrics, speedup
+
+
+# load the command-line parameters
+parser = argparse.ArgumentParser( description='Compare the performance of two or more runs (A/B experiments) from Record__Performance '
+                                              'and Record__Timing: align the runs by step or physical time and report the '
+                                              'speedups over the baseline per phase and per level with bootstrap confidence '
+                                              'intervals.' )
+
+parser.add_argument( '-i', action='store', required=True, type=str, dest='paths', nargs='+',
+                     help='directories of the runs, where the first one is the baseline' )
+parser.add_argument( '-l', action='store', required=False, type=str, dest='labels', nargs='+',
+                     help='labels of the runs [A, B, C, ...]', default=None )
+parser.add_argument( '-a', action='store', required=False, type=str, dest='by', choices=['Step', 'Time'],
+                     help='align the runs by step (cost per step) or by physical time (time to solution) [%(default)s]',
+                     default='Step' )
+parser.add_argument( '-n', action='store', required=False, type=int, dest='nbin',
+                     help='number of bins of the common range resampled by the bootstrap [%(default)d]', default=50 )
+parser.add_argument( '-b', action='store', required=False, type=int, dest='nboot',
+                     help='number of bootstrap samples [%(default)d]', default=2000 )
+parser.add_argument( '-c', action='store', required=False, type=float, dest='confidence',
+                     help='confidence level of the intervals in percent [%(default)g]', default=95.0 )
+parser.add_argument( '-d', action='store', required=False, type=int, dest='depth',
+                     help='maximum depth of the timers of Record__Timing, e.g., 3 for Integration/Lv 1/Flu_Adv '
+                          '[%(default)d]', default=3 )
+parser.add_argument( '-m', action='store', required=False, type=float, dest='min_percent',
+                     help='omit the timers below this percentage of the total wall time of the baseline [%(default)g]',
+                     default=1.0 )
+parser.add_argument( '--stat', action='store', required=False, type=str, dest='stat', choices=['Max', 'Min', 'Ave'],
+                     help='statistic over ranks with OPT__TIMING_BALANCE [Max]', default=None )
+parser.add_argument( '--seed', action='store', required=False, type=int, dest='seed',
+                     help='random seed of the bootstrap [%(default)d]', default=0 )
+parser.add_argument( '-o', action='store', required=False, type=str, dest='filename_out',
+                     help='output table of all metrics [none]', default=None )
+parser.add_argument( '--cache', action='store_true', dest='cache',
+                     help='resume from and update the sidecar caches of the log parsers [False]' )
+
+args=parser.parse_args()
+
+# take note
+print( '\nCommand-line arguments:' )
+print( '-------------------------------------------------------------------' )
+print( ' '.join(map(str, sys.argv)) )
+print( '-------------------------------------------------------------------\n' )
+
+
+if len( args.paths ) < 2:   raise SystemExit( 'ERROR : at least two runs are required !!' )
+labels = args.labels if args.labels is not None else [ chr(ord('A')+r) for r in range(len(args.paths)) ]
+if len( labels ) != len( args.paths ):   raise SystemExit( 'ERROR : %d labels for %d runs !!'%(len(labels), len(args.paths)) )
+
+
+# load and align the runs
+runs = [ load_metrics( path, args.depth, args.stat, args.cache ) for path in args.paths ]
+print( 'Runs (%s is the baseline):'%labels[0] )
+for label, path, run in zip( labels, args.paths, runs ):
+   print( '   %-8s %-30s : %7d steps, step %d -> %d, time %13.7e -> %13.7e%s'%
+          ( label, path, run['Step'].size, run['Step'][0], run['Step'][-1], run['Time'][0], run['Time'][-1],
+            '' if len( run['Wall'] ) > 1 else ' (no Record__Timing)' ) )
+
+aligned = align( runs, args.by, args.nbin )
+rows    = speedup( aligned, 0, args.nboot, 0.01*args.confidence, args.seed )
+nbin    = aligned['Wall']['Total'].shape[1]
+if args.by == 'Step':
+   print( '\nAligned by step : %d common steps from %d to %d in %d bins'%( aligned['NStep'][0], *aligned['Range'], nbin ) )
+else:
+   print( '\nAligned by time : %13.7e -> %13.7e in %d bins, steps %s'%
+          ( *aligned['Range'], nbin, ', '.join( '%s %d'%(l, n) for l, n in zip(labels, aligned['NStep']) ) ) )
+if nbin < 10:   print( 'WARNING : only %d bins --> the confidence intervals are unreliable !!'%nbin )
+
+
+# compact report: wall time (or throughput) of each run and the speedup over the baseline
+table  = {}
+for row in rows:   table.setdefault( row['Metric'], {} )[ row['Run'] ] = row
+total  = table['Total'][1]['Base']
+header = '%-34s  %11s'%( 'Metric', labels[0] ) + ''.join( '  %11s  %-27s'%( l, 'speedup %g%% CI'%args.confidence ) for l in labels[1:] )
+
+def show( metric ):
+   entry = table[metric]
+   line  = '%-34s  %11.4e'%( metric, entry[1]['Base'] )
+   for r in range( 1, len(runs) ):
+      e     = entry[r]
+      line += '  %11.4e  %7.3f [%7.3f, %7.3f]%s'%( e['Value'], e['Speedup'], e['Low'], e['High'], ' *' if e['Significant'] else '  ' )
+   print( line )
+
+sections = ( ( 'Overall (wall time [s] or throughput)', lambda m: m == 'Total'  or  m in ( 'Cell updates/s', 'Particle updates/s' ) ),
+             ( 'Phases (wall time [s])',                lambda m: m != 'Total'  and  table[m][1]['Kind'] == 'time'  and  'Lv ' not in m ),
+             ( 'Levels (wall time [s])',                lambda m: 'Lv ' in m ) )
+for title, match in sections:
+   metrics = [ m for m in table if match( m ) ]
+   if title.startswith( 'Overall' ):
+      print( '\n' + header + '\n' + '-'*len(header) )
+   else:
+      thres   = 0.01*args.min_percent*total
+      metrics = [ m for m in metrics if any( e['Base'] >= thres  or  e['Value'] >= thres for e in table[m].values() ) ]
+   if not metrics:   continue
+   print( '%s%s'%( '' if title.startswith('Overall') else '\n', title ) )
+   for m in metrics:   show( m )
+print( '\n* : the confidence interval excludes one; speedup > 1 means faster than %s'%labels[0] )
+
+
+if args.filename_out is not None:
+   with open( args.filename_out, 'w' ) as f:
+      f.write( '#%-39s  %-8s  %-5s  %13s  %13s  %9s  %9s  %9s  %3s\n'%
+               ('Metric', 'Run', 'Kind', 'Base', 'Value', 'Speedup', 'Low', 'High', 'Sig') )
+      for row in rows:
+         f.write( ' %-39s  %-8s  %-5s  %13.6e  %13.6e  %9.4f  %9.4f  %9.4f  %3d\n'%
+                  ( row['Metric'].replace(' ', '_'), labels[row['Run']], row['Kind'], row['Base'], row['Value'],
+                    row['Speedup'], row['Low'], row['High'], row['Significant'] ) )
+   print( '\nOutput: %s'%args.filename_out )
@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from gamer_io.drift import DriftMonitor
+
+
+# load the command-line parameters
+parser = argparse.ArgumentParser( description='Monitor the drift of the conservation errors in Record__Conservation: rolling drift '
+                                              'rates, jumps correlated with refinement, and the comparison across runs. Only '
+                                              'the records appended since the last refresh are processed.' )
+
+parser.add_argument( '-i', action='store', required=False, type=str, dest='paths', nargs='+',
+                     help='directories of the runs (e.g., a parameter sweep) [%(default)s]', default=['./'] )
+parser.add_argument( '-q', action='store', required=False, type=str, dest='quantities', nargs='+',
+                     help='quantities to monitor, e.g., Mass_Gas Etot_All [all]', default=None )
+parser.add_argument( '-w', action='store', required=False, type=int, dest='window',
+                     help='number of records of the rolling drift rate and of the reference of jumps [%(default)d]',
+                     default=50 )
+parser.add_argument( '-s', action='store', required=False, type=float, dest='nsigma',
+                     help='threshold of jumps in robust standard deviations of the changes [%(default)g]', default=8.0 )
+parser.add_argument( '-r', action='store', required=False, type=float, dest='refine',
+                     help='percentage change of NCell in Record__Performance counted as a refinement event [%(default)g]',
+                     default=1.0 )
+parser.add_argument( '-t', action='store', required=False, type=float, dest='interval',
+                     help='keep monitoring the live logs with this refresh interval in seconds [none]', default=None )
+parser.add_argument( '-k', action='store', required=False, type=int, dest='njump_show',
+                     help='number of the largest jumps listed per run [%(default)d]', default=20 )
+parser.add_argument( '-o', action='store', required=False, type=str, dest='prefix_out',
+                     help='prefix of the output tables [%(default)s]', default='Drift' )
+parser.add_argument( '--cache', action='store_true', dest='cache',
+                     help='resume from and update the sidecar caches of the log parsers [False]' )
+
+args=parser.parse_args()
+
+# take note
+print( '\nCommand-line arguments:' )
+print( '-------------------------------------------------------------------' )
+print( ' '.join(map(str, sys.argv)) )
+print( '-------------------------------------------------------------------\n' )
+
+
+def show_jump( path, j ):
+   print( '%-20s  %-10s  step %8d  time %13.7e  jump %+13.6e  (%7.1f sigma)%s%s'%
+          ( path, j['Quantity'], j['Step'], j['Time'], j['Jump'], j['Sigma'],
+            '  against drift' if j['Against'] else '', '  at refinement' if j['Refine'] else '' ) )
+
+monitors = [ DriftMonitor( path, args.quantities, args.window, args.nsigma, 0.01*args.refine, args.cache ) for path in args.paths ]
+for path, mon in zip( args.paths, monitors ):
+   mon.refresh()
+   if not os.path.isfile( os.path.join(path, 'Record__Conservation') ):   print( 'WARNING : %s/Record__Conservation is not found !!'%path )
+
+
+# live monitoring: report the new jumps only
+if args.interval is not None:
+   print( 'Monitoring %d run(s) every %g s (Ctrl-C to stop and summarize) ...'%(len(monitors), args.interval), flush=True )
+   try:
+      while True:
+         time.sleep( args.interval )
+         for path, mon in zip( args.paths, monitors ):
+            for j in mon.refresh(): show_jump( path, j )
+         sys.stdout.flush()
+   except KeyboardInterrupt:
+      print( '' )
+
+
+# summary of each run
+summaries = [ mon.summary() for mon in monitors ]
+with open( '%s_Summary.txt'%args.prefix_out, 'w' ) as f:
+   f.write( '#%-19s  %-10s  %-15s  %13s  %13s  %13s  %13s  %6s  %8s  %7s  %8s\n'%
+            ('Run', 'Quantity', 'Column', 'Latest', 'MaxAbs', 'Rate', 'RollingRate', 'NJump', 'NAgainst', 'NRefine', 'Expected') )
+   for path, mon, summ in zip( args.paths, monitors, summaries ):
+      print( '\n%s : %d records, %.1f%% with refinement events'%
+             ( path, mon.nrow, 100.0*mon.nrefine/mon.nchecked if mon.nchecked > 0 else 0.0 ) )
+      print( '%-10s  %-15s  %13s  %13s  %13s  %13s  %6s  %8s  %14s'%
+             ('Quantity', 'Column', 'Latest', 'MaxAbs', 'Rate', 'RollingRate', 'NJump', 'NAgainst', 'NRefine(exp.)') )
+      for q, s in summ.items():
+         line = '%-15s  %13.6e  %13.6e  %13.6e  %13.6e  %6d  %8d'%( s['Column'], s['Latest'], s['MaxAbs'], s['Rate'],
+                                                                s['RollingRate'], s['NJump'], s['NAgainst'] )
+         print( '%-10s  %s  %6d(%6.1f)'%( q, line, s['NRefine'], s['Expected'] ) )
+         f.write( ' %-19s  %-10s  %s  %7d  %8.2f\n'%( path, q, line, s['NRefine'], s['Expected'] ) )
+
+      jumps = sorted( mon.jumps, key=lambda j: -j['Sigma'] if np.isfinite(j['Sigma']) else -np.inf )
+      if jumps:
+         print( 'Largest jumps:' )
+         for j in jumps[ :args.njump_show ]: show_jump( path, j )
+
+with open( '%s_Jump.txt'%args.prefix_out, 'w' ) as f:
+   f.write( '#%-19s  %-10s  %13s  %13s  %13s  %13s  %7s  %6s\n'%('Run', 'Quantity', 'Step', 'Time', 'Jump', 'Sigma', 'Against', 'Refine') )
+   for path, mon in zip( args.paths, monitors ):
+      for j in mon.jumps:
+         f.write( ' %-19s  %-10s  %13d  %13.7e  %13.6e  %13.6e  %7d  %6d\n'%
+                  ( path, j['Quantity'], j['Step'], j['Time'], j['Jump'], j['Sigma'], j['Against'], j['Refine'] ) )
+
+
+# comparison across runs
+if len( monitors ) > 1:
+   quantities = [ q for q in summaries[0] if all( q in s for s in summaries[1:] ) ]
+   print( '\nOverall drift rate relative to the median over the runs' )
+   print( '%-10s  %13s  %s'%( 'Quantity', 'Median rate', '  '.join( '%12s'%os.path.basename(os.path.normpath(p))[-12:] for p in args.paths ) ) )
+   for q in quantities:
+      rate = np.array( [ s[q]['Rate'] for s in summaries ] )
+      med  = np.nanmedian( np.abs(rate) ) if np.isfinite( rate ).any() else np.nan
+      print( '%-10s  %13.6e  %s'%( q, med, '  '.join( '%12.3g'%(r/med) if med > 0.0 else '%12s'%'-' for r in rate ) ) )
+
+print( '\nOutput: %s_Summary.txt, %s_Jump.txt'%((args.prefix_out,)*2) )
@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+import time
+from gamer_io.dashboard import Dashboard
+
+
+# load the command-line parameters
+parser = argparse.ArgumentParser( description='Live dashboard of the cell/particle updates per second, per-level number of updates, '
+                                              'step time, memory, and load imbalance of a running simulation. Only the records '
+                                              'appended to the logs since the last refresh are parsed.' )
+
+parser.add_argument( '-i', action='store', required=False, type=str, dest='path',
+                     help='directory of the simulation logs [%(default)s]', default='./' )
+parser.add_argument( '-t', action='store', required=False, type=float, dest='interval',
+                     help='refresh interval in seconds [%(default)g]', default=10.0 )
+parser.add_argument( '-n', action='store', required=False, type=int, dest='window',
+                     help='number of the latest records shown [%(default)d]', default=200 )
+parser.add_argument( '-r', action='store', required=False, type=int, dest='nrecent',
+                     help='number of the latest records compared with the rest of the window for the trend [%(default)d]',
+                     default=10 )
+parser.add_argument( '-a', action='store', required=False, type=float, dest='alert',
+                     help='flag unfavorable trends larger than this percentage [%(default)g]', default=20.0 )
+parser.add_argument( '-w', action='store', required=False, type=int, dest='width',
+                     help='width of the sparklines in characters [%(default)d]', default=40 )
+parser.add_argument( '-o', '--html', action='store', required=False, type=str, dest='filename_html',
+                     help='write a self-refreshing HTML page to this file instead of printing to the terminal [none]',
+                     default=None )
+parser.add_argument( '--once', action='store_true', dest='once',
+                     help='refresh only once and exit [False]' )
+parser.add_argument( '--cache', action='store_true', dest='cache',
+                     help='resume from and update the sidecar caches of the log parsers [False]' )
+
+args=parser.parse_args()
+
+# check
+assert args.interval > 0.0, '-t (%g) <= 0' % (args.interval)
+assert args.window   >= 2,  '-n (%d) < 2' % (args.window)
+assert 1 <= args.nrecent < args.window, '-r (%d) is not in [1,-n)' % (args.nrecent)
+
+
+dash = Dashboard( args.path, args.window, args.nrecent, 0.01*args.alert, args.cache )
+
+try:
+   while True:
+      t0 = time.time()
+      dash.refresh()
+
+      if args.filename_html is not None:
+         tmp = args.filename_html + '.tmp'
+         with open( tmp, 'w', encoding='utf-8' ) as f:
+            f.write( dash.html( refresh=None if args.once else max(1, int(args.interval)) ) )
+         os.replace( tmp, args.filename_html )
+         print( '%s : %s updated (%.3f s)'%(dash.stamp, args.filename_html, time.time()-t0), flush=True )
+      else:
+         if not args.once: sys.stdout.write( '\033[H\033[2J' )   # clear the terminal
+         print( dash.text( args.width ), flush=True )
+
+      if args.once: break
+      time.sleep( max( 0.0, args.interval-(time.time()-t0) ) )
+except KeyboardInterrupt:
+   pass
@@ -1,9 +1,10 @@
 from __future__ import print_function
 import argparse
 import sys
-import h5py
 import numpy as np
 import os.path
+from gamer_io import PatchIndex, Snapshot
+from gamer_io.particles import FORMATS, box_mask, extract_particles, level_gids, sphere_mask
 
 
 # load the command-line parameters
@@ -14,9 +15,26 @@ parser.add_argument( '-i', action='store', required=True, type=str, dest='filena
 parser.add_argument( '-o', action='store', required=True, type=str, dest='filename_out',
                      help='output filename' )
 parser.add_argument( '-t', '--text', action='store_true', dest='output_text',
-                     help='output text instead of binary file [False]' )
+                     help='output text instead of binary file (same as "-f text") [False]' )
 parser.add_argument( '-d', '--double', action='store_true', dest='float64',
-                     help='use double precision [False]' )
+                     help='use double precision; "bin" and "text" use single precision otherwise [False]' )
+parser.add_argument( '-f', action='store', required=False, type=str, dest='fmt', choices=FORMATS,
+                     help='output format; "npy", "parquet", and "arrow" keep the stored data types unless -d is set, '
+                          'and "parquet" and "arrow" require pyarrow [%(default)s]', default='bin' )
+parser.add_argument( '-a', action='store', required=False, type=str, nargs='+', dest='attributes',
+                     help='particle attributes to be extracted [all]', default=None )
+parser.add_argument( '-p', action='store', required=False, type=int, nargs='+', dest='par_type',
+                     help='only extract the particles of these types (ParType) [all]', default=None )
+parser.add_argument( '-l', action='store', required=False, type=int, nargs='+', dest='levels',
+                     help='only extract the particles hosted by the patches on these AMR levels [all]', default=None )
+parser.add_argument( '--box', action='store', required=False, type=float, nargs=6, dest='box',
+                     metavar=('XMIN', 'YMIN', 'ZMIN', 'XMAX', 'YMAX', 'ZMAX'),
+                     help='only extract the particles inside this box (in code units) [none]', default=None )
+parser.add_argument( '--sphere', action='store', required=False, type=float, nargs=4, dest='sphere',
+                     metavar=('X', 'Y', 'Z', 'R'),
+                     help='only extract the particles inside this sphere (in code units) [none]', default=None )
+parser.add_argument( '-b', action='store', required=False, type=int, dest='block',
+                     help='number of particles processed at once [%(default)d]', default=1<<20 )
 
 args=parser.parse_args()
 
@@ -31,68 +49,54 @@ print( '-------------------------------------------------------------------\n' )
 # short names
 filename_in  = args.filename_in
 filename_out = args.filename_out
-output_text  = args.output_text
-float_type   = 'float64' if args.float64 else 'float32'
+fmt          = 'text' if args.output_text else args.fmt
+if   args.float64:                  float_type = 'float64'
+elif fmt in ( 'bin', 'text' ):      float_type = 'float32'
+else:                               float_type = None
 
 
 # open and check files
-handle_in = h5py.File( filename_in, 'r' )
+snap = Snapshot( filename_in )
 
 # check whether the input file has particle data
-assert 'Particle' in handle_in, 'No particle data can be found'
+assert snap.particle.exists, 'No particle data can be found'
 
 # check whether the outfile file already exists
 assert not os.path.isfile( filename_out ), 'output file \"'+filename_out+'\" already exists!'
 
-handle_out = open( filename_out, "a" )
-
 
 # get the particle attribute list
-par_group = handle_in['Particle']
-att_list = [ v for v in par_group.keys() ]
+att_list = args.attributes if args.attributes is not None else snap.particle.keys()
 
 
 # output simulation info
-time = handle_in['Info']['KeyInfo']['Time'][0]
-step = handle_in['Info']['KeyInfo']['Step']
-npar = handle_in['Info']['KeyInfo']['Par_NPar']
-print ( "%-19s : %20.14e"%("Time", time) )
-print ( "%-19s : %ld"    %("Step", step) )
-print ( "%-19s : %ld"    %("# of particles", npar) )
+print ( "%-19s : %20.14e"%("Time", snap.time) )
+print ( "%-19s : %ld"    %("Step", snap.step) )
+print ( "%-19s : %ld"    %("# of particles", snap.particle.npar) )
 print ( "%-19s :"        %("Particle attributes"), end=' ' ),
 for v in att_list: print( "%s"%v, end=' ' ),
 print( '' )
 
 
-# output text file
-if output_text:
-#  load all particles
-   par_data = {}
-   for v in att_list:
-      par_data[v] = np.asarray( par_group[v], dtype=float_type )
-
-#  output header
-   handle_out.write( "#Time %20.14e   Step %13ld   Active Particles %13ld\n\n" % (time, step, npar) )
-   handle_out.write( "#" )
-   for i, v in enumerate( att_list ):
-      handle_out.write( "  %*s"%(20 if i==0 else 21, v) );
-   handle_out.write( "\n" )
-
-#  output all attributes of a single particle at a time
-   for p in range( npar ):
-      for v in att_list:
-         handle_out.write( "  %21.14e"%par_data[v][p] );
-      handle_out.write( "\n" )
+# select the host patches: particles in a region are read from the overlapping patches only
+gids   = None if args.levels is None else level_gids( snap, args.levels )
+region = None
+if args.box is not None or args.sphere is not None:
+   index = PatchIndex.open( snap )
+   if args.box is not None:
+      region  = box_mask( args.box[0:3], args.box[3:6] )
+      overlap = index.query_box( args.box[0:3], args.box[3:6], leaf_only=False )
+   else:
+      region  = sphere_mask( args.sphere[0:3], args.sphere[3] )
+      overlap = index.query_sphere( args.sphere[0:3], args.sphere[3], leaf_only=False )
+   gids = overlap if gids is None else np.intersect1d( gids, overlap )
 
 
-# output binary file
-else:
-#  output one attribute at a time
-   for v in att_list:
-      par_data = np.asarray( par_group[v], dtype=float_type )
-      par_data.tofile( handle_out )
+# output the selected particles block by block
+nsel  = extract_particles( snap, filename_out, fmt=fmt, attributes=att_list, gids=gids, par_type=args.par_type,
+                           region=region, dtype=float_type, block=args.block )
+print ( "%-19s : %ld"    %("# of output particles", nsel) )
 
 
 # close files
-handle_out.close()
-handle_in.close()
+snap.close()
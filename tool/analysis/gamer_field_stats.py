@@ -0,0 +1,77 @@
+import argparse
+import sys
+import numpy as np
+from gamer_io.stats import field_stats
+
+
+def main():
+   # load the command-line parameters
+   parser = argparse.ArgumentParser( description='Compute the per-level statistics (mean, variance, extrema, histogram) '
+                                                 'of a field in a GAMER HDF5 snapshot' )
+
+   parser.add_argument( '-i', action='store', required=True,  type=str, dest='filename_in',
+                        help='input filename' )
+   parser.add_argument( '-f', action='store', required=True,  type=str, dest='field',
+                        help='target field in GridData (e.g., Dens)' )
+   parser.add_argument( '-w', action='store', required=False, type=str, dest='weight',
+                        help='weight: volume, mass, cell, or a field name [%(default)s]', default='volume' )
+   parser.add_argument( '-b', action='store', required=False, type=float, nargs=3, dest='bins',
+                        help='histogram bins: min max number [none]', default=None )
+   parser.add_argument( '-l', '--log', action='store_true', dest='log',
+                        help='use logarithmic histogram bins [False]' )
+   parser.add_argument( '-n', action='store', required=False, type=int, dest='nproc',
+                        help='number of processes [%(default)d]', default=1 )
+   parser.add_argument( '-a', '--all', action='store_false', dest='leaf_only',
+                        help='include the cells of non-leaf patches [False]' )
+   parser.add_argument( '-o', action='store', required=False, type=str, dest='prefix_out',
+                        help='prefix of the output tables [%(default)s]', default='FieldStats' )
+
+   args=parser.parse_args()
+
+   # take note
+   print( '\nCommand-line arguments:' )
+   print( '-------------------------------------------------------------------' )
+   print( ' '.join(map(str, sys.argv)) )
+   print( '-------------------------------------------------------------------\n' )
+
+
+   bins = None
+   if args.bins is not None:
+      lo, hi, n = args.bins
+      bins      = np.logspace( np.log10(lo), np.log10(hi), int(n)+1 ) if args.log else np.linspace( lo, hi, int(n)+1 )
+
+   stats = field_stats( args.filename_in, args.field, weight=args.weight, bins=bins, nproc=args.nproc,
+                        leaf_only=args.leaf_only )
+   total = stats.total()
+
+
+   # output the per-level statistics
+   header = '#%5s  %13s  %13s  %13s  %13s  %13s  %13s  %13s  %13s  %13s  %13s  %13s  %13s'% \
+            ('Level', 'NCell', 'Weight', 'Mean', 'Std', 'Min', 'MinX', 'MinY', 'MinZ', 'Max', 'MaxX', 'MaxY', 'MaxZ')
+   with open( '%s_%s.txt'%(args.prefix_out, args.field), 'w' ) as f:
+      f.write( header+'\n' )
+      print( header )
+      for lv, s in [ (lv, stats) for lv in range(stats.nlevel) ] + [ (-1, total) ]:
+         i = max( lv, 0 )
+         if s.count[i] == 0: continue
+         line = ' %5d  %13d  %13.6e  %13.6e  %13.6e  %13.6e  %13.6e  %13.6e  %13.6e  %13.6e  %13.6e  %13.6e  %13.6e'% \
+                ( lv, s.count[i], s.weight[i], s.mean[i], np.sqrt(s.variance[i]), s.min[i], *s.min_pos[i],
+                  s.max[i], *s.max_pos[i] )
+         f.write( line+'\n' )
+         print( line )
+   print( '\n(Level = -1 for all levels)' )
+
+
+   # output the histograms
+   if bins is not None:
+      with open( '%s_%s_Hist.txt'%(args.prefix_out, args.field), 'w' ) as f:
+         f.write( '#%13s  %13s'%('BinLeft', 'BinRight') + ''.join( '  %13s'%('Lv%02d'%lv) for lv in range(stats.nlevel) )
+                  + '  %13s\n'%'Total' )
+         for b in range( bins.size-1 ):
+            f.write( ' %13.6e  %13.6e'%(bins[b], bins[b+1]) + ''.join( '  %13.6e'%h for h in stats.hist[:, b] )
+                     + '  %13.6e\n'%total.hist[0, b] )
+
+
+
+if __name__ == '__main__':
+   main()
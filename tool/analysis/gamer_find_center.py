@@ -0,0 +1,64 @@
+import argparse
+import sys
+import gamer_io
+from gamer_io.center import append_record, center_series, recorded_steps
+
+
+def main():
+   # load the command-line parameters
+   parser = argparse.ArgumentParser( description='Find the extrema locations and centers of mass of GAMER HDF5 snapshots '
+                                                 'without yt and append them to a table in the Record__Center format' )
+
+   parser.add_argument( '-s', action='store', required=True,  type=int, dest='idx_start',
+                        help='first data index' )
+   parser.add_argument( '-e', action='store', required=True,  type=int, dest='idx_end',
+                        help='last data index' )
+   parser.add_argument( '-d', action='store', required=False, type=int, dest='didx',
+                        help='delta data index [%(default)d]', default=1 )
+   parser.add_argument( '-i', action='store', required=False, type=str, dest='prefix',
+                        help='data path prefix [%(default)s]', default='../' )
+   parser.add_argument( '-n', action='store', required=False, type=int, dest='nproc',
+                        help='number of processes [%(default)d]', default=1 )
+   parser.add_argument( '-o', action='store', required=False, type=str, dest='filename_out',
+                        help='output filename; snapshots whose steps are already recorded are skipped [%(default)s]',
+                        default='Record__Center_Snapshot' )
+   parser.add_argument( '--max', action='store', required=False, type=str, nargs='+', dest='extra_max',
+                        help='additional fields whose maximum locations are recorded [none]', default=[] )
+   parser.add_argument( '--min', action='store', required=False, type=str, nargs='+', dest='extra_min',
+                        help='additional fields whose minimum locations are recorded [none]', default=[] )
+   parser.add_argument( '--strict', action='store_true', dest='strict',
+                        help='only output the columns of Record__Center [False]' )
+
+   args=parser.parse_args()
+
+   # take note
+   print( '\nCommand-line arguments:' )
+   print( '-------------------------------------------------------------------' )
+   print( ' '.join(map(str, sys.argv)) )
+   print( '-------------------------------------------------------------------\n' )
+
+
+   filenames = [ args.prefix+'/Data_%06d'%idx for idx in range(args.idx_start, args.idx_end+1, args.didx) ]
+   extra     = [ (v, 'max') for v in args.extra_max ] + [ (v, 'min') for v in args.extra_min ]
+   if args.strict and len(extra) > 0:
+      print( 'WARNING : --max and --min are ignored when --strict is set !!\n' )
+      extra = []
+
+
+   # skip the snapshots already recorded
+   done  = set( recorded_steps(args.filename_out).tolist() )
+   todo  = []
+   for fn in filenames:
+      with gamer_io.Snapshot( fn ) as snap:
+         if snap.step not in done: todo.append( fn )
+   print( '%-19s : %d (%d already recorded)'%('# of snapshots', len(filenames), len(filenames)-len(todo)) )
+
+
+   results = center_series( todo, extra=extra, nproc=args.nproc )
+   append_record( args.filename_out, results, strict=args.strict )
+   print( 'Output the centers of %d snapshots to %s'%(len(results), args.filename_out) )
+
+
+
+if __name__ == '__main__':
+   main()
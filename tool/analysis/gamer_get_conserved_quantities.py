@@ -0,0 +1,47 @@
+import argparse
+import sys
+import numpy as np
+from gamer_io.conserved import conserved_series, write_table
+
+
+def main():
+   # load the command-line parameters
+   parser = argparse.ArgumentParser( description='Output the conserved quantities of GAMER HDF5 snapshots without yt' )
+
+   parser.add_argument( '-s', action='store', required=True,  type=int, dest='idx_start',
+                        help='first data index' )
+   parser.add_argument( '-e', action='store', required=True,  type=int, dest='idx_end',
+                        help='last data index' )
+   parser.add_argument( '-d', action='store', required=False, type=int, dest='didx',
+                        help='delta data index [%(default)d]', default=1 )
+   parser.add_argument( '-i', action='store', required=False, type=str, dest='prefix',
+                        help='data path prefix [%(default)s]', default='../' )
+   parser.add_argument( '-n', action='store', required=False, type=int, dest='nproc',
+                        help='number of processes [%(default)d]', default=1 )
+   parser.add_argument( '-o', action='store', required=False, type=str, dest='filename_out',
+                        help='output filename [%(default)s]', default='ConservedQuantities' )
+
+   args=parser.parse_args()
+
+   # take note
+   print( '\nCommand-line arguments:' )
+   print( '-------------------------------------------------------------------' )
+   print( ' '.join(map(str, sys.argv)) )
+   print( '-------------------------------------------------------------------\n' )
+
+
+   idx_list  = list( range(args.idx_start, args.idx_end+1, args.didx) )
+   filenames = [ args.prefix+'/Data_%06d'%idx for idx in idx_list ]
+
+   results = conserved_series( filenames, nproc=args.nproc )
+
+   if any( np.isnan(v) for r in results for k, v in r.items() if k in ('Epot_Gas', 'Epot_Psi') ):
+      print( 'WARNING : To calculate the gravitational potential energy, please turn on OPT__OUTPUT_POT in Input__Parameter !!\n' )
+
+   write_table( args.filename_out, [ '%06d'%idx for idx in idx_list ], results )
+   print( 'Output the conserved quantities of %d snapshots to %s'%(len(results), args.filename_out) )
+
+
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,22 @@
+"""
+gamer_io: lightweight, lazy access to GAMER HDF5 snapshots without yt, and parsers of the simulation logs.
+
+Usage:
+   import gamer_io
+   snap = gamer_io.Snapshot( "Data_000010" )
+
+Requirements: numpy and h5py.
+"""
+from .catalog  import Catalog
+from .lazy     import LazyArray, contiguous_runs
+from .particles import ParticleIndex
+from .records  import RecordBlocks, RecordTable, RecordTiming, iter_columns, load_record
+from .snapshot import Snapshot, decode_compound
+from .spatial  import PatchIndex
+from .stats    import LevelStats, field_stats
+from .track    import PIDIndex, track_particles
+from .window   import WindowReducer, ewma
+
+__all__ = [ "Catalog", "LazyArray", "LevelStats", "ParticleIndex", "PatchIndex", "PIDIndex", "RecordBlocks", "RecordTable",
+            "RecordTiming", "Snapshot", "WindowReducer", "contiguous_runs", "decode_compound", "ewma", "field_stats", "iter_columns",
+            "load_record", "track_particles" ]
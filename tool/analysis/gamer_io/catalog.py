@@ -0,0 +1,201 @@
+"""
+Metadata catalog of all snapshots (`Data_XXXXXX`) in a run directory.
+
+The catalog stores the key information of each snapshot (time, step, number of patches on each level,
+number of particles, ...) in a compact structured array saved as `.gamer_catalog.npz` in the run directory.
+Updating the catalog only opens the snapshots that are new or have changed since the last update
+(judged by file size and modification time), and these are scanned by multiple processes.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import glob
+import multiprocessing
+import os
+import re
+import h5py
+import numpy as np
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+CATALOG_NAME    = ".gamer_catalog.npz"
+CATALOG_VERSION = 1
+SNAPSHOT_REGEX  = re.compile( r"^Data_(\d{6})$" )
+SCALAR_FIELDS   = [ ("DumpID",   np.int32  ),
+                    ("Step",     np.int64  ),
+                    ("Time",     np.float64),
+                    ("Redshift", np.float64),   # NaN if not a comoving run
+                    ("A_Init",   np.float64),   # NaN if not a comoving run
+                    ("Par_NPar", np.int64  ),
+                    ("NLevel",   np.int32  ),
+                    ("FileSize", np.int64  ),
+                    ("MTime",    np.int64  ) ]  # modification time in ns
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def catalog_dtype( nlevel ):
+    return np.dtype( [ ("Name", "U32") ] + SCALAR_FIELDS + [ ("NPatch", np.int32, (nlevel,)) ] )
+
+def list_snapshots( run_dir ):
+    """
+    Return the names of all snapshots in a run directory sorted by name.
+    """
+    names = [ os.path.basename(f) for f in glob.glob( os.path.join(run_dir, "Data_[0-9][0-9][0-9][0-9][0-9][0-9]") ) ]
+    return sorted( n for n in names if SNAPSHOT_REGEX.match(n) )
+
+def scan_snapshot( args ):
+    """
+    Read the key information of a single snapshot.
+
+    Only the required members of the compound datasets are read.
+
+    Return a dictionary, or None if the file cannot be read (e.g., it is still being written).
+    """
+    run_dir, name = args
+    filename      = os.path.join( run_dir, name )
+    try:
+        stat = os.stat( filename )
+        with h5py.File( filename, "r" ) as h5:
+            key_info = h5["Info/KeyInfo"]
+            keys     = [ k for k in ( "Step", "Time", "NPatch", "Par_NPar" ) if k in key_info.dtype.names ]
+            ki       = key_info.fields( keys )[()]
+
+            comoving = False
+            if "Info/Makefile" in h5 and "Comoving" in h5["Info/Makefile"].dtype.names:
+                comoving = bool( h5["Info/Makefile"].fields(["Comoving"])[()]["Comoving"] )
+            a_init   = np.nan
+            if comoving and "A_Init" in h5["Info/InputPara"].dtype.names:
+                a_init = float( h5["Info/InputPara"].fields(["A_Init"])[()]["A_Init"] )
+    except (OSError, KeyError):
+        return None
+
+    time = float( np.asarray(ki["Time"]).ravel()[0] )
+    return { "Name"     : name,
+             "DumpID"   : int( SNAPSHOT_REGEX.match(name).group(1) ),
+             "Step"     : int( ki["Step"] ),
+             "Time"     : time,
+             "Redshift" : 1.0/time - 1.0 if comoving else np.nan,
+             "A_Init"   : a_init,
+             "Par_NPar" : int( ki["Par_NPar"] ) if "Par_NPar" in keys else 0,
+             "NLevel"   : int( np.count_nonzero(ki["NPatch"]) ),
+             "NPatch"   : np.asarray( ki["NPatch"], dtype=np.int32 ),
+             "FileSize" : stat.st_size,
+             "MTime"    : stat.st_mtime_ns }
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class Catalog():
+    """
+    Catalog of the snapshots in a run directory.
+
+    Example:
+       cat   = Catalog.update( "./", nproc=8 )
+       files = cat.select( t_min=1.0, t_max=2.0, every=2 )
+    """
+    def __init__( self, run_dir, entries=None ):
+        self.run_dir = run_dir
+        self.entries = entries if entries is not None else np.empty( 0, dtype=catalog_dtype(1) )
+
+    def __len__( self ):
+        return self.entries.size
+
+    def __getitem__( self, key ):
+        return self.entries[key]
+
+    @property
+    def filename( self ):
+        return os.path.join( self.run_dir, CATALOG_NAME )
+
+    @property
+    def files( self ):
+        return [ os.path.join(self.run_dir, n) for n in self.entries["Name"] ]
+
+    @classmethod
+    def load( cls, run_dir ):
+        """
+        Load the catalog of a run directory without updating it (empty if it does not exist).
+        """
+        cat = cls( run_dir )
+        if os.path.isfile( cat.filename ):
+            with np.load( cat.filename ) as f:
+                if int( f["version"] ) == CATALOG_VERSION: cat.entries = f["entries"]
+        return cat
+
+    @classmethod
+    def update( cls, run_dir, nproc=1, save=True ):
+        """
+        Load the catalog of a run directory and scan the new or modified snapshots.
+
+        run_dir : string. Run directory.
+        nproc   : int. Number of processes for scanning the snapshots.
+        save    : bool. Whether or not to store the updated catalog.
+        """
+        cat   = cls.load( run_dir )
+        names = list_snapshots( run_dir )
+        known = { e["Name"]: e for e in cat.entries }
+
+        todo = []
+        keep = []
+        for name in names:
+            stat = os.stat( os.path.join(run_dir, name) )
+            if name in known and known[name]["FileSize"] == stat.st_size and known[name]["MTime"] == stat.st_mtime_ns:
+                keep.append( known[name] )
+            else:
+                todo.append( (run_dir, name) )
+
+        if nproc > 1 and len(todo) > 1:
+            with multiprocessing.Pool( nproc ) as pool: new = pool.map( scan_snapshot, todo, chunksize=max(1, len(todo)//(4*nproc)) )
+        else:
+            new = [ scan_snapshot(t) for t in todo ]
+        new = [ e for e in new if e is not None ]
+
+        changed = len(new) > 0 or len(keep) != cat.entries.size
+        nlevel  = max( [cat.entries.dtype["NPatch"].shape[0]] + [ e["NPatch"].size for e in new ] )
+        entries = np.zeros( len(keep)+len(new), dtype=catalog_dtype(nlevel) )
+        for i, e in enumerate( keep+new ):
+            for key in entries.dtype.names:
+                if key == "NPatch": entries[key][i, :len(e[key])] = e[key]
+                else:               entries[key][i]               = e[key]
+        cat.entries = entries[ np.argsort(entries["DumpID"], kind="stable") ]
+
+        if save and changed: cat.save()
+        return cat
+
+    def save( self ):
+        tmp = self.filename + ".tmp.npz"
+        try:
+            np.savez( tmp, version=CATALOG_VERSION, entries=self.entries )
+            os.replace( tmp, self.filename )
+        except OSError:
+            pass   # read-only directory --> keep the catalog in memory only
+
+    def select( self, t_min=None, t_max=None, step_min=None, step_max=None, z_min=None, z_max=None,
+                idx_min=None, idx_max=None, every=1 ):
+        """
+        Return the filenames of the snapshots within the given ranges (inclusive).
+
+        every : int. Return every `every`-th snapshot after filtering.
+        """
+        e    = self.entries
+        mask = np.ones( e.size, dtype=bool )
+        for key, lo, hi in ( ("Time", t_min, t_max), ("Step", step_min, step_max), ("Redshift", z_min, z_max),
+                             ("DumpID", idx_min, idx_max) ):
+            if lo is not None: mask &= e[key] >= lo
+            if hi is not None: mask &= e[key] <= hi
+        return [ os.path.join(self.run_dir, n) for n in e["Name"][mask][::every] ]
+
+    def nearest( self, time ):
+        """
+        Return the filename of the snapshot closest to the given time.
+        """
+        if self.entries.size == 0: raise ValueError( "no snapshot in %s"%self.run_dir )
+        return os.path.join( self.run_dir, self.entries["Name"][ np.argmin(np.abs(self.entries["Time"]-time)) ] )
@@ -0,0 +1,185 @@
+"""
+Extrema locations and centers of mass of GAMER HDF5 snapshots.
+
+All quantities of `example/yt/find_center.py` (i.e., the locations of the maximum fluid, particle, and total
+density and of the minimum potential, and the center of mass of the fluid, particles, and both) are computed
+in a single pass over the leaf patches followed by a single pass over the particles. Each field is read only
+once per block of patches, and snapshots are distributed over a process pool.
+
+The results are written in the format of `Record__Center` so that they can be compared with or appended to
+the file recorded during the simulation. Since the center of mass here is computed over the entire domain
+instead of iteratively within COM_MAX_R, `Final_NIter` is set to 0 and `Final_dR` to NaN. The centers of mass
+of the fluid and particles alone are appended as extra columns.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import multiprocessing
+import os
+import numpy as np
+
+from .conserved import BLOCK_ROWS, cell_centers
+from .particles import PAR_BLOCK
+from .snapshot  import Snapshot
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+RECORD_NAME = "Record__Center"
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class _Extremum():
+    """
+    Running minimum or maximum of a field together with its cell-center coordinates.
+    """
+    def __init__( self, mode ):
+        self.mode  = mode
+        self.value = np.inf if mode == "min" else -np.inf
+        self.coord = np.full( 3, np.nan )
+
+    def update( self, data, x, y, z ):
+        if data.size == 0: return
+        idx = np.nanargmin( data ) if self.mode == "min" else np.nanargmax( data )
+        val = data.flat[idx]
+        if ( val < self.value ) if self.mode == "min" else ( val > self.value ):
+            p, k, j, i = np.unravel_index( idx, data.shape )
+            self.value = float( val )
+            self.coord = np.array( [ x[p,0,0,i], y[p,0,j,0], z[p,k,0,0] ] )
+
+    def row( self ):
+        return [ self.value if np.isfinite(self.value) else np.nan ] + list( self.coord )
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def find_center( filename, extra=() ):
+    """
+    Find the extrema locations and centers of mass of a snapshot.
+
+    filename : string. Snapshot filename.
+    extra    : list of (field, "max"/"min") pairs. Additional extrema to be located.
+
+    Return a dictionary mapping the column names of `Record__Center` (plus "CoM_Gas_x/y/z",
+    "CoM_Par_x/y/z", and the extra extrema) to their values.
+    """
+    with Snapshot( filename ) as snap:
+        grid     = snap.grid
+        with_par = snap.particle.exists and int( snap.key_info.get("Particle", 1) ) == 1
+        with_pot = int( snap.key_info.get("Gravity", 1) ) == 1
+        par_dens = next( ( v for v in ("ParDens", "TotalDens") if v in grid ), None )
+        origin   = np.zeros( 3 )
+        leaf     = snap.leaf_mask()
+
+        ext = { "MaxDens": _Extremum("max") }
+        if with_par:
+            ext["MaxParDens"]   = _Extremum( "max" )
+            ext["MaxTotalDens"] = _Extremum( "max" )
+        if with_pot:
+            ext["MinPote"]      = _Extremum( "min" )
+        for field, mode in extra:
+            ext[ mode.capitalize()+field ] = _Extremum( mode )
+
+        gas_mass = 0.0
+        gas_mx   = np.zeros( 3 )
+        for lv in range( snap.nlevel ):
+            start, stop = snap.level_range( lv )
+            dv          = snap.cell_size[lv]**3
+            for s in range( start, stop, BLOCK_ROWS ):
+                e  = min( s+BLOCK_ROWS, stop )
+                lf = leaf[s:e]
+                if not lf.any(): continue
+
+                rows    = slice( s, e )
+                x, y, z = cell_centers( snap, lv, snap.tree["Corner"][rows][lf], origin )
+                dens    = grid["Dens"][rows][lf].astype( np.float64 )
+
+                ext["MaxDens"].update( dens, x, y, z )
+                gas_mass += np.sum( dens )*dv
+                gas_mx   += np.array( [ np.sum(dens*x), np.sum(dens*y), np.sum(dens*z) ] )*dv
+
+                if with_par and par_dens is not None:
+                    pd = grid[par_dens][rows][lf].astype( np.float64 )
+                    td = pd if par_dens == "TotalDens" else pd + dens
+                    if par_dens == "TotalDens": pd = pd - dens
+                    ext["MaxParDens"  ].update( pd, x, y, z )
+                    ext["MaxTotalDens"].update( td, x, y, z )
+                if with_pot and "Pote" in grid:
+                    ext["MinPote"].update( grid["Pote"][rows][lf], x, y, z )
+                for field, mode in extra:
+                    ext[ mode.capitalize()+field ].update( grid[field][rows][lf], x, y, z )
+
+        par_mass = 0.0
+        par_mx   = np.zeros( 3 )
+        if with_par:
+            par = snap.particle
+            for s in range( 0, int(par.npar), PAR_BLOCK ):
+                e         = min( s+PAR_BLOCK, int(par.npar) )
+                m         = np.asarray( par["ParMass"][s:e], dtype=np.float64 )
+                par_mass += np.sum( m )
+                par_mx   += [ np.dot( m, np.asarray(par["ParPos"+d][s:e], dtype=np.float64) ) for d in "XYZ" ]
+
+        with np.errstate( invalid="ignore", divide="ignore" ):
+            com_gas = gas_mx/gas_mass
+            com_par = par_mx/par_mass
+            com_all = ( gas_mx + par_mx )/( gas_mass + par_mass )
+
+        out = { "Time": snap.time, "Step": snap.step }
+        for key in ( "MaxDens", "MaxParDens", "MaxTotalDens", "MinPote" ):
+            if key in ext: out.update( zip( [key, key+"_x", key+"_y", key+"_z"], ext[key].row() ) )
+        out["Final_NIter"] = 0
+        out["Final_dR"   ] = np.nan
+        out.update( zip( ["CoM_x", "CoM_y", "CoM_z"], com_all ) )
+        out.update( zip( ["CoM_Gas_x", "CoM_Gas_y", "CoM_Gas_z"], com_gas ) )
+        if with_par: out.update( zip( ["CoM_Par_x", "CoM_Par_y", "CoM_Par_z"], com_par ) )
+        for field, mode in extra:
+            key = mode.capitalize()+field
+            out.update( zip( [key, key+"_x", key+"_y", key+"_z"], ext[key].row() ) )
+
+    return out
+
+def _find_center_task( args ):
+    return find_center( *args )
+
+def center_series( filenames, extra=(), nproc=1 ):
+    """
+    Find the centers of multiple snapshots with a process pool.
+
+    Return a list of dictionaries in the same order as `filenames`.
+    """
+    tasks = [ (fn, tuple(extra)) for fn in filenames ]
+    if nproc > 1 and len(tasks) > 1:
+        with multiprocessing.Pool( nproc ) as pool: return pool.map( _find_center_task, tasks, chunksize=1 )
+    return [ _find_center_task(t) for t in tasks ]
+
+def recorded_steps( filename ):
+    """
+    Return the steps already recorded in a `Record__Center` file (empty if it does not exist).
+    """
+    if not os.path.isfile( filename ): return np.empty( 0, dtype=np.int64 )
+    return np.loadtxt( filename, comments="#", usecols=1, dtype=np.int64, ndmin=1 )
+
+def append_record( filename, results, strict=False ):
+    """
+    Append the results of `find_center()` to a file in the `Record__Center` format.
+
+    strict : bool. Only write the columns of `Record__Center` (i.e., exclude the extra columns).
+
+    The header is written only if the file does not exist.
+    """
+    if len(results) == 0: return
+    keys = [ k for k in results[0] if k not in ("Time", "Step") ]
+    if strict: keys = keys[ :keys.index("CoM_z")+1 ]
+    new  = not os.path.isfile( filename )
+    with open( filename, "a" ) as f:
+        if new: f.write( "#%19s  %10s"%("Time", "Step") + "".join( "  %14s"%k for k in keys ) + "\n" )
+        for r in results:
+            f.write( "%20.14e  %10ld"%(r["Time"], r["Step"]) +
+                     "".join( "  %14d"%r[k] if k == "Final_NIter" else "  %14.7e"%r.get(k, np.nan) for k in keys ) + "\n" )
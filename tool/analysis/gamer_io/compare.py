@@ -0,0 +1,168 @@
+"""
+A/B comparison of the performance of two or more runs (e.g., different --flux, --slope, PATCH_SIZE, or GPU
+settings) from Record__Performance and Record__Timing.
+
+The wall time of each step is taken from Record__Performance ("Total") and, if available, from the timing
+hierarchy of Record__Timing (see `timing_profile.py`), both per phase summed over all levels (e.g.,
+"Integration/Flu_Adv") and per level (e.g., "Integration/Lv 1/Flu_Adv"). The throughputs "Cell updates/s" and
+"Particle updates/s" are the cell and particle updates divided by the total wall time.
+
+The runs are aligned either by step, over the steps recorded by all runs, or by physical time, over the time
+interval covered by all runs, so runs of unequal length are compared over their common range. Aligning by time
+compares the time to solution, including the effect of different time-steps. The common range is divided into
+bins of consecutive steps (or equal physical time), and the wall time of each metric is summed in each bin.
+
+The speedup of a run over the baseline is the ratio of their total wall times over the common range (or the
+ratio of the throughputs). Its confidence interval comes from the paired block bootstrap: the same bins are
+resampled with replacement for all runs, which keeps the variation shared by the runs (e.g., the growth of
+refinement) paired and the correlation between consecutive steps within each bin.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import os
+import numpy as np
+from functools      import reduce
+from .records        import load_record
+from .timing_profile import timing_tree
+from .walltime       import unique_steps
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+ALIGN = ( "Step", "Time" )
+WORK  = { "Cell updates/s": "NUpdate_Cell", "Particle updates/s": "NUpdate_Par" }   # throughput --> work column
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def load_metrics( path, depth=3, stat=None, cache=False ):
+    """
+    Load the wall time of each step of a run in the directory `path`.
+
+    depth : int. Maximum depth of the timers of Record__Timing below the main loop (e.g., 3 for
+            "Integration/Lv 1/Flu_Adv" and "Integration/Flu_Adv/Flu_Sol").
+    stat  : string. Statistic over ranks with OPT__TIMING_BALANCE (see `timing_tree`).
+
+    Return a dictionary of
+       "Step", "Time" : [NStep] arrays of the unique steps, restricted to those in Record__Timing if available
+       "Wall"         : dictionary of the [NStep] wall times of "Total" and of the timers of Record__Timing
+       "Work"         : dictionary of the [NStep] work of the throughputs in WORK (e.g., "Cell updates/s")
+    """
+    perf = load_record( os.path.join(path, "Record__Performance"), cache=cache )
+    if len( perf ) == 0: raise ValueError( "no record found in %s"%os.path.join(path, "Record__Performance") )
+    idx  = unique_steps( perf["Step"] )
+    run  = { "Step": perf["Step"][idx], "Time": perf["Time"][idx].astype( np.float64 ),
+             "Wall": { "Total": perf["ElapsedTime"][idx].astype( np.float64 ) }, "Work": {} }
+    for name, col in WORK.items():
+        if col in perf  and  np.nansum( perf[col] ) > 0.0: run["Work"][name] = perf[col][idx].astype( np.float64 )
+
+    filename = os.path.join( path, "Record__Timing" )
+    if not os.path.isfile( filename ): return run
+    rec = load_record( filename, cache=cache )
+    if len( rec ) == 0: return run
+
+#   keep the steps recorded in both logs
+    tstep     = rec.column( "Step" ).astype( np.int64 )
+    tidx      = unique_steps( tstep )
+    _, ip, it = np.intersect1d( run["Step"], tstep[tidx], return_indices=True )
+    tidx      = tidx[it]
+    run["Step"], run["Time"] = run["Step"][ip], run["Time"][ip]
+    for group in ( "Wall", "Work" ):
+        run[group] = { k: v[ip] for k, v in run[group].items() }
+
+#   phases summed over all levels, followed by the levels
+    for merge in ( True, False ):
+        for stack, node in timing_tree( rec, stat, merge_levels=merge ).walk():
+            name = "/".join( stack[1:] )
+            if not 1 < len( stack ) <= depth+1  or  name in run["Wall"]: continue
+            if not merge  and  not any( s.startswith( "Lv " ) for s in stack ): continue
+            run["Wall"][name] = node.value[tidx]
+    return run
+
+def align( runs, by="Step", nbin=50 ):
+    """
+    Align the runs loaded by `load_metrics` and sum their metrics in bins of the common range.
+
+    by   : string. "Step" to align the runs by step or "Time" by physical time.
+    nbin : int. Number of bins (at most the number of common steps when aligned by step).
+
+    Return a dictionary of
+       "By", "Range" : alignment and the first and last common step (or the common time interval)
+       "NStep"       : [NRun] number of steps of each run in the common range
+       "Wall"        : dictionary of the [NRun][NBin] wall times of the metrics recorded by all runs
+       "Work"        : dictionary of the [NRun][NBin] work of the throughputs recorded by all runs
+    """
+    if by not in ALIGN: raise ValueError( "unknown alignment %s (%s)"%(by, ALIGN) )
+    if len( runs ) < 2: raise ValueError( "at least two runs are required" )
+
+    if by == "Step":
+        common = reduce( np.intersect1d, [ r["Step"] for r in runs ] )
+        if common.size == 0: raise ValueError( "the runs have no step in common" )
+        nbin   = min( nbin, common.size )
+        binid  = [ ( np.arange(common.size)*nbin )//common.size for r in runs ]
+        select = [ np.isin( r["Step"], common ) for r in runs ]
+        rng    = ( int(common[0]), int(common[-1]) )
+    else:
+        lo = max( r["Time"][0]  for r in runs )
+        hi = min( r["Time"][-1] for r in runs )
+        if hi <= lo: raise ValueError( "the runs have no time interval in common" )
+        edges  = np.linspace( lo, hi, nbin+1 )
+        select = [ ( r["Time"] > lo ) & ( r["Time"] <= hi ) for r in runs ]
+        binid  = [ np.clip( np.searchsorted( edges, r["Time"][s], side="left" )-1, 0, nbin-1 ) for r, s in zip( runs, select ) ]
+        rng    = ( lo, hi )
+
+    def binned( group ):
+        names = [ k for k in runs[0][group] if all( k in r[group] for r in runs[1:] ) ]
+        return { k: np.array( [ np.bincount( b, weights=np.nan_to_num( r[group][k][s], nan=0.0 ), minlength=nbin )
+                                for r, s, b in zip( runs, select, binid ) ] ) for k in names }
+
+    return { "By": by, "Range": rng, "NStep": np.array( [ s.sum() for s in select ] ), "Wall": binned( "Wall" ),
+             "Work": binned( "Work" ) }
+
+def speedup( aligned, base=0, nboot=2000, confidence=0.95, seed=0 ):
+    """
+    Speedup of each run over the baseline with the paired block-bootstrap confidence interval (see the module
+    docstring).
+
+    aligned    : dictionary returned by `align`.
+    base       : int. Index of the baseline run.
+    nboot      : int. Number of bootstrap samples.
+    confidence : float. Confidence level of the interval.
+
+    Return a list of dictionaries, one per metric and run other than the baseline, with the keys "Metric",
+    "Run", "Kind" ("time" or "rate"), "Base" and "Value" (total wall time in second, or throughput), "Speedup"
+    (larger than one if the run is faster), "Low" and "High" (confidence interval), and "Significant" (whether
+    the interval excludes one).
+    """
+    total = aligned["Wall"]["Total"]
+    nrun, nbin = total.shape
+    rng   = np.random.default_rng( seed )
+    count = rng.multinomial( nbin, np.full( nbin, 1.0/nbin ), size=nboot ).astype( np.float64 )   # [NBoot][NBin]
+    q     = 50.0*( 1.0 - confidence )
+
+    rows = []
+    def add( name, kind, sums, boot ):
+        for r in range( nrun ):
+            if r == base: continue
+            with np.errstate( invalid="ignore", divide="ignore" ):
+                if kind == "time": s, b = sums[base]/sums[r], boot[:,base]/boot[:,r]
+                else:              s, b = sums[r]/sums[base], boot[:,r]/boot[:,base]
+            b  = b[ np.isfinite( b ) ]
+            lo, hi = np.percentile( b, [ q, 100.0-q ] ) if b.size > 0 else ( np.nan, np.nan )
+            rows.append( { "Metric": name, "Run": r, "Kind": kind, "Base": sums[base], "Value": sums[r], "Speedup": s,
+                           "Low": lo, "High": hi, "Significant": bool( lo > 1.0  or  hi < 1.0 ) } )
+
+    for name, wall in aligned["Wall"].items():
+        if not ( wall.sum( axis=1 ) > 0.0 ).any(): continue
+        add( name, "time", wall.sum( axis=1 ), count.dot( wall.T ) )
+
+    boot_total = count.dot( total.T )
+    for name, work in aligned["Work"].items():
+        with np.errstate( invalid="ignore", divide="ignore" ):
+            add( name, "rate", work.sum( axis=1 )/total.sum( axis=1 ), count.dot( work.T )/boot_total )
+    return rows
@@ -0,0 +1,201 @@
+"""
+Total mass, momentum, angular momentum, and energy of GAMER HDF5 snapshots.
+
+All quantities of a snapshot are accumulated in a single pass: the leaf patches are read one block at a time
+and every field is read only once per block, followed by a single pass over the particles. Snapshots are
+distributed over a process pool. All quantities are in code units, and the angular momentum is measured
+with respect to the box center, same as `example/yt/get_conserved_quantities.py`.
+
+Columns (only those applicable to the snapshot are computed):
+   Gas : Mass, MomX/Y/Z, AngMomX/Y/Z, Ekin, Eint, Emag (MHD only), Epot, Etot (HYDRO)
+   Psi : Mass, MomX/Y/Z, AngMomX/Y/Z, Ekin, Epot, Etot (ELBDM)
+   Par : Mass, MomX/Y/Z, AngMomX/Y/Z, Ekin, Epot, Etot (particles)
+   All : sum of the fluid and particle quantities
+Epot is 0.5*Pote*Dens*dV for the fluid and 0.5*Pote*ParDens*dV for particles, and it is NaN if the
+potential (OPT__OUTPUT_POT) or the particle density on grid (OPT__OUTPUT_PAR_DENS) is not stored.
+
+The ELBDM momentum and kinetic energy require the wave function gradients, which are computed within each
+patch by second-order finite differences (one-sided at patch boundaries).
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import multiprocessing
+import numpy as np
+
+from .particles import PAR_BLOCK
+from .snapshot  import Snapshot
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+HYDRO      = 1
+ELBDM      = 3
+BLOCK_ROWS = 256   # number of patches per block
+QUANTITIES = { "Gas": [ "Mass", "MomX", "MomY", "MomZ", "AngMomX", "AngMomY", "AngMomZ", "Ekin", "Eint", "Emag", "Epot", "Etot" ],
+               "Psi": [ "Mass", "MomX", "MomY", "MomZ", "AngMomX", "AngMomY", "AngMomZ", "Ekin", "Epot", "Etot" ],
+               "Par": [ "Mass", "MomX", "MomY", "MomZ", "AngMomX", "AngMomY", "AngMomZ", "Ekin", "Epot", "Etot" ] }
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def _angular_momentum( x, y, z, px, py, pz ):
+    return np.array( [ np.sum( y*pz - z*py ), np.sum( z*px - x*pz ), np.sum( x*py - y*px ) ] )
+
+def cell_centers( snap, lv, corner, center ):
+    """
+    Cell-center coordinates relative to `center` broadcastable to [patch][k][j][i].
+    """
+    ps  = snap.patch_size
+    dh  = snap.cell_size[lv]
+    off = ( np.arange(ps) + 0.5 )*dh
+    x   = corner[:,0,None]*snap.cvt2phy + off - center[0]
+    y   = corner[:,1,None]*snap.cvt2phy + off - center[1]
+    z   = corner[:,2,None]*snap.cvt2phy + off - center[2]
+    return x[:,None,None,:], y[:,None,:,None], z[:,:,None,None]
+
+def _cell_centered_mag( grid, rows, leaf ):
+    bx = grid["MagX"][rows][leaf].astype( np.float64 )
+    by = grid["MagY"][rows][leaf].astype( np.float64 )
+    bz = grid["MagZ"][rows][leaf].astype( np.float64 )
+    return 0.5*( bx[...,:-1] + bx[...,1:] ), 0.5*( by[...,:-1,:] + by[...,1:,:] ), 0.5*( bz[:,:-1] + bz[:,1:] )
+
+def _gradient( f, dh ):
+    return [ np.gradient( f, dh, axis=axis, edge_order=2 ) for axis in (3, 2, 1) ]   # x, y, z
+
+def _fluid_block( snap, model, lv, rows, leaf, center, with_pot, par_dens ):
+    """
+    Accumulate the fluid (and the particle potential energy) in the leaf patches of a block of rows.
+    """
+    grid    = snap.grid
+    dv      = snap.cell_size[lv]**3
+    x, y, z = cell_centers( snap, lv, snap.tree["Corner"][rows][leaf], center )
+    dens    = grid["Dens"][rows][leaf].astype( np.float64 )
+    pote    = grid["Pote"][rows][leaf].astype( np.float64 ) if with_pot else None
+    out     = {}
+
+    if model == HYDRO:
+        px, py, pz = [ grid[v][rows][leaf].astype( np.float64 ) for v in ("MomX", "MomY", "MomZ") ]
+        engy       = grid["Engy"][rows][leaf].astype( np.float64 )
+        ekin       = 0.5*( px**2 + py**2 + pz**2 )/dens
+        emag       = 0.0
+        if "MagX" in grid:
+            bx, by, bz  = _cell_centered_mag( grid, rows, leaf )
+            emag        = 0.5*( bx**2 + by**2 + bz**2 )
+            out["Emag"] = np.sum( emag )*dv
+        out["Ekin"] = np.sum( ekin )*dv
+        out["Eint"] = np.sum( engy - ekin - emag )*dv
+        out["Etot"] = np.sum( engy )*dv
+
+    else:
+        eta        = snap.input_para["ELBDM_Mass"]/snap.input_para["ELBDM_PlanckConst"]
+        dh         = snap.cell_size[lv]
+        real       = grid["Real"][rows][leaf].astype( np.float64 )
+        imag       = grid["Imag"][rows][leaf].astype( np.float64 )
+        grad_r     = _gradient( real, dh )
+        grad_i     = _gradient( imag, dh )
+        px, py, pz = [ ( real*gi - imag*gr )/eta for gr, gi in zip(grad_r, grad_i) ]
+        out["Ekin"] = 0.5*sum( np.sum(gr**2) + np.sum(gi**2) for gr, gi in zip(grad_r, grad_i) )/eta**2*dv
+        out["Etot"] = out["Ekin"]
+
+    out["Mass"] = np.sum( dens )*dv
+    out["MomX"], out["MomY"], out["MomZ"] = np.sum( px )*dv, np.sum( py )*dv, np.sum( pz )*dv
+    out["AngMomX"], out["AngMomY"], out["AngMomZ"] = _angular_momentum( x, y, z, px, py, pz )*dv
+    out["Epot"] = 0.5*np.sum( pote*dens )*dv if with_pot else np.nan
+    out["Etot"] = out["Etot"] + out["Epot"]
+
+    par_epot = np.nan
+    if with_pot and par_dens is not None:
+        pd = grid[par_dens][rows][leaf].astype( np.float64 )
+        if par_dens == "TotalDens": pd = pd - dens
+        par_epot = 0.5*np.sum( pote*pd )*dv
+    return out, par_epot
+
+def _particle_totals( snap, center ):
+    par = snap.particle
+    out = dict.fromkeys( QUANTITIES["Par"][:-2], 0.0 )
+    for s in range( 0, int(par.npar), PAR_BLOCK ):
+        e        = min( s+PAR_BLOCK, int(par.npar) )
+        m        = np.asarray( par["ParMass"][s:e], dtype=np.float64 )
+        x, y, z  = [ np.asarray( par["ParPos"+d][s:e], dtype=np.float64 ) - center[i] for i, d in enumerate("XYZ") ]
+        vx, vy, vz = [ np.asarray( par["ParVel"+d][s:e], dtype=np.float64 ) for d in "XYZ" ]
+        L          = _angular_momentum( x, y, z, m*vx, m*vy, m*vz )
+        out["Mass"]    += np.sum( m )
+        out["MomX"]    += np.dot( m, vx )
+        out["MomY"]    += np.dot( m, vy )
+        out["MomZ"]    += np.dot( m, vz )
+        out["AngMomX"] += L[0]
+        out["AngMomY"] += L[1]
+        out["AngMomZ"] += L[2]
+        out["Ekin"]    += 0.5*np.dot( m, vx**2 + vy**2 + vz**2 )
+    return out
+
+def conserved_quantities( filename ):
+    """
+    Compute the conserved quantities of a snapshot.
+
+    Return a dictionary mapping "<Quantity>_<Component>" (e.g., "Mass_Gas") to its value, together with
+    "Time" and "Step".
+    """
+    with Snapshot( filename ) as snap:
+        model    = int( snap.key_info["Model"] )
+        if model not in ( HYDRO, ELBDM ): raise ValueError( "unsupported model %d in %s"%(model, filename) )
+        comp     = "Gas" if model == HYDRO else "Psi"
+        center   = 0.5*np.asarray( snap.box_size, dtype=np.float64 )
+        with_pot = "Pote" in snap.grid
+        with_par = snap.particle.exists and int( snap.key_info.get("Particle", 1) ) == 1
+        par_dens = next( ( v for v in ("ParDens", "TotalDens") if v in snap.grid ), None )
+        leaf     = snap.leaf_mask()
+
+        fluid    = dict.fromkeys( QUANTITIES[comp], 0.0 )
+        if "MagX" not in snap.grid and comp == "Gas": del fluid["Emag"]
+        par_epot = 0.0
+        for lv in range( snap.nlevel ):
+            start, stop = snap.level_range( lv )
+            for s in range( start, stop, BLOCK_ROWS ):
+                e  = min( s+BLOCK_ROWS, stop )
+                lf = leaf[s:e]
+                if not lf.any(): continue
+                part, pe = _fluid_block( snap, model, lv, slice(s, e), lf, center, with_pot, par_dens )
+                for key, val in part.items(): fluid[key] += val
+                par_epot += pe
+
+        out = { "Time": snap.time, "Step": snap.step }
+        out.update( { "%s_%s"%(key, comp): val for key, val in fluid.items() } )
+
+        if with_par:
+            par         = _particle_totals( snap, center )
+            par["Epot"] = par_epot
+            par["Etot"] = par["Ekin"] + par["Epot"]
+            out.update( { "%s_Par"%key: val for key, val in par.items() } )
+            for key in QUANTITIES["Par"]:
+                out["%s_All"%key] = fluid[key] + par[key]
+
+    return out
+
+def conserved_series( filenames, nproc=1 ):
+    """
+    Compute the conserved quantities of multiple snapshots with a process pool.
+
+    Return a list of dictionaries in the same order as `filenames`.
+    """
+    if nproc > 1 and len(filenames) > 1:
+        with multiprocessing.Pool( nproc ) as pool: return pool.map( conserved_quantities, filenames, chunksize=1 )
+    return [ conserved_quantities(fn) for fn in filenames ]
+
+def write_table( filename, names, results ):
+    """
+    Write the conserved quantities of multiple snapshots as a text table with one snapshot per row.
+
+    names   : list of strings. Label of each snapshot (e.g., the data index).
+    results : list of dictionaries returned by `conserved_quantities()`.
+    """
+    keys = [ k for k in results[0] if k not in ("Time", "Step") ]
+    with open( filename, "w" ) as f:
+        f.write( "#%13s  %13s  %10s"%("Data", "Time", "Step") + "".join( "  %14s"%k for k in keys ) + "\n" )
+        for name, r in zip( names, results ):
+            f.write( " %13s  %13.7e  %10d"%(name, r["Time"], r["Step"]) + "".join( "  % 14.7e"%r.get(k, np.nan) for k in keys ) + "\n" )
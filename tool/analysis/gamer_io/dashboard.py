@@ -0,0 +1,253 @@
+"""
+Live summary of the performance logs of a running simulation.
+
+The logs (Record__Performance, Record__Timing, Record__MemInfo, and Record__LoadBalance) are tailed with the
+incremental parsers in `records.py`, so each refresh only reads the records appended since the last one. Each
+monitored quantity is reduced to its latest value, its mean over the displayed window, and its trend, i.e.,
+the relative change of the median of the last few records with respect to the median of the records before
+them. A trend in the unfavorable direction (e.g., fewer cell updates per second or more memory) larger than
+the alert threshold is flagged.
+
+The summary can be rendered as plain text with sparklines for a terminal or as a static HTML page with inline
+SVG charts, neither of which requires any plotting package.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import html
+import os
+import time
+import numpy as np
+
+from .records import load_record
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+LOGS       = ( "Record__Performance", "Record__Timing", "Record__MemInfo", "Record__LoadBalance" )
+SPARKS     = "▁▂▃▄▅▆▇█"
+NPOINT_SVG = 500   # maximum number of points per SVG chart
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class Dashboard():
+    """
+    Monitored quantities of the logs in a simulation directory.
+
+    Example:
+       dash = Dashboard( "./", window=200 )
+       while True:
+          dash.refresh()
+          print( dash.text() )
+          time.sleep( 10 )
+
+    Each quantity is a dictionary with the keys
+       "group", "name" : log and quantity names
+       "x", "y"        : step and value of the last `window` records
+       "better"        : +1 if larger values are better, -1 otherwise
+       "last", "mean"  : latest value and mean over the window
+       "trend"         : relative change of the median of the last `nrecent` records with respect to the
+                         median of the previous records in the window
+       "alert"         : whether the trend is unfavorable and exceeds `alert`
+    """
+    def __init__( self, path=".", window=200, nrecent=10, alert=0.2, cache=False ):
+        """
+        path    : string. Directory of the logs.
+        window  : int. Number of the latest records shown.
+        nrecent : int. Number of the latest records compared with the rest of the window for the trend.
+        alert   : float. Relative change flagged as an alert (e.g., 0.2 for 20%).
+        cache   : bool. Resume from and update the sidecar caches of the parsers.
+        """
+        self.path    = path
+        self.window  = int( window )
+        self.nrecent = int( nrecent )
+        self.alert   = float( alert )
+        self.cache   = cache
+        self.records = {}
+        self.stamp   = None
+
+    def refresh( self ):
+        """
+        Parse the records appended to each log since the last call. Return the number of new records.
+        """
+        nnew = 0
+        for log in LOGS:
+            filename = os.path.join( self.path, log )
+            if not os.path.isfile( filename ): continue
+            if log not in self.records:
+                self.records[log] = load_record( filename, cache=self.cache )
+                nnew += len( self.records[log] )
+            else:
+                n     = self.records[log].update()
+                nnew += n
+                if self.cache and n > 0: self.records[log].save()
+        self.stamp = time.strftime( "%Y-%m-%d %H:%M:%S" )
+        return nnew
+
+    def _quantity( self, group, name, x, y, better ):
+        x, y   = np.asarray( x, dtype=np.float64 )[-self.window:], np.asarray( y, dtype=np.float64 )[-self.window:]
+        finite = np.isfinite( y )
+        q      = { "group": group, "name": name, "x": x, "y": y, "better": better,
+                   "last": y[-1] if y.size > 0 else np.nan,
+                   "mean": y[finite].mean() if finite.any() else np.nan,
+                   "trend": np.nan, "alert": False }
+
+        recent, before = y[-self.nrecent:], y[:-self.nrecent]
+        recent, before = recent[ np.isfinite(recent) ], before[ np.isfinite(before) ]
+        if recent.size > 0 and before.size > 0 and np.median( before ) != 0.0:
+            q["trend"] = np.median( recent )/np.median( before ) - 1.0
+            q["alert"] = bool( -better*q["trend"] > self.alert )
+        return q
+
+    def quantities( self ):
+        """
+        Return the list of monitored quantities (see the class description).
+        """
+        out = []
+
+        perf = self.records.get( "Record__Performance" )
+        if perf is not None and len(perf) > 0:
+            g, x = "Record__Performance", perf["Step"]
+            out.append( self._quantity( g, "Cell updates/s", x, perf["Perf_Overall"], +1 ) )
+            if "ParPerf_Overall" in perf:
+                out.append( self._quantity( g, "Particle updates/s", x, perf["ParPerf_Overall"], +1 ) )
+            out.append( self._quantity( g, "ElapsedTime [s]", x, perf["ElapsedTime"], -1 ) )
+            for key in perf.keys():
+                if key.startswith( "NUpdate_Lv" ): out.append( self._quantity( g, key, x, perf[key], -1 ) )
+
+        timing = self.records.get( "Record__Timing" )
+        if timing is not None and len(timing) > 0:
+            key = "Main Loop/Total" if "Main Loop/Total" in timing else "Main Loop/Max/Total"
+            if key in timing:
+                out.append( self._quantity( "Record__Timing", "Step time [s]", timing["Step"], timing[key], -1 ) )
+
+        mem = self.records.get( "Record__MemInfo" )
+        if mem is not None and len(mem) > 0:
+            for key in ( "Phy_Max", "Phy_Sum" ):
+                if key in mem: out.append( self._quantity( "Record__MemInfo", key+" [MB]", mem["Step"], mem[key], -1 ) )
+
+        lb = self.records.get( "Record__LoadBalance" )
+        if lb is not None and len(lb) > 0:
+            x = lb["Step"]
+            if "WLI" in lb: out.append( self._quantity( "Record__LoadBalance", "WLI [%]", x, lb["WLI"], -1 ) )
+            if "Imb" in lb:
+                imb = lb["Imb"]
+                for lv in range( imb.shape[1] ):
+                    out.append( self._quantity( "Record__LoadBalance", "Imb_Lv%d [%%]"%lv, x, imb[:, lv], -1 ) )
+        return out
+
+    def breakdown( self ):
+        """
+        Return [(section, seconds, fraction)] of the latest step in Record__Timing sorted by time, or an empty list.
+        """
+        timing = self.records.get( "Record__Timing" )
+        if timing is None or len(timing) == 0: return []
+        prefix = "Summary/Time/" if "Summary/Time/Sum" in timing else "Summary/Max Time/"
+        block  = timing.blocks[-1]
+        items  = [ (k[len(prefix):], v) for k, v in block.items()
+                   if k.startswith( prefix ) and k != prefix+"Sum" and "-" not in k[len(prefix):] ]
+        total  = sum( v for _, v in items )
+        if total <= 0.0: return []
+        return sorted( ( (k, v, v/total) for k, v in items ), key=lambda t: -t[1] )
+
+    def text( self, width=40, nbreakdown=8 ):
+        """
+        Render the dashboard as plain text with sparklines of `width` characters.
+        """
+        lines = [ "GAMER dashboard : %s   (%s)"%( os.path.abspath(self.path), self.stamp ) ]
+        if len(self.records) == 0: lines.append( "   no log found" )
+        group = None
+        for q in self.quantities():
+            if q["group"] != group:
+                group = q["group"]
+                rec   = self.records[group]
+                lines.append( "" )
+                lines.append( "%s (%d records)"%( group, len(rec) ) )
+            lines.append( "   %-20s %-*s  last %10.3e  mean %10.3e  trend %s%s"%(
+                          q["name"], width, sparkline( q["y"], width ), q["last"], q["mean"],
+                          "%+7.1f%%"%(100.0*q["trend"]) if np.isfinite(q["trend"]) else "    n/a",
+                          "  << ALERT" if q["alert"] else "" ) )
+
+        items = self.breakdown()
+        if items:
+            lines.append( "" )
+            lines.append( "Record__Timing breakdown of step %d"%self.records["Record__Timing"]["Step"][-1] )
+            for name, sec, frac in items[:nbreakdown]:
+                lines.append( "   %-20s %-*s  %10.3e s  %5.1f%%"%( name, width, "█"*int( round(frac*width) ),
+                                                                  sec, 100.0*frac ) )
+        return "\n".join( lines )
+
+    def html( self, refresh=None ):
+        """
+        Render the dashboard as a static HTML page with inline SVG charts. The page reloads itself every
+        `refresh` seconds if set.
+        """
+        head = '<meta http-equiv="refresh" content="%d">'%refresh if refresh else ""
+        body = [ "<h2>GAMER dashboard : %s</h2><p>%s</p>"%( html.escape(os.path.abspath(self.path)), self.stamp ) ]
+        group = None
+        for q in self.quantities():
+            if q["group"] != group:
+                if group is not None: body.append( "</table>" )
+                group = q["group"]
+                body.append( "<h3>%s (%d records)</h3><table>"%( group, len(self.records[group]) ) )
+            trend = "%+.1f%%"%(100.0*q["trend"]) if np.isfinite(q["trend"]) else "n/a"
+            body.append( '<tr%s><td>%s</td><td>%s</td><td>last %.3e</td><td>mean %.3e</td><td>trend %s</td></tr>'%(
+                         ' class="alert"' if q["alert"] else "", html.escape(q["name"]), svg_chart( q["x"], q["y"] ),
+                         q["last"], q["mean"], trend ) )
+        if group is not None: body.append( "</table>" )
+
+        items = self.breakdown()
+        if items:
+            body.append( "<h3>Record__Timing breakdown of step %d</h3><table>"%self.records["Record__Timing"]["Step"][-1] )
+            for name, sec, frac in items:
+                body.append( '<tr><td>%s</td><td><svg width="300" height="12"><rect width="%.1f" height="12" '
+                             'fill="steelblue"/></svg></td><td>%.3e s</td><td>%.1f%%</td></tr>'%(
+                             html.escape(name), 300.0*frac, sec, 100.0*frac ) )
+            body.append( "</table>" )
+
+        style = "body{font-family:monospace} td{padding:0 8px} tr.alert{background:#fdd}"
+        return "<!DOCTYPE html><html><head><meta charset=\"utf-8\">%s<title>GAMER dashboard</title>" \
+               "<style>%s</style></head><body>%s</body></html>\n"%( head, style, "\n".join(body) )
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def sparkline( y, width=40 ):
+    """
+    Render the finite values of `y` as a string of at most `width` block characters. The values are averaged
+    in `width` bins if there are more of them.
+    """
+    y = np.asarray( y, dtype=np.float64 )
+    y = y[ np.isfinite(y) ]
+    if y.size == 0: return ""
+    if y.size > width: y = np.array( [ b.mean() for b in np.array_split(y, width) ] )
+    lo, hi = y.min(), y.max()
+    level  = np.zeros( y.size, dtype=int ) if hi == lo else np.rint( (y-lo)/(hi-lo)*(len(SPARKS)-1) ).astype( int )
+    return "".join( SPARKS[i] for i in level )
+
+def svg_chart( x, y, width=300, height=40 ):
+    """
+    Render (x, y) as an inline SVG polyline, keeping at most `NPOINT_SVG` points.
+    """
+    x, y = np.asarray( x, dtype=np.float64 ), np.asarray( y, dtype=np.float64 )
+    good = np.isfinite( x ) & np.isfinite( y )
+    x, y = x[good], y[good]
+    if x.size > NPOINT_SVG:
+        stride = -( -x.size//NPOINT_SVG )
+        x, y   = x[::stride], y[::stride]
+    if x.size == 0: return ""
+
+    def scale( v, n ):
+        return np.full( v.size, 0.5*n ) if v.max() == v.min() else ( v - v.min() )/( v.max() - v.min() )*n
+
+    px, py = scale( x, width-2 ) + 1, height - 1 - scale( y, height-2 )
+    points = " ".join( "%.1f,%.1f"%p for p in zip( px, py ) )
+    return '<svg width="%d" height="%d"><polyline points="%s" fill="none" stroke="steelblue"/></svg>'%(
+           width, height, points )
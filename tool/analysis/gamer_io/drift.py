@@ -0,0 +1,271 @@
+"""
+Streaming monitor of the conservation errors in Record__Conservation.
+
+For each conserved quantity (e.g., Mass_Gas, MomX_All, or Etot_All), the relative error (or the absolute error
+if the reference value is zero) is reduced to
+   * the rolling drift rate, i.e., the least-squares slope of the error versus time over the latest `window`
+     records, computed from cumulative sums,
+   * the overall drift rate, i.e., the least-squares slope over all records, accumulated from running sums,
+   * jumps, i.e., changes of the error between two records deviating from the median change of the previous
+     `window` records by more than `nsigma` robust standard deviations (1.4826 times the median absolute
+     deviation). A jump against the direction of the local drift (i.e., the mean change of the previous
+     `window` records, if it is significant) makes the error non-monotonic.
+
+Refinement events are the records in Record__Performance where NCell changes by more than a given fraction. A
+jump is attributed to refinement if a refinement event falls between the previous record and the jumping one,
+and the number of these jumps is compared with the number expected by chance from the fraction of records with
+refinement events.
+
+Only the rows appended since the last refresh are processed: the logs are tailed with the incremental parsers
+in `records.py`, and only the latest `window`+1 records are kept for the rolling statistics.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import os
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .records import load_record
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+SUFFIX_REL = "_RErr"
+SUFFIX_ABS = "_AErr"
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class DriftMonitor():
+    """
+    Drift rates and jumps of the conservation errors of a run.
+
+    Example:
+       mon = DriftMonitor( "./", window=50 )
+       while True:
+          for jump in mon.refresh(): print( jump )
+          time.sleep( 60 )
+
+    Attributes:
+       quantities : list of the monitored quantities (e.g., "Mass_Gas")
+       columns    : dictionary of the error column of each quantity (e.g., "Mass_Gas_RErr")
+       jumps      : list of all jumps found so far, each a dictionary with the keys "Quantity", "Step", "Time",
+                    "Jump" (change of the error), "Sigma" (deviation in robust standard deviations), "Against"
+                    (whether the jump is against the local drift), and "Refine" (whether a refinement event
+                    falls between the previous record and this one)
+    """
+    def __init__( self, path=".", quantities=None, window=50, nsigma=8.0, refine=0.01, cache=False ):
+        """
+        path       : string. Directory of the logs.
+        quantities : list of strings. Quantities to monitor. Default is all quantities with an error column.
+        window     : int. Number of records of the rolling statistics.
+        nsigma     : float. Threshold of jumps in robust standard deviations.
+        refine     : float. Relative change of NCell in Record__Performance counted as a refinement event.
+        cache      : bool. Resume from and update the sidecar caches of the parsers.
+        """
+        if window < 3:   raise ValueError( "window (%d) < 3"%window )
+        self.path       = path
+        self.select     = quantities
+        self.window     = int( window )
+        self.nsigma     = float( nsigma )
+        self.refine     = float( refine )
+        self.cache      = cache
+        self.cons       = None
+        self.perf       = None
+        self.quantities = []
+        self.columns    = {}
+        self.jumps      = []
+        self.nrow       = 0                      # rows of Record__Conservation already processed
+        self.last_step  = None
+        self.buf        = { "Time": np.empty(0), "Step": np.empty(0, dtype=np.int64) }   # latest window+1 records
+        self.sums       = {}                     # running sums of the overall least-squares slope
+        self.rate       = {}                     # latest rolling drift rate
+        self.nrefine    = 0                      # refinement events and records checked for them
+        self.nchecked   = 0
+        self.refine_steps = np.empty( 0, dtype=np.int64 )
+        self.nperf      = 0
+
+    def _open( self, name ):
+        filename = os.path.join( self.path, name )
+        return load_record( filename, cache=self.cache ) if os.path.isfile( filename ) else None
+
+    def _update( self, rec ):
+        n = rec.update()
+        if self.cache and n > 0: rec.save()
+
+    def _setup( self ):
+        """
+        Choose the quantities and their error columns from the first records.
+        """
+        keys  = self.cons.keys()
+        names = [ k[:-len(SUFFIX_ABS)] for k in keys if k.endswith(SUFFIX_ABS) ]
+        if self.select is not None:
+            missing = [ q for q in self.select if q not in names ]
+            if missing:   raise KeyError( "quantities %s are not found in Record__Conservation"%missing )
+            names = list( self.select )
+
+        for q in names:
+            rel = q + SUFFIX_REL
+            ref = self.cons[q][0] - self.cons[q+SUFFIX_ABS][0] if q in self.cons else 0.0
+            self.columns[q] = rel if rel in self.cons  and  ref != 0.0 else q + SUFFIX_ABS
+            self.buf[q]     = np.empty( 0 )
+            self.sums[q]    = np.zeros( 6 )   # n, sum x, sum y, sum xx, sum xy, time offset
+            self.rate[q]    = np.nan
+        self.quantities = names
+
+    def _refinement( self ):
+        """
+        Append the steps with refinement events recorded in Record__Performance since the last call.
+        """
+        if self.perf is None: self.perf = self._open( "Record__Performance" )
+        else:                 self._update( self.perf )
+        if self.perf is None  or  len( self.perf ) <= self.nperf: return
+
+        lo    = max( self.nperf-1, 0 )
+        ncell = np.asarray( self.perf["NCell"][lo:], dtype=np.float64 )
+        step  = self.perf["Step"][lo:]
+        with np.errstate( invalid="ignore", divide="ignore" ):
+            change = np.abs( np.diff(ncell) )/ncell[:-1]
+        event = change > self.refine
+        self.refine_steps = np.concatenate( ( self.refine_steps, step[1:][event] ) )
+        self.nperf        = len( self.perf )
+
+    def refresh( self ):
+        """
+        Process the records appended since the last call. Return the list of new jumps.
+        """
+        if self.cons is None:
+            self.cons = self._open( "Record__Conservation" )
+            if self.cons is None: return []
+        else:
+            self._update( self.cons )
+        if len( self.cons ) <= self.nrow: return []
+        if not self.quantities: self._setup()
+        self._refinement()
+
+        time = self.cons["Time"][self.nrow:].astype( np.float64 )
+        step = self.cons["Step"][self.nrow:]
+        new  = []
+
+#       split at restarts (non-increasing steps), where the rolling statistics start over
+        prev   = np.concatenate( ( [self.last_step if self.last_step is not None else step[0]-1], step[:-1] ) )
+        starts = np.concatenate( ( [0], np.where( step <= prev )[0] ) )
+        starts = np.unique( starts )
+        for s, e in zip( starts, np.append( starts[1:], step.size ) ):
+            if s > 0  or  ( self.last_step is not None  and  step[0] <= self.last_step ):
+                self.buf = { k: v[:0] for k, v in self.buf.items() }
+            new += self._process( time[s:e], step[s:e], { q: self.cons[self.columns[q]][self.nrow+s:self.nrow+e] for q in self.quantities } )
+
+        self.nrow      = len( self.cons )
+        self.last_step = step[-1]
+        self.jumps    += new
+        return new
+
+    def _process( self, time, step, err ):
+        """
+        Rolling statistics and jumps of a chunk of records without restarts.
+        """
+        nbuf = self.buf["Time"].size
+        x    = np.concatenate( ( self.buf["Time"], time ) )
+        s    = np.concatenate( ( self.buf["Step"], step ) )
+        w    = self.window
+        new  = []
+
+#       refinement events between consecutive records
+        is_ref = np.zeros( s.size, dtype=bool )
+        if s.size > 1:
+            lo         = np.searchsorted( self.refine_steps, s[:-1], side="right" )
+            hi         = np.searchsorted( self.refine_steps, s[1:],  side="right" )
+            is_ref[1:] = hi > lo
+        lo             = max( nbuf, 1 )   # new records with a previous one
+        self.nchecked += max( s.size-lo, 0 )
+        self.nrefine  += int( is_ref[lo:].sum() )
+
+        for q in self.quantities:
+            y = np.concatenate( ( self.buf[q], np.asarray( err[q], dtype=np.float64 ) ) )
+
+#           overall slope from running sums (relative to the first time for accuracy)
+            sm = self.sums[q]
+            if sm[0] == 0: sm[5] = time[0]
+            xt = time - sm[5]
+            yt = np.asarray( err[q], dtype=np.float64 )
+            ok = np.isfinite( yt )
+            sm[:5] += ( ok.sum(), xt[ok].sum(), yt[ok].sum(), (xt[ok]**2).sum(), (xt[ok]*yt[ok]).sum() )
+
+#           rolling slope over the latest window
+            if y.size >= w:
+                self.rate[q] = _slope( x[-w:], y[-w:] )
+
+#           jumps of the new increments with a full window of previous increments
+            d     = np.diff( y )
+            first = max( w, nbuf-1 )   # index in d of the first new increment with a full window
+            if d.size > first:
+                view = sliding_window_view( d[:-1], w )[ first-w: ]
+                cur  = d[first:]
+                med  = np.median( view, axis=1 )
+                sig  = 1.4826*np.median( np.abs( view - med[:,None] ), axis=1 )
+                with np.errstate( invalid="ignore", divide="ignore" ):
+                    dev = np.abs( cur - med )/sig
+                flag = np.where( sig > 0.0, dev > self.nsigma, np.abs(cur - med) > 0.0 )
+                for j in np.where( flag & np.isfinite(cur) )[0]:
+                    i     = first + j + 1   # index in x of the record after the jump
+                    drift = view[j].mean()  # only trusted if it exceeds twice its noise
+                    new.append( { "Quantity": q, "Step": int(s[i]), "Time": x[i], "Jump": cur[j], "Sigma": dev[j],
+                                  "Against": bool( abs(drift) > 2.0*sig[j]/np.sqrt(w)  and  np.sign(cur[j]) != np.sign(drift) ),
+                                  "Refine": bool( is_ref[i] ) } )
+            self.buf[q] = y[-(w+1):]
+
+        self.buf["Time"], self.buf["Step"] = x[-(w+1):], s[-(w+1):]
+        new.sort( key=lambda j: (j["Step"], j["Quantity"]) )
+        return new
+
+    def overall_rate( self, q ):
+        """
+        Least-squares slope of the error of quantity `q` versus time over all processed records.
+        """
+        n, sx, sy, sxx, sxy, _ = self.sums[q]
+        den = n*sxx - sx*sx
+        return ( n*sxy - sx*sy )/den if n >= 2  and  den > 0.0 else np.nan
+
+    def summary( self ):
+        """
+        Return a dictionary of the statistics of each quantity:
+           "Column"      : error column
+           "Latest"      : latest error
+           "MaxAbs"      : maximum absolute error
+           "Rate"        : overall drift rate (error per unit time)
+           "RollingRate" : drift rate over the latest `window` records
+           "NJump"       : number of jumps
+           "NAgainst"    : number of jumps against the local drift
+           "NRefine"     : number of jumps attributed to refinement
+           "Expected"    : number of jumps expected at refinement events by chance
+        """
+        frac = self.nrefine/self.nchecked if self.nchecked > 0 else 0.0
+        out  = {}
+        for q in self.quantities:
+            col   = self.cons[ self.columns[q] ]
+            jumps = [ j for j in self.jumps if j["Quantity"] == q ]
+            out[q] = { "Column": self.columns[q], "Latest": col[-1], "MaxAbs": np.nanmax( np.abs(col) ),
+                       "Rate": self.overall_rate( q ), "RollingRate": self.rate[q], "NJump": len( jumps ),
+                       "NAgainst": sum( j["Against"] for j in jumps ), "NRefine": sum( j["Refine"] for j in jumps ),
+                       "Expected": frac*len( jumps ) }
+        return out
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def _slope( x, y ):
+    """
+    Least-squares slope of the finite pairs of (x, y) (NaN if there are fewer than two).
+    """
+    ok = np.isfinite( x ) & np.isfinite( y )
+    x, y = x[ok], y[ok]
+    if x.size < 2  or  np.ptp( x ) == 0.0: return np.nan
+    xm = x - x.mean()
+    return ( xm*(y - y.mean()) ).sum()/( xm**2 ).sum()
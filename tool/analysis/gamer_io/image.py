@@ -0,0 +1,140 @@
+"""
+Axis-aligned slices and projections of GAMER HDF5 snapshots rendered as RGB images.
+
+The image is computed from the uniform grid on a target level (see `resample.py`), which is generated slab by
+slab along z so that only one slab is kept in memory at a time. A slice along z only resamples the slab
+containing the slice. The image axes follow yt: (x, y) for the z axis, (y, z) for the x axis, and (z, x) for
+the y axis, and the first image row is the bottom of the figure.
+
+Colormaps other than "gray" require matplotlib.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import warnings
+import numpy as np
+
+from .resample import auto_slab_size, resample_slab, slab_ranges, uniform_dims
+
+try:
+    import matplotlib
+except ImportError:
+    matplotlib = None
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+MAX_MEM = 256*1024**2   # approximate memory per slab in bytes
+AXES    = { "x": ("y", "z"), "y": ("z", "x"), "z": ("x", "y") }   # image (horizontal, vertical) axes
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def _orient( img, axis ):
+    """
+    Convert an image assembled in the [z][*] or [y][x] slab order to [vertical][horizontal].
+    """
+    return img.T if axis == "y" else img
+
+def field_image( snap, index, field, lv, axis="z", mode="slice", coord=None, weight=None, max_mem=MAX_MEM,
+                 fine="restrict" ):
+    """
+    Compute a slice or a projection of a field on the uniform grid of level `lv`.
+
+    snap   : gamer_io.Snapshot.
+    index  : gamer_io.PatchIndex of the snapshot.
+    field  : string. Target field in GridData.
+    axis   : "x", "y", or "z".
+    mode   : "slice" or "proj".
+    coord  : float. Slice coordinate along `axis`. Default is the box center.
+    weight : string. Weighting field of the projection, or None for the integral along `axis`.
+    max_mem: int. Approximate memory per slab in bytes.
+
+    Return a 2D float64 array [vertical][horizontal] (see `AXES`).
+    """
+    if axis not in AXES:                raise ValueError( "unknown axis \"%s\""%axis )
+    if mode not in ( "slice", "proj" ): raise ValueError( "unknown mode \"%s\""%mode )
+
+    ps         = snap.patch_size
+    dims       = uniform_dims( snap, lv )
+    nx, ny, nz = [ int(n) for n in dims ]
+    dh         = snap.cell_size[lv]
+    d          = "xyz".index( axis )
+
+    if mode == "slice":
+        if coord is None: coord = 0.5*snap.box_size[d]
+        i = min( max( int(coord/dh), 0 ), dims[d]-1 )
+        if axis == "z":
+            zs = i//ps*ps
+            return resample_slab( snap, index, field, lv, (zs, min(zs+ps, nz)), fine )[i-zs].astype( np.float64 )
+        slabs = slab_ranges( snap, lv, auto_slab_size(snap, lv, field, max_mem) )
+    else:
+        slabs = slab_ranges( snap, lv, auto_slab_size(snap, lv, field, max_mem)//( 1 if weight is None else 2 ) )
+
+    img  = np.zeros( (ny, nx) if axis == "z" else ( (nz, ny) if axis == "x" else (nz, nx) ) )
+    wsum = np.zeros_like( img ) if weight is not None else None
+    for zs, ze in slabs:
+        data = resample_slab( snap, index, field, lv, (zs, ze), fine )
+        if mode == "slice":
+            img[zs:ze] = data[:, :, i] if axis == "x" else data[:, i, :]
+            continue
+
+        w   = None if weight is None else resample_slab( snap, index, weight, lv, (zs, ze), fine ).astype( np.float64 )
+        fw  = data if w is None else data*w
+        sub = slice( None ) if axis == "z" else slice( zs, ze )
+        img[sub] += np.sum( fw, axis=2-d, dtype=np.float64 )
+        if w is not None: wsum[sub] += np.sum( w, axis=2-d )
+
+    if mode == "proj":
+        if weight is None:
+            img *= dh
+        else:
+            with np.errstate( invalid="ignore", divide="ignore" ): img /= wsum
+    return _orient( img, axis )
+
+def colormap_lut( cmap ):
+    """
+    Return the [256][3] uint8 lookup table of a colormap. Fall back to "gray" if matplotlib is not available.
+    """
+    if cmap != "gray" and matplotlib is None:
+        warnings.warn( "matplotlib is not available --> colormap \"%s\" is replaced by \"gray\""%cmap )
+        cmap = "gray"
+    if cmap == "gray":
+        return np.repeat( np.arange(256, dtype=np.uint8)[:,None], 3, axis=1 )
+    return np.rint( matplotlib.colormaps[cmap]( np.linspace(0.0, 1.0, 256) )[:,:3]*255.0 ).astype( np.uint8 )
+
+def auto_zlim( img, log=True ):
+    """
+    Return the (min, max) of the finite (and positive if `log`) values of an image.
+    """
+    v = img[ np.isfinite(img) & ( img > 0.0 if log else True ) ]
+    if v.size == 0: return ( 1.0, 10.0 ) if log else ( 0.0, 1.0 )
+    return float( v.min() ), float( v.max() )
+
+def to_rgb( img, zlim, log=True, lut=None, zoom=1 ):
+    """
+    Map an image to RGB colors.
+
+    img  : 2D array [vertical][horizontal] returned by `field_image()`.
+    zlim : (float, float). Data values mapped to the two ends of the colormap.
+    log  : bool. Logarithmic color scale.
+    lut  : [256][3] uint8 array returned by `colormap_lut()`. Default is "gray".
+    zoom : int. Each cell is drawn as zoom*zoom pixels.
+
+    Return a C-contiguous uint8 array [height][width][3] with the top row first, which can be written to
+    ffmpeg as a rawvideo frame with pix_fmt=rgb24.
+    """
+    if lut is None: lut = colormap_lut( "gray" )
+    lo, hi = zlim
+    data   = img
+    with np.errstate( invalid="ignore", divide="ignore" ):
+        if log: data, lo, hi = np.log10( img ), np.log10( lo ), np.log10( hi )
+        t = ( data - lo )/( hi - lo ) if hi != lo else np.zeros_like( data )
+    t   = np.nan_to_num( np.clip( t, 0.0, 1.0 ), nan=0.0 )
+    rgb = lut[ np.rint( t[::-1]*255.0 ).astype( np.intp ) ]
+    if zoom > 1: rgb = np.repeat( np.repeat( rgb, zoom, axis=0 ), zoom, axis=1 )
+    return np.ascontiguousarray( rgb )
@@ -0,0 +1,126 @@
+"""
+Load-imbalance analysis of Record__LoadBalance (or Record__PatchCount and Record__ParticleCount).
+
+The per-rank and per-level workloads of all records form a tensor load[record][rank][level] (see
+`RecordBlocks`). GAMER advances the levels one by one, and all ranks wait for the slowest one on each level, so
+the time of a step is assumed to be proportional to sum_lv max_rank load. The weighted load-imbalance (WLI)
+factor is then
+
+   WLI = ( sum_lv Max_lv - sum_lv Ave_lv )/sum_lv Ave_lv,
+
+and the contribution of a level to WLI is (Max_lv - Ave_lv)/sum_lv Ave_lv. As in LB_EstimateLoadImbalance.cpp, the
+load of each level is weighted by the number of its updates in a root-level step (NUpdateLv). Record__LoadBalance
+is already weighted, while Record__PatchCount and Record__ParticleCount are weighted by `weight_levels()`.
+
+A fraction WLI/(1+WLI) of each step is spent waiting for the slowest rank, which gives an estimate of the wall
+time lost to load imbalance when combined with the ElapsedTime in Record__Performance.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import numpy as np
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def weight_levels( load, nupdate ):
+    """
+    Weight the per-level load by the number of updates of each level in a root-level step.
+
+    load    : [NRecord][NRank][NLevel] array.
+    nupdate : [NRecord][NLevel] or [NLevel] array. NUpdateLv (e.g., NUpdate_Lv* in Record__Performance).
+
+    Return the weighted [NRecord][NRank][NLevel] array.
+    """
+    nupdate = np.asarray( nupdate, dtype=np.float64 )
+    return np.asarray( load, dtype=np.float64 )*np.expand_dims( nupdate, axis=-2 )
+
+def level_imbalance( load ):
+    """
+    Per-level imbalance of a load tensor.
+
+    load : [NRecord][NRank][NLevel] array. Missing ranks (e.g., after restarting with fewer ranks) are NaN.
+
+    Return a dictionary of
+       "Ave", "Max"    : [NRecord][NLevel] average and maximum load over ranks
+       "Imb"           : [NRecord][NLevel] (Max-Ave)/Ave of each level
+       "Contribution"  : [NRecord][NLevel] contribution of each level to WLI
+       "WLI"           : [NRecord] weighted load-imbalance factor
+    """
+    load = np.asarray( load, dtype=np.float64 )
+    with np.errstate( invalid="ignore", divide="ignore" ):
+        ave  = np.nanmean( load, axis=1 )
+        vmax = np.nanmax ( load, axis=1 )
+        tot  = ave.sum( axis=1 )
+        imb  = np.where( ave > 0.0, (vmax-ave)/ave, 0.0 )
+        cont = np.where( tot[:,None] > 0.0, (vmax-ave)/tot[:,None], 0.0 )
+    return { "Ave": ave, "Max": vmax, "Imb": imb, "Contribution": cont, "WLI": cont.sum( axis=1 ) }
+
+def rank_imbalance( load, threshold=0.05 ):
+    """
+    Per-rank excess load over all records.
+
+    load      : [NRecord][NRank][NLevel] array.
+    threshold : float. A rank is overloaded in a record if its total load exceeds the average by this fraction.
+
+    Return a dictionary of
+       "Excess"     : [NRecord][NRank] total load of each rank relative to the average minus one
+       "MeanExcess" : [NRank] mean of "Excess" over the records in which the rank exists
+       "FracOver"   : [NRank] fraction of these records in which the rank is overloaded
+       "NMax"       : [NRank][NLevel] number of records in which the rank has the maximum load of a level
+    """
+    load  = np.asarray( load, dtype=np.float64 )
+    exist = np.isfinite( load ).any( axis=2 )
+    total = np.where( exist, np.nansum( load, axis=2 ), np.nan )
+    with np.errstate( invalid="ignore", divide="ignore" ):
+        ave    = np.nanmean( total, axis=1 )
+        excess = total/ave[:,None] - 1.0
+    nexist = exist.sum( axis=0 )
+    over   = ( np.nan_to_num( excess, nan=-np.inf ) > threshold ).sum( axis=0 )
+
+    nrank, nlv = load.shape[1], load.shape[2]
+    nmax       = np.zeros( (nrank, nlv), dtype=np.int64 )
+    busy       = np.isfinite( load ).any( axis=1 ) & ( np.nan_to_num( load, nan=0.0 ).max( axis=1 ) > 0.0 )
+    imax       = np.argmax( np.nan_to_num( load, nan=-np.inf ), axis=1 )   # [NRecord][NLevel]
+    for lv in range( nlv ):
+        nmax[:, lv] = np.bincount( imax[busy[:, lv], lv], minlength=nrank )
+
+    with np.errstate( invalid="ignore", divide="ignore" ):
+        return { "Excess": excess, "MeanExcess": np.nansum( excess, axis=0 )/nexist,
+                 "FracOver": over/nexist, "NMax": nmax }
+
+def hold( x_src, y_src, x_dst ):
+    """
+    Values of a sparsely recorded quantity (e.g., WLI, which is recorded only when the load balance is checked)
+    at `x_dst`, taken from the last record with x_src <= x_dst (NaN before the first record).
+    """
+    x_src, y_src = np.asarray( x_src, dtype=np.float64 ), np.asarray( y_src, dtype=np.float64 )
+    order        = np.argsort( x_src, kind="stable" )
+    idx          = np.searchsorted( x_src[order], np.asarray(x_dst, dtype=np.float64), side="right" ) - 1
+    return np.where( idx >= 0, y_src[order][ np.maximum(idx, 0) ], np.nan )
+
+def correlation( x, y ):
+    """
+    Pearson and Spearman correlation coefficients of the finite pairs of (x, y). Return (NaN, NaN) if there are
+    fewer than three pairs or either one is constant.
+    """
+    x, y = np.asarray( x, dtype=np.float64 ), np.asarray( y, dtype=np.float64 )
+    good = np.isfinite( x ) & np.isfinite( y )
+    x, y = x[good], y[good]
+    if x.size < 3  or  np.ptp( x ) == 0.0  or  np.ptp( y ) == 0.0: return np.nan, np.nan
+
+    def ranks( v ):
+#       average ranks of ties
+        uniq, inv, cnt = np.unique( v, return_inverse=True, return_counts=True )
+        return ( np.cumsum( cnt ) - 0.5*(cnt-1) )[inv]
+
+    return np.corrcoef( x, y )[0, 1], np.corrcoef( ranks(x), ranks(y) )[0, 1]
+
+def lost_time( elapsed, wli ):
+    """
+    Wall time lost to load imbalance in each step, elapsed*WLI/(1+WLI). Steps without WLI count as zero.
+    """
+    wli = np.nan_to_num( np.asarray( wli, dtype=np.float64 ), nan=0.0 )
+    return np.asarray( elapsed, dtype=np.float64 )*wli/( 1.0 + wli )
@@ -0,0 +1,138 @@
+"""
+Lazy access to the datasets stored in a GAMER HDF5 snapshot.
+
+Nothing is read from disk until a slice is requested. Contiguous and unfiltered datasets are
+memory-mapped directly so that slicing them returns views without copying.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import numpy as np
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def contiguous_runs( rows ):
+    """
+    Split a sorted array of unique row indices into contiguous runs.
+
+    rows : 1D integer array. Sorted and unique row indices.
+
+    Return the start (inclusive) and stop (exclusive) index of each run.
+    """
+    rows = np.asarray( rows, dtype=np.int64 )
+    if rows.size == 0: return np.empty( 0, dtype=np.int64 ), np.empty( 0, dtype=np.int64 )
+
+    brk   = np.flatnonzero( np.diff(rows) != 1 ) + 1
+    start = rows[ np.concatenate( ([0], brk) ) ]
+    stop  = rows[ np.concatenate( (brk-1, [rows.size-1]) ) ] + 1
+    return start, stop
+
+def memmap_dataset( dset ):
+    """
+    Memory-map an h5py dataset if HDF5 stores it as a single contiguous block.
+
+    Return None if the dataset is chunked, filtered, compact, empty, or not a plain numeric array.
+    """
+    if dset.chunks is not None or dset.compression is not None: return None
+    if dset.dtype.kind not in "biuf":                          return None
+    if dset.size == 0:                                         return None
+    if dset.file.driver not in ("sec2", "stdio"):              return None
+
+    offset = dset.id.get_offset()
+    if offset is None: return None
+
+    return np.memmap( dset.file.filename, dtype=dset.dtype, mode="r", offset=offset, shape=dset.shape )
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class LazyArray():
+    """
+    Array-like wrapper of an h5py dataset that reads data only on demand.
+
+    Basic slicing is forwarded to the memory map (if available) or to h5py. An array of row indices
+    is allowed to be unsorted and to contain duplicates, and it is read as a few contiguous hyperslabs.
+    """
+    def __init__( self, dset, use_mmap=True ):
+        """
+        dset     : h5py.Dataset. The target dataset.
+        use_mmap : bool. Whether or not to memory-map the dataset when possible.
+        """
+        self.dset  = dset
+        self.name  = dset.name
+        self.shape = dset.shape
+        self.dtype = dset.dtype
+        self._mmap = memmap_dataset( dset ) if use_mmap else None
+
+    def __len__( self ):
+        return self.shape[0]
+
+    def __repr__( self ):
+        return "<LazyArray %s: shape %s, type \"%s\", %s>"%(self.name, self.shape, self.dtype,
+                                                              "memory-mapped" if self.is_mapped else "on demand")
+
+    def __array__( self, dtype=None, copy=None ):
+        data = self[...]
+        return np.asarray( data, dtype=dtype )
+
+    @property
+    def is_mapped( self ):
+        return self._mmap is not None
+
+    @property
+    def chunks( self ):
+        return self.dset.chunks
+
+    def __getitem__( self, key ):
+        if isinstance( key, (list, np.ndarray) ): return self.take( key )
+        if isinstance( key, tuple ) and len(key) > 0 and isinstance( key[0], (list, np.ndarray) ):
+            return self.take( key[0] )[ (slice(None),) + key[1:] ]
+
+        if self._mmap is not None: return self._mmap[key]
+        return self.dset[key]
+
+    def take( self, rows ):
+        """
+        Read the given rows along the first axis.
+
+        rows : 1D integer or boolean array.
+        """
+        rows = np.asarray( rows )
+        if rows.dtype == bool: rows = np.flatnonzero( rows )
+        rows = rows.astype( np.int64, copy=False )
+        if rows.size > 0 and ( rows.min() < 0 or rows.max() >= self.shape[0] ):
+            raise IndexError( "row index out of range [0, %d) in %s"%(self.shape[0], self.name) )
+
+        if self._mmap is not None: return np.asarray( self._mmap[rows] )
+
+        uniq, inverse = np.unique( rows, return_inverse=True )
+        out           = np.empty( (uniq.size,) + self.shape[1:], dtype=self.dtype )
+        start, stop   = contiguous_runs( uniq )
+        pos           = 0
+        for s, e in zip( start, stop ):
+            self.dset.read_direct( out, np.s_[s:e], np.s_[pos:pos+e-s] )
+            pos += e - s
+
+        return out if uniq.size == rows.size and np.array_equal( uniq, rows ) else out[inverse]
+
+    def iter_chunks( self, nrow=None, start=0, stop=None ):
+        """
+        Iterate over the rows in blocks of `nrow` rows.
+
+        nrow  : int. Number of rows per block. Default is the HDF5 chunk size along the first axis
+                or 4096 for contiguous datasets.
+        start : int. First row.
+        stop  : int. Last row (exclusive). Default is the number of rows.
+
+        Yield (first row, data block).
+        """
+        if nrow is None: nrow = self.chunks[0] if self.chunks is not None else 4096
+        if stop is None: stop = self.shape[0]
+        for s in range( start, stop, nrow ):
+            e = min( s+nrow, stop )
+            yield s, self[s:e]
@@ -0,0 +1,186 @@
+"""
+Memory-growth analysis of Record__MemInfo: expected growth versus leaks, and the projection of the step at which
+the memory of a process exceeds its share of the node memory.
+
+The resident memory (e.g., Phy_Max of the most memory-consuming process) is fitted by ordinary least squares as
+   Memory = M0 + MPatch*NPatch + MPar*NPar + Leak*Age,
+where NPatch and NPar are the patches and particles of the most loaded rank (or the totals for the *_Sum
+columns) from Record__PatchCount and Record__ParticleCount (or NParticle in Record__Performance), and Age is
+the number of steps since the process started (i.e., since the last restart). By default NPatch and NPar are
+the high-water marks since the last restart, since the memory of the freed patches and particles is not
+necessarily returned to the operating system. Growth explained by NPatch and NPar is expected, whereas a
+significant Leak indicates a leak. The standard error of Leak is inflated by the lag-1 autocorrelation of the
+residuals, which are usually far from independent.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import os
+import numpy as np
+from .imbalance import hold
+from .records   import load_record
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+TERMS   = ( "M0", "MPatch", "MPar", "Leak" )
+ALIASES = { "Phy_Max": ( "Phy_Max", "Resident_Max" ), "Phy_Sum": ( "Phy_Sum", "Resident_Sum" ),
+            "Vir_Max": ( "Vir_Max", "Virtual_Max"  ), "Vir_Sum": ( "Vir_Sum", "Virtual_Sum"  ) }
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def memory_column( mem, name ):
+    """
+    Column `name` of Record__MemInfo, also accepting the other naming (e.g., "Resident_Max" for "Phy_Max").
+    """
+    for alias in ALIASES.get( name, (name,) ):
+        if alias in mem: return alias
+    for key, aliases in ALIASES.items():
+        if name in aliases  and  key in mem: return key
+    raise KeyError( "column %s is not found in %s"%(name, mem.filename) )
+
+def process_age( step, segments=() ):
+    """
+    Number of steps since the start of each process. A new process starts at each header segment of the log
+    and whenever the step does not increase (i.e., a restart from an earlier snapshot).
+    """
+    step  = np.asarray( step, dtype=np.int64 )
+    start = np.zeros( step.size, dtype=bool )
+    if step.size > 0: start[0] = True
+    start[1:] |= np.diff( step ) <= 0
+    start[ [ s for s in segments if s < step.size ] ] = True
+    first = np.maximum.accumulate( np.where( start, np.arange(step.size), 0 ) )
+    return step - step[first], first
+
+def high_water( value, first ):
+    """
+    Running maximum of `value` within each process (see `process_age`).
+    """
+    value = np.nan_to_num( np.asarray( value, dtype=np.float64 ), nan=0.0 )
+    out   = np.empty_like( value )
+    for s in np.unique( first ):
+        seg      = first == s
+        out[seg] = np.maximum.accumulate( value[seg] )
+    return out
+
+def load_memory( path, column="Phy_Max", current=False, cache=False ):
+    """
+    Load Record__MemInfo and the workload of each record in the directory `path`.
+
+    column  : str. Memory column (e.g., "Phy_Max" or "Phy_Sum").
+    current : bool. Use the current NPatch and NPar instead of their high-water marks since the last restart.
+
+    Return a dictionary of [NRecord] arrays "Step", "Time", "Memory" (MB), "NPatch", "NPar", "Age", and "First"
+    (index of the first record of the process).
+    """
+    mem    = load_record( os.path.join(path, "Record__MemInfo"), cache=cache )
+    if len( mem ) == 0: raise ValueError( "no record found in %s"%mem.filename )
+    column = memory_column( mem, column )
+    total  = column.endswith( "_Sum" )
+    reduce = np.nansum if total else np.nanmax
+    step   = mem["Step"]
+
+    def workload( name, label, perf_key ):
+        filename = os.path.join( path, name )
+        if os.path.isfile( filename ):
+            rec = load_record( filename, cache=cache )
+            if len( rec ) > 0:
+                per_rank = np.nansum( rec[label+"_Rank"], axis=2 )   # [NBlock][NRank]
+                with np.errstate( invalid="ignore" ):
+                    return hold( rec["Step"], reduce( per_rank, axis=1 ), step )
+        filename = os.path.join( path, "Record__Performance" )
+        if perf_key is not None  and  os.path.isfile( filename ):
+            perf = load_record( filename, cache=cache )
+            if perf_key in perf:
+                value = hold( perf["Step"], perf[perf_key], step )
+                if not total:   # assume an even distribution
+                    nrank = np.rint( perf["Perf_Overall"]/perf["Perf_PerRank"] )
+                    value = value/np.nan_to_num( hold( perf["Step"], nrank, step ), nan=1.0 )
+                return value
+        return np.zeros( step.size )
+
+    age, first = process_age( step, mem.segments )
+    npatch     = np.nan_to_num( workload( "Record__PatchCount",    "NPatch", None        ), nan=0.0 )
+    npar       = np.nan_to_num( workload( "Record__ParticleCount", "NPar",   "NParticle" ), nan=0.0 )
+    if not current:
+        npatch, npar = high_water( npatch, first ), high_water( npar, first )
+
+    return { "Step": step, "Time": mem["Time"], "Memory": mem[column].astype( np.float64 ), "Column": column,
+             "NPatch": npatch, "NPar": npar, "Age": age.astype( np.float64 ), "First": first }
+
+def fit_memory( data ):
+    """
+    Fit Memory = M0 + MPatch*NPatch + MPar*NPar + Leak*Age (see the module docstring).
+
+    Return a dictionary of
+       "Coef", "Error" : dictionaries of the coefficients of TERMS and their standard errors (MB per patch,
+                         particle, or step); terms without variation (e.g., no particles) are zero with zero error
+       "Rho"           : lag-1 autocorrelation of the residuals
+       "Residual"      : [NRecord] residuals
+       "Collinear"     : correlation between Age and the modeled workload memory; the leak cannot be
+                         separated from the expected growth if it is close to one
+    """
+    y     = np.asarray( data["Memory"], dtype=np.float64 )
+    cols  = { "M0": np.ones( y.size ), "MPatch": data["NPatch"], "MPar": data["NPar"], "Leak": data["Age"] }
+    good  = np.isfinite( y )
+    use   = [ t for t in TERMS if t == "M0"  or  np.ptp( cols[t][good] ) > 0.0 ]
+    a     = np.column_stack( [ cols[t][good] for t in use ] )
+    norm  = np.abs( a ).max( axis=0 )
+    sol, *_ = np.linalg.lstsq( a/norm, y[good], rcond=None )
+    sol  /= norm
+    res   = y[good] - a.dot( sol )
+
+    n, p  = a.shape
+    rho   = 0.0
+    if n > 2  and  res.std() > 0.0:
+        rho = max( 0.0, np.corrcoef( res[:-1], res[1:] )[0, 1] )
+    dof   = max( n-p, 1 )
+    cov   = ( res**2 ).sum()/dof*np.linalg.pinv( a.T.dot(a) )
+    err   = np.sqrt( np.maximum( np.diag(cov), 0.0 )*( (1.0+rho)/(1.0-rho) if rho < 1.0 else np.inf ) )
+
+    coef  = { t: 0.0 for t in TERMS }
+    error = { t: 0.0 for t in TERMS }
+    for t, c, e in zip( use, sol, err ): coef[t], error[t] = c, e
+
+    work  = coef["MPatch"]*cols["MPatch"][good] + coef["MPar"]*cols["MPar"][good]
+    collinear = np.nan
+    if np.ptp( work ) > 0.0  and  np.ptp( cols["Leak"][good] ) > 0.0:
+        collinear = np.corrcoef( work, cols["Leak"][good] )[0, 1]
+
+    residual       = np.full( y.size, np.nan )
+    residual[good] = res
+    return { "Coef": coef, "Error": error, "Rho": rho, "Residual": residual, "Collinear": collinear }
+
+def project_limit( data, fit, limit, window=100 ):
+    """
+    Project the step at which the memory of the current process (i.e., since the last restart) exceeds `limit`.
+
+    The growth per step is the leak plus the expected growth from the linear trends of NPatch and NPar over the
+    latest `window` records, starting from the latest recorded memory.
+
+    Return a dictionary of
+       "Rate"     : total growth in MB per step
+       "Expected" : expected growth in MB per step from NPatch and NPar
+       "Step"     : projected step at which the limit is exceeded (inf if the memory does not grow)
+       "NStep"    : number of steps from the latest record until then
+    """
+    step  = np.asarray( data["Step"], dtype=np.float64 )
+    last  = slice( max( data["First"][-1], step.size-window ), step.size )
+    coef  = fit["Coef"]
+
+    def slope( v ):
+        x, y = step[last], np.asarray( v, dtype=np.float64 )[last]
+        return np.polyfit( x, y, 1 )[0] if x.size >= 2  and  np.ptp( x ) > 0.0 else 0.0
+
+    expected = coef["MPatch"]*slope( data["NPatch"] ) + coef["MPar"]*slope( data["NPar"] )
+    rate     = expected + coef["Leak"]
+    now      = data["Memory"][-1]
+    if now >= limit:  nstep = 0.0
+    elif rate > 0.0:  nstep = ( limit-now )/rate
+    else:             nstep = np.inf
+    return { "Rate": rate, "Expected": expected, "Step": step[-1]+nstep, "NStep": nstep }
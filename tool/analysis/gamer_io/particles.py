@@ -0,0 +1,380 @@
+"""
+Chunked export of the particle data stored in a GAMER HDF5 snapshot.
+
+Particles in `Particle/<attribute>[NPar]` are sorted by the GID of their host patches, and the number
+of particles in each patch is stored in `Tree/NPar`. Therefore, the particles of a set of patches
+(e.g., all patches on a given level) occupy a few contiguous row ranges that can be read directly.
+
+The selected rows are streamed in blocks of `PAR_BLOCK` particles and written to
+   1. "bin"     : raw binary, one attribute after another (same layout as the original
+                  `gamer_extract_particle_from_hdf5.py`)
+   2. "text"    : text table with one particle per line, formatted one block at a time
+   3. "npy"     : NumPy structured array [NPar] keeping the dtype of each attribute
+   4. "parquet" : Apache Parquet (requires pyarrow)
+   5. "arrow"   : Apache Arrow IPC file (requires pyarrow)
+so the memory consumption is independent of the number of particles.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import numpy as np
+
+from .spatial import PatchIndex
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+PAR_BLOCK = 1 << 20   # number of particles per block
+FORMATS   = ( "bin", "text", "npy", "parquet", "arrow" )
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class _BinaryWriter():
+    """
+    One attribute after another. Each attribute is written at its final offset so that only a single
+    pass over the data is required.
+    """
+    def __init__( self, filename, dtypes, nrow ):
+        self.file   = open( filename, "wb" )
+        self.dtypes = dtypes
+        self.nrow   = nrow
+        self.row    = 0
+        self.base   = {}
+        offset      = 0
+        for v, dtype in dtypes.items():
+            self.base[v] = offset
+            offset      += nrow*dtype.itemsize
+        self.file.truncate( offset )
+
+    def write( self, data ):
+        n = 0
+        for v, dtype in self.dtypes.items():
+            self.file.seek( self.base[v] + self.row*dtype.itemsize )
+            np.ascontiguousarray( data[v], dtype=dtype ).tofile( self.file )
+            n = data[v].size
+        self.row += n
+
+    def close( self ):
+        self.file.close()
+
+class _TextWriter():
+    def __init__( self, filename, dtypes, header ):
+        self.file   = open( filename, "w" )
+        self.dtypes = dtypes
+        self.file.write( header )
+        self.file.write( "#" + "".join( "  %*s"%(20 if i == 0 else 21, v) for i, v in enumerate(dtypes) ) + "\n" )
+
+    def write( self, data ):
+        table = np.empty( (next(iter(data.values())).size, len(self.dtypes)), dtype=np.float64 )
+#       round to the output types first (e.g., float32 by default in gamer_extract_particle_from_hdf5.py)
+        for i, (v, d) in enumerate( self.dtypes.items() ): table[:, i] = np.asarray( data[v] ).astype( d, copy=False )
+        line = "  %21.14e"*table.shape[1] + "\n"
+        self.file.write( (line*table.shape[0]) % tuple(table.ravel().tolist()) )
+
+    def close( self ):
+        self.file.close()
+
+class _NpyWriter():
+    def __init__( self, filename, dtypes, nrow ):
+        self.array = np.lib.format.open_memmap( filename, mode="w+", dtype=np.dtype(list(dtypes.items())), shape=(nrow,) )
+        self.row   = 0
+
+    def write( self, data ):
+        n = next( iter(data.values()) ).size
+        for v, d in data.items(): self.array[v][self.row:self.row+n] = d
+        self.row += n
+
+    def close( self ):
+        self.array.flush()
+        del self.array
+
+class _ArrowWriter():
+    def __init__( self, filename, dtypes, fmt, metadata ):
+        if pyarrow is None: raise ImportError( "pyarrow is required for the \"%s\" format"%fmt )
+        self.dtypes = dtypes
+        self.schema = pyarrow.schema( [ (v, pyarrow.from_numpy_dtype(d)) for v, d in dtypes.items() ],
+                                      metadata={ k: str(m) for k, m in metadata.items() } )
+        if fmt == "parquet": self.writer = pyarrow.parquet.ParquetWriter( filename, self.schema )
+        else:                self.writer = pyarrow.ipc.new_file( filename, self.schema )
+
+    def write( self, data ):
+#       numeric numpy arrays are wrapped without copying
+        arrays = [ pyarrow.array( np.ascontiguousarray(data[v], dtype=d) ) for v, d in self.dtypes.items() ]
+        batch  = pyarrow.RecordBatch.from_arrays( arrays, schema=self.schema )
+        if isinstance( self.writer, pyarrow.parquet.ParquetWriter ): self.writer.write_batch( batch )
+        else:                                                         self.writer.write( batch )
+
+    def close( self ):
+        self.writer.close()
+
+class ParticleIndex():
+    """
+    Index of the particle rows hosted by each patch joined with the spatial patch index.
+
+    The particle offset of each patch is the cumulative sum of `Tree/NPar`. A region query first finds the
+    overlapping patches with `PatchIndex`, converts them to a few contiguous particle row ranges, and then
+    reads only these ranges. The particle positions are checked afterwards to return exactly the particles
+    inside the region.
+
+    Example:
+       index = ParticleIndex.open( snap )
+       par   = index.read_sphere( snap, ["ParPosX", "ParMass"], center=[0.5,0.5,0.5], radius=0.1 )
+    """
+    def __init__( self, patch_index, offset ):
+        """
+        patch_index : PatchIndex.
+        offset      : 1D integer array. Offset of the first particle of each patch (length NPatchAllLv+1).
+        """
+        self.patch_index = patch_index
+        self.offset      = np.asarray( offset, dtype=np.int64 )
+
+    @classmethod
+    def open( cls, snap, save=True ):
+        """
+        Build the index of a snapshot, reusing the sidecar patch index if available (see `PatchIndex.open()`).
+        """
+        return cls( PatchIndex.open(snap, save=save), snap.particle.patch_offsets() )
+
+    @property
+    def npar( self ):
+        return int( self.offset[-1] )
+
+    def count( self, gids ):
+        """
+        Return the number of particles hosted by each of the given patches.
+        """
+        gids = np.asarray( gids, dtype=np.int64 )
+        return self.offset[gids+1] - self.offset[gids]
+
+    def runs( self, gids ):
+        """
+        Return the contiguous particle row ranges hosted by the given patches (see `merge_runs()`).
+        """
+        return merge_runs( self.offset, gids )
+
+    def query_box( self, lo, hi, margin=0.0 ):
+        """
+        Return the particle row ranges of the patches overlapping the box [lo, hi].
+
+        margin : float. Extend the box by this distance to include particles that have not yet been
+                 transferred to their new host patches.
+        """
+        lo = np.asarray( lo, dtype=np.float64 ) - margin
+        hi = np.asarray( hi, dtype=np.float64 ) + margin
+        return self.runs( self.patch_index.query_box(lo, hi, leaf_only=False) )
+
+    def query_sphere( self, center, radius, margin=0.0 ):
+        """
+        Return the particle row ranges of the patches overlapping the sphere of the given center and radius.
+        """
+        return self.runs( self.patch_index.query_sphere(center, radius+margin, leaf_only=False) )
+
+    def read_runs( self, snap, attributes, runs, region=None ):
+        """
+        Read the given particle row ranges.
+
+        region : function of (ParPosX, ParPosY, ParPosZ) returning a boolean mask, or None.
+
+        Return a dictionary mapping each attribute to a 1D array.
+        """
+        start, stop = runs
+        n           = int( np.sum(stop-start) )
+        out         = {}
+        mask        = None
+        if region is not None:
+            pos  = { "ParPos"+d: self._read(snap, "ParPos"+d, start, stop, n) for d in "XYZ" }
+            mask = region( pos["ParPosX"], pos["ParPosY"], pos["ParPosZ"] )
+
+        for v in attributes:
+            data   = pos[v] if region is not None and v in pos else self._read( snap, v, start, stop, n )
+            out[v] = data if mask is None else data[mask]
+        return out
+
+    def _read( self, snap, name, start, stop, n ):
+        dset = snap.particle[name]
+        out  = np.empty( n, dtype=dset.dtype )
+        pos  = 0
+        for s, e in zip( start, stop ):
+            out[pos:pos+e-s] = dset[s:e]
+            pos += e - s
+        return out
+
+    def read_patches( self, snap, attributes, gids ):
+        """
+        Read the particles hosted by the given patches.
+        """
+        return self.read_runs( snap, attributes, self.runs(gids) )
+
+    def read_box( self, snap, attributes, lo, hi, margin=0.0 ):
+        """
+        Read the particles inside the box [lo, hi).
+        """
+        return self.read_runs( snap, attributes, self.query_box(lo, hi, margin), box_mask(lo, hi) )
+
+    def read_sphere( self, snap, attributes, center, radius, margin=0.0 ):
+        """
+        Read the particles inside the sphere of the given center and radius.
+        """
+        return self.read_runs( snap, attributes, self.query_sphere(center, radius, margin), sphere_mask(center, radius) )
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def merge_runs( offset, gids ):
+    """
+    Convert patch GIDs to particle row ranges using the particle offsets of all patches.
+
+    offset : 1D integer array. Offset of the first particle of each patch (length NPatchAllLv+1).
+    gids   : 1D integer array of patch GIDs.
+
+    Return the start (inclusive) and stop (exclusive) rows of each run. Adjacent runs are merged.
+    """
+    gids  = np.unique( np.asarray(gids, dtype=np.int64) )
+    start = offset[gids  ]
+    stop  = offset[gids+1]
+    keep  = stop > start
+    start, stop = start[keep], stop[keep]
+    if start.size == 0: return start, stop
+
+    brk = np.flatnonzero( start[1:] != stop[:-1] ) + 1
+    return start[ np.concatenate( ([0], brk) ) ], stop[ np.concatenate( (brk-1, [stop.size-1]) ) ]
+
+def particle_runs( snap, gids=None ):
+    """
+    Return the contiguous particle row ranges hosted by the given patches.
+
+    snap : Snapshot.
+    gids : 1D integer array of patch GIDs, or None for all particles.
+    """
+    if gids is None:
+        npar = int( snap.particle.npar )
+        return np.array( [0], dtype=np.int64 ), np.array( [npar], dtype=np.int64 )
+
+    return merge_runs( snap.particle.patch_offsets(), gids )
+
+def box_mask( lo, hi ):
+    """
+    Return a function selecting the particles inside the box [lo, hi).
+    """
+    lo = np.asarray( lo, dtype=np.float64 )
+    hi = np.asarray( hi, dtype=np.float64 )
+    return lambda x, y, z: ( x >= lo[0] ) & ( x < hi[0] ) & ( y >= lo[1] ) & ( y < hi[1] ) & ( z >= lo[2] ) & ( z < hi[2] )
+
+def sphere_mask( center, radius ):
+    """
+    Return a function selecting the particles inside the sphere of the given center and radius.
+    """
+    c = np.asarray( center, dtype=np.float64 )
+    return lambda x, y, z: ( x-c[0] )**2 + ( y-c[1] )**2 + ( z-c[2] )**2 <= radius**2
+
+def level_gids( snap, levels ):
+    """
+    Return the GIDs of all patches on the given levels.
+    """
+    return np.concatenate( [ np.arange(*snap.level_range(lv), dtype=np.int64) for lv in levels ] )
+
+def _block_mask( par, s, e, par_type, region ):
+    mask = None
+    if par_type is not None:
+        mask = np.isin( par["ParType"][s:e], par_type )
+    if region is not None:
+        inside = region( par["ParPosX"][s:e], par["ParPosY"][s:e], par["ParPosZ"][s:e] )
+        mask   = inside if mask is None else mask & inside
+    return mask
+
+def iter_particles( snap, attributes, runs=None, par_type=None, region=None, block=PAR_BLOCK ):
+    """
+    Iterate over the selected particles in blocks.
+
+    snap       : Snapshot.
+    attributes : list of strings. Particle attributes to be read.
+    runs       : (start, stop) arrays returned by `particle_runs()`, or None for all particles.
+    par_type   : list of ints. Only keep the particles of these types (`ParType`), or None for all types.
+    region     : function of (ParPosX, ParPosY, ParPosZ) returning a boolean mask (e.g., `box_mask()`),
+                 or None to keep all particles.
+    block      : int. Maximum number of rows read at once.
+
+    Yield a dictionary mapping each attribute to a 1D array.
+    """
+    par = snap.particle
+    if runs is None: runs = particle_runs( snap )
+    if par_type is not None: par_type = np.asarray( par_type )
+
+    for s0, e0 in zip( *runs ):
+        for s in range( int(s0), int(e0), block ):
+            e    = min( s+block, int(e0) )
+            mask = _block_mask( par, s, e, par_type, region )
+            if mask is not None and not mask.any(): continue
+            yield { v: ( np.asarray(par[v][s:e]) if mask is None else np.asarray(par[v][s:e])[mask] ) for v in attributes }
+
+def count_particles( snap, runs=None, par_type=None, region=None, block=PAR_BLOCK ):
+    """
+    Return the number of selected particles without reading any attribute other than those
+    required by the filters.
+    """
+    if runs is None: runs = particle_runs( snap )
+    if par_type is None and region is None: return int( np.sum(runs[1]-runs[0]) )
+    if par_type is not None: par_type = np.asarray( par_type )
+
+    return sum( int( _block_mask(snap.particle, s, min(s+block, int(e0)), par_type, region).sum() )
+                for s0, e0 in zip(*runs) for s in range(int(s0), int(e0), block) )
+
+def extract_particles( snap, filename_out, fmt="bin", attributes=None, gids=None, par_type=None, region=None,
+                       dtype=None, block=PAR_BLOCK ):
+    """
+    Write the selected particles to a file.
+
+    snap         : Snapshot.
+    filename_out : string. Output filename.
+    fmt          : string. One of `FORMATS`.
+    attributes   : list of strings. Particle attributes to be written (default: all).
+    gids         : 1D integer array. Only write the particles hosted by these patches (default: all).
+    par_type     : list of ints. Only write the particles of these types (default: all).
+    region       : function of (ParPosX, ParPosY, ParPosZ) returning a boolean mask (default: all).
+    dtype        : numpy dtype. Convert all attributes to this type (default: keep the stored types).
+                   The "text" format prints the converted values with 14 decimals.
+    block        : int. Number of particles per block.
+
+    Return the number of particles written.
+    """
+    if fmt not in FORMATS: raise ValueError( "unsupported format \"%s\" (%s)"%(fmt, ", ".join(FORMATS)) )
+    if not snap.particle.exists: raise KeyError( "no particle data in %s"%snap.filename )
+
+    if attributes is None: attributes = snap.particle.keys()
+    for v in attributes:
+        if v not in snap.particle: raise KeyError( "particle attribute \"%s\" does not exist"%v )
+    dtypes = { v: np.dtype(dtype) if dtype is not None else snap.particle[v].dtype for v in attributes }
+
+    runs = particle_runs( snap, gids )
+    nrow = count_particles( snap, runs, par_type, region, block ) if fmt in ("bin", "npy") else None
+
+    if   fmt == "bin":  writer = _BinaryWriter( filename_out, dtypes, nrow )
+    elif fmt == "npy":  writer = _NpyWriter( filename_out, dtypes, nrow )
+    elif fmt == "text": writer = _TextWriter( filename_out, dtypes,
+                                              "#Time %20.14e   Step %13ld   Active Particles %13ld\n\n"%
+                                              (snap.time, snap.step, snap.particle.npar) )
+    else:               writer = _ArrowWriter( filename_out, dtypes, fmt, { "Time": snap.time, "Step": snap.step } )
+
+    ntotal = 0
+    try:
+        for data in iter_particles( snap, attributes, runs, par_type, region, block ):
+            writer.write( data )
+            ntotal += data[attributes[0]].size
+    finally:
+        writer.close()
+
+    return ntotal
@@ -0,0 +1,241 @@
+"""
+Power spectra of uniform grids (e.g., the output of `resample_uniform()`) and of particles.
+
+The 3D transform of a grid stored in the [z][y][x] order is decomposed into two passes so that the
+grid never has to fit in memory:
+   1. Each z-slab is read and transformed along y and x (real-to-complex along x). The result is written to
+      a temporary memory-mapped file (or kept in memory if small enough).
+   2. Each y-block of the intermediate result is transformed along z, and the power of every mode is added
+      to the |k| bins right away. The |k| of a block is computed from the 1D wavenumbers of each axis, so no
+      meshgrid of the full grid is ever created.
+FFTs use scipy.fft (pocketfft) with multiple threads if available, then pyFFTW, and fall back to numpy.fft.
+
+Cross-spectra of two fields use Re(A*conj(B)). Particle spectra deposit the particle mass with the
+cloud-in-cell (CIC) scheme and deconvolve the CIC window in Fourier space. The normalization and the
+deconvolution are specified per operand, so the cross spectrum of a mesh field and a CIC-deposited density
+is divided by the window of the deposited operand only.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import os
+import tempfile
+import numpy as np
+
+try:
+    import scipy.fft as _fft
+    _fft_kwargs = lambda nthread: { "workers": nthread }
+except ImportError:
+    try:
+        import pyfftw.interfaces.cache
+        import pyfftw.interfaces.numpy_fft as _fft
+        pyfftw.interfaces.cache.enable()
+        _fft_kwargs = lambda nthread: { "threads": nthread }
+    except ImportError:
+        _fft        = np.fft
+        _fft_kwargs = lambda nthread: {}
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+MAX_MEM = 256*1024**2   # approximate memory per slab/block in bytes
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def _as_3d( data ):
+    """
+    Treat 1D [x] and 2D [y][x] arrays as 3D arrays with singleton leading axes.
+    """
+    while data.ndim < 3: data = data[None]
+    return data
+
+def _forward_xy( data, out, nthread, max_mem ):
+    """
+    Pass 1: transform each z-slab along y and x. Return the sum of all values.
+    """
+    nz, ny, nx = data.shape
+    nslab      = max( 1, int( max_mem//(ny*nx*16) ) )
+    total      = 0.0
+    for z in range( 0, nz, nslab ):
+        slab          = np.asarray( data[z:z+nslab], dtype=np.float64 )
+        total        += slab.sum()
+        out[z:z+nslab] = _fft.rfftn( slab, axes=(1, 2), **_fft_kwargs(nthread) )
+    return total
+
+def _transformed( data, nthread, max_mem, tmp_dir ):
+    """
+    Return the xy-transformed grid (in memory or memory-mapped) and the sum of all values.
+    """
+    nz, ny, nx = data.shape
+    shape      = ( nz, ny, nx//2+1 )
+    nbyte      = np.prod( shape )*np.dtype( np.complex128 ).itemsize
+    if nbyte <= max_mem:
+        out = np.empty( shape, dtype=np.complex128 )
+        tmp = None
+    else:
+        fd, tmp = tempfile.mkstemp( suffix=".fft", dir=tmp_dir )
+        os.close( fd )
+        out     = np.memmap( tmp, dtype=np.complex128, mode="w+", shape=shape )
+    total = _forward_xy( data, out, nthread, max_mem )
+    return out, total, tmp
+
+def _cic_window( n ):
+    """
+    CIC window function W(k) = sinc^2(k*dh/2) along one axis in the numpy FFT order.
+    """
+    return np.sinc( np.fft.fftfreq(n) )**2
+
+def _pair( flag ):
+    """
+    Return the flags of the two operands from a bool (both) or a pair of bools.
+    """
+    if np.ndim( flag ) == 0: return bool( flag ), bool( flag )
+    if len( flag ) != 2:     raise ValueError( "expect a bool or a pair of bools instead of %s"%(flag,) )
+    return bool( flag[0] ), bool( flag[1] )
+
+def power_spectrum( data, box, data2=None, bins=None, overdensity=True, deconvolve_cic=False, nthread=1,
+                    max_mem=MAX_MEM, tmp_dir=None ):
+    """
+    Compute the (cross) power spectrum of uniform grids.
+
+    data           : 1D [x], 2D [y][x], or 3D [z][y][x] array, which can be a memory map.
+    box            : float or array of the box size along each axis (in the same order as the array axes).
+    data2          : array with the same shape as `data` for the cross spectrum, or None for the auto spectrum.
+    bins           : array of |k| bin edges. Default is linear bins of width k_f = 2*pi/max(box) centered at
+                     multiples of k_f.
+    overdensity    : bool or pair of bools for ( data, data2 ). Use field/mean(field)-1 instead of the field.
+    deconvolve_cic : bool or pair of bools for ( data, data2 ). Divide the modes of each CIC-deposited operand
+                     by the CIC window function, i.e., by W^2 for two deposited operands and by W for one.
+    nthread        : int. Number of FFT threads.
+    max_mem        : int. Approximate memory in bytes per slab/block. The intermediate result is stored in a
+                     temporary file under `tmp_dir` if it exceeds this limit.
+
+    Return a dictionary with
+       "k"     : bin centers
+       "k_avg" : average |k| of the modes in each bin
+       "P"     : power spectrum normalized as V*<|delta_k|^2>/N^2
+       "NMode" : number of modes in each bin
+    The DC mode is excluded.
+    """
+    ndim = np.ndim( data )
+    a    = _as_3d( data )
+    b    = None if data2 is None else _as_3d( data2 )
+    if b is not None and b.shape != a.shape: raise ValueError( "shapes %s and %s differ"%(a.shape, b.shape) )
+
+    box      = np.broadcast_to( np.asarray(box, dtype=np.float64), (ndim,) )
+    box3     = np.concatenate( ([1.0]*(3-ndim), box) )
+    nz, ny, nx = a.shape
+    ncell    = nz*ny*nx
+    volume   = np.prod( box )
+    kz       = 2.0*np.pi*np.fft.fftfreq( nz, d=box3[0]/nz )
+    ky       = 2.0*np.pi*np.fft.fftfreq( ny, d=box3[1]/ny )
+    kx       = 2.0*np.pi*np.fft.rfftfreq( nx, d=box3[2]/nx )
+    kf       = 2.0*np.pi/np.max( box )
+    if bins is None:
+        kmax = np.sqrt( np.sum( [ np.max(np.abs(k))**2 for k, n in zip((kz, ky, kx), (nz, ny, nx)) if n > 1 ] ) )
+        bins = ( np.arange( int(np.ceil(kmax/kf))+1 ) + 0.5 )*kf
+    bins = np.asarray( bins, dtype=np.float64 )
+
+#   modes with 0 < kx < Nyquist stand for two modes (k and -k) in the real-to-complex transform
+    mult = np.full( kx.size, 2.0 )
+    mult[0] = 1.0
+    if nx%2 == 0: mult[-1] = 1.0
+
+    od_a,  od_b  = _pair( overdensity )
+    cic_a, cic_b = _pair( deconvolve_cic )
+    if b is None  and  ( od_a != od_b  or  cic_a != cic_b ):
+        raise ValueError( "the two operands of an auto spectrum must be treated alike" )
+    ncic = int( cic_a ) + int( cic_b )   # power of the CIC window to divide by
+    wz, wy, wx = _cic_window(nz), _cic_window(ny), _cic_window(nx)[:kx.size]
+
+    tmp = []
+    try:
+#       pass 1
+        fa, sum_a, t = _transformed( a, nthread, max_mem, tmp_dir )
+        tmp.append( t )
+        if b is None:
+            fb, sum_b = fa, sum_a
+        else:
+            fb, sum_b, t = _transformed( b, nthread, max_mem, tmp_dir )
+            tmp.append( t )
+
+        norm = volume/ncell**2
+        if od_a: norm /= sum_a/ncell
+        if od_b: norm /= sum_b/ncell
+
+#       pass 2
+        nbin   = bins.size - 1
+        power  = np.zeros( nbin )
+        nmode  = np.zeros( nbin )
+        ksum   = np.zeros( nbin )
+        ny_blk = max( 1, int( max_mem//(nz*kx.size*16*(1 if b is None else 2)) ) )
+        for y in range( 0, ny, ny_blk ):
+            ga = _fft.fft( np.asarray(fa[:, y:y+ny_blk]), axis=0, **_fft_kwargs(nthread) )
+            gb = ga if b is None else _fft.fft( np.asarray(fb[:, y:y+ny_blk]), axis=0, **_fft_kwargs(nthread) )
+            pk = ( ga.real*gb.real + ga.imag*gb.imag )*norm
+            if ncic > 0:
+                pk /= ( wz[:,None,None]*wy[None,y:y+ny_blk,None]*wx[None,None,:] )**ncic
+
+            kmag = np.sqrt( kz[:,None,None]**2 + ky[None,y:y+ny_blk,None]**2 + kx[None,None,:]**2 )
+            w    = np.broadcast_to( mult, kmag.shape )
+            if y == 0:
+                w = w.copy()
+                w[0,0,0] = 0.0   # exclude the DC mode
+            idx  = np.digitize( kmag.ravel(), bins ) - 1
+            ok   = ( idx >= 0 ) & ( idx < nbin )
+            power += np.bincount( idx[ok], weights=(pk.ravel()*w.ravel())[ok], minlength=nbin )
+            nmode += np.bincount( idx[ok], weights=w.ravel()[ok], minlength=nbin )
+            ksum  += np.bincount( idx[ok], weights=(kmag.ravel()*w.ravel())[ok], minlength=nbin )
+
+    finally:
+        for t in tmp:
+            if t is not None and os.path.isfile( t ): os.remove( t )
+
+    with np.errstate( invalid="ignore", divide="ignore" ):
+        return { "k"     : 0.5*( bins[:-1] + bins[1:] ),
+                 "k_avg" : ksum/nmode,
+                 "P"     : power/nmode,
+                 "NMode" : nmode }
+
+def cic_deposit( pos, mass, dims, box, out=None ):
+    """
+    Deposit particle mass onto a periodic uniform grid with the cloud-in-cell scheme.
+
+    pos  : [3][NPar] array of the x, y, z coordinates (or a tuple of 3 arrays).
+    mass : [NPar] array or a scalar.
+    dims : array of 3 ints. Number of cells along x, y, and z.
+    box  : array of 3 floats. Box size along x, y, and z.
+    out  : [Nz][Ny][Nx] array to be accumulated, or None to create a new one.
+
+    Return the mass density in the [z][y][x] order. Call this function repeatedly with the same `out`
+    to deposit particles block by block.
+    """
+    nx, ny, nz = [ int(n) for n in dims ]
+    if out is None: out = np.zeros( (nz, ny, nx) )
+    dh   = np.asarray( box, dtype=np.float64 )/np.array( [nx, ny, nz] )
+    mass = np.broadcast_to( np.asarray(mass, dtype=np.float64), np.shape(pos[0]) )/np.prod( dh )
+
+    idx, frac = [], []
+    for d, n in enumerate( (nx, ny, nz) ):
+        x = np.asarray( pos[d], dtype=np.float64 )/dh[d] - 0.5
+        i = np.floor( x )
+        frac.append( x - i )
+        idx.append( i.astype(np.int64) )
+
+    flat = out.reshape( -1 )
+    for cz in ( 0, 1 ):
+        wz = frac[2] if cz else 1.0 - frac[2]
+        iz = ( idx[2] + cz )%nz
+        for cy in ( 0, 1 ):
+            wy = frac[1] if cy else 1.0 - frac[1]
+            iy = ( idx[1] + cy )%ny
+            for cx in ( 0, 1 ):
+                wx = frac[0] if cx else 1.0 - frac[0]
+                ix = ( idx[0] + cx )%nx
+                np.add.at( flat, ( iz*ny + iy )*nx + ix, mass*wx*wy*wz )
+    return out
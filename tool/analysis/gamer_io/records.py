@@ -0,0 +1,718 @@
+"""
+Incremental parsers of the simulation logs `Record__*`.
+
+Three layouts are supported:
+   1. Tables with one row per record (e.g., Record__TimeStep, Record__Performance, Record__Conservation,
+      Record__MemInfo, Record__Center, Record__Dump, Record__DivB). The column names are taken from the last
+      header line before the data. A new header (e.g., after a restart) starts a new segment, and the columns
+      of different segments are matched by name.
+   2. Blocks with one table per MPI rank and AMR level (Record__PatchCount, Record__ParticleCount, and
+      Record__LoadBalance).
+   3. Step blocks of the detailed timing analysis (Record__Timing), each consisting of sections (e.g., "Main
+      Loop", "Integration Loop", "Summary", and "GPU/CPU solvers") with one row per AMR level or summary line.
+
+Each column is stored as an int64 array if all of its values are integers and a float64 array otherwise.
+The parsers remember the byte offset of the last complete row (or block), so calling `update()` on a growing
+log only reads and parses the new tail. The parsed state can also be stored in a hidden sidecar file
+`.<log>.npz` next to the log so that the next process only parses the records appended in between. The
+sidecar holds plain arrays and JSON text only and is loaded without pickle. A log that is truncated or replaced
+(i.e., its first bytes differ) is parsed again from the beginning.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import io
+import json
+import os
+import re
+import numpy as np
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+CACHE_FORMAT   = ".%s.npz"
+CACHE_VERSION  = 3
+HEAD_BYTES     = 256   # leading bytes used to detect a replaced log
+CHUNK_BYTES    = 64*1024**2   # bytes read at once by iter_columns()
+BLOCK_LABELS   = { "Record__PatchCount"   : ( "NPatch", "Coverage" ),   # (value, percentage) of each rank and level
+                   "Record__ParticleCount": ( "NPar",   "Frac"     ),
+                   "Record__LoadBalance"  : ( "Load",   "Imb"      ) }
+UNSUPPORTED    = ( "Record__Note", "Record__TimingMPI_Rank" )
+_NUMBER        = r"[-+]?(?:\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?|inf|nan)"
+_PAIR_REGEX    = re.compile( r"(%s)\(\s*(%s)%%\)"%(_NUMBER, _NUMBER), re.IGNORECASE )
+_NUMBER_REGEX  = re.compile( _NUMBER, re.IGNORECASE )
+_HEAD_REGEX    = re.compile( r"(\w+)\s*=?\s*(%s)"%_NUMBER, re.IGNORECASE )
+_META_REGEX    = re.compile( r"^#\s*([^:]+?)\s*:\s*(%s)\s*$"%_NUMBER, re.IGNORECASE )
+_TIMING_REGEX  = re.compile( r"^Time\s*:\s*(%s)\s*->\s*(%s),\s*Step\s*:\s*(\d+)\s*->\s*(\d+)"%(_NUMBER, _NUMBER), re.IGNORECASE )
+_LEGEND_REGEX  = re.compile( r"^#\s*(\S+)\s*:\s*(.+?)\s*$" )
+_TEXT_REGEX    = re.compile( r"^[ \t]*(?!inf|nan)[#A-Za-z].*\n?", re.IGNORECASE | re.MULTILINE )   # non-data lines
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class _Record():
+    """
+    Base class handling the incremental reading and the sidecar cache.
+    """
+    def __init__( self, filename ):
+        self.filename = filename
+        self.offset   = 0      # bytes already parsed
+        self.head     = b""    # leading bytes of the parsed log
+        self._reset()
+
+    def _reset( self ):
+        raise NotImplementedError
+
+    def _parse( self, text ):
+        """
+        Parse the text appended since the last update. Return the number of characters consumed.
+        """
+        raise NotImplementedError
+
+    def _state( self ):
+        """
+        Return the parsed state as a dictionary of arrays and a JSON-serializable dictionary.
+        """
+        raise NotImplementedError
+
+    def _restore( self, arrays, info ):
+        """
+        Restore the parsed state returned by `_state()`.
+        """
+        raise NotImplementedError
+
+    def update( self ):
+        """
+        Parse the records appended since the last call. Return the number of new records.
+        """
+        before = len( self )
+        with open( self.filename, "rb" ) as f:
+            head = f.read( HEAD_BYTES )
+            size = os.fstat( f.fileno() ).st_size
+            if size < self.offset  or  head[ :len(self.head) ] != self.head:
+                self.offset = 0
+                self.head   = b""
+                self._reset()
+                before      = 0
+            f.seek( self.offset )
+            data = f.read()
+
+#       latin-1 maps each byte to one character, so the number of characters consumed equals the number of bytes
+        used         = self._parse( data.decode("latin-1") )
+        self.offset += used
+        self.head    = head[ :min(self.offset, HEAD_BYTES) ]
+        return len( self ) - before
+
+    @classmethod
+    def cache_name( cls, filename ):
+        return os.path.join( os.path.dirname(filename), CACHE_FORMAT%os.path.basename(filename) )
+
+    @classmethod
+    def open( cls, filename, cache=False, **kwargs ):
+        """
+        Parse a log, resuming from the sidecar cache if `cache` is True and storing the updated state there.
+        """
+        rec = cls._load( filename ) if cache else None
+        if rec is None: rec = cls( filename, **kwargs )
+
+        nnew = rec.update()
+        if cache and nnew > 0: rec.save()
+        return rec
+
+    def save( self ):
+        """
+        Store the parsed state in the sidecar cache. Nothing is done if the directory is not writable.
+        """
+        self._compact()
+        arrays, info = self._state()
+        try:
+            tmp = self.cache_name( self.filename ) + ".tmp.npz"
+            np.savez( tmp, version=CACHE_VERSION, cls=type(self).__name__, offset=self.offset,
+                      head=np.frombuffer( self.head, dtype=np.uint8 ), info=json.dumps( info ),
+                      **{ "arr_"+k: v for k, v in arrays.items() } )
+            os.replace( tmp, self.cache_name(self.filename) )
+        except OSError:
+            pass
+
+    @classmethod
+    def _load( cls, filename ):
+        """
+        Restore the state stored by `save()`. Return None if there is no valid sidecar cache.
+        """
+        name = cls.cache_name( filename )
+        if not os.path.isfile( name ): return None
+        try:
+            with np.load( name, allow_pickle=False ) as f:
+                if int( f["version"] ) != CACHE_VERSION  or  str( f["cls"] ) != cls.__name__: return None
+                rec          = cls.__new__( cls )
+                rec.filename = filename
+                rec.offset   = int( f["offset"] )
+                rec.head     = f["head"].tobytes()
+                rec._reset()
+                rec._restore( { k[4:]: f[k] for k in f.files if k.startswith( "arr_" ) }, json.loads( str(f["info"]) ) )
+            return rec
+        except (OSError, KeyError, ValueError, IndexError):
+            return None
+
+    def _compact( self ):
+        pass
+
+    def __getitem__( self, key ):
+        return self.column( key )
+
+    def __contains__( self, key ):
+        return key in self.keys()
+
+    def as_dict( self ):
+        return { k: self.column(k) for k in self.keys() }
+
+
+
+class RecordTable( _Record ):
+    """
+    Log with one row per record.
+
+    Example:
+       perf = RecordTable.open( "Record__Performance" )
+       t    = perf["ElapsedTime"]
+       ...
+       perf.update()   # parse the rows appended since then
+    """
+    def _reset( self ):
+        self.names    = None   # column names of the current segment
+        self.pending  = None   # last header line not yet followed by data
+        self.columns  = {}     # name --> list of arrays
+        self.nrow     = 0
+        self.nskip    = 0      # number of malformed rows skipped
+        self.segments = []     # first row of each segment (e.g., after each restart)
+        self.meta     = {}     # "# key : value" comment lines (e.g., "Ref time" in Record__Conservation)
+
+    def __len__( self ):
+        return self.nrow
+
+    def keys( self ):
+        return list( self.columns.keys() )
+
+    def column( self, key ):
+        chunks = self.columns[key]
+        if len(chunks) != 1: self.columns[key] = [ np.concatenate(chunks) if chunks else np.empty(0) ]
+        return self.columns[key][0]
+
+    def _compact( self ):
+        for key in self.columns: self.column( key )
+
+    def _state( self ):
+        info = { "names": self.names, "pending": self.pending, "keys": self.keys(), "nrow": self.nrow,
+                 "nskip": self.nskip, "segments": self.segments, "meta": self.meta }
+        return { "col%d"%c: self.column(k) for c, k in enumerate( info["keys"] ) }, info
+
+    def _restore( self, arrays, info ):
+        for key in ( "names", "pending", "nrow", "nskip", "segments", "meta" ): setattr( self, key, info[key] )
+        self.columns = { k: [ arrays["col%d"%c] ] for c, k in enumerate( info["keys"] ) }
+
+    @staticmethod
+    def _header_names( line ):
+        tokens = line.lstrip( "#" ).split()
+#       drop units (e.g., "(MB)") and column indices (e.g., "[  1]")
+        return [ t for t in tokens if not ( t.startswith("(") or t.startswith("[") or t.endswith("]") or set(t) <= set("-=") ) ]
+
+    @staticmethod
+    def _convert( tokens ):
+        try:
+            return tokens.astype( np.int64 )
+        except (ValueError, OverflowError):
+            return tokens.astype( np.float64 )
+
+    def _append( self, rows ):
+        """
+        Append rows (lists of strings) of the current segment.
+        """
+        ncol = len( rows[0] ) if self.names is None else len( self.names )
+        if self.names is None: self.names = [ "Col%d"%c for c in range(ncol) ]
+
+        good = [ r for r in rows if len(r) == ncol ]
+        self.nskip += len( rows ) - len( good )
+        if len(good) == 0: return
+        table = np.array( good, dtype=str ).reshape( len(good), ncol )
+
+        for c, name in enumerate( self.names ):
+            if name not in self.columns: self.columns[name] = [ np.full(self.nrow, np.nan) ] if self.nrow > 0 else []
+            self.columns[name].append( self._convert(table[:, c]) )
+        for name in self.columns:
+            if name not in self.names: self.columns[name].append( np.full(len(good), np.nan) )
+        self.nrow += len( good )
+
+    def _parse( self, text ):
+        end   = text.rfind( "\n" ) + 1
+        rows  = []
+        for line in text[:end].splitlines():
+            tokens = line.split()
+            if len(tokens) == 0: continue
+
+            if tokens[0].startswith("#")  or  not _NUMBER_REGEX.fullmatch( tokens[0] ):
+                m = _META_REGEX.match( line )
+                if m is not None:
+                    self.meta[ m.group(1) ] = float( m.group(2) )
+                elif len( self._header_names(line) ) > 0:
+                    self.pending = line
+                continue
+
+            if self.pending is not None:
+                if rows: self._append( rows )
+                rows          = []
+                self.names    = self._header_names( self.pending )
+                self.pending  = None
+                self.segments.append( self.nrow )
+            rows.append( tokens )
+
+        if rows: self._append( rows )
+        return end
+
+
+
+class RecordBlocks( _Record ):
+    """
+    Log with one block per record, each listing the values of all MPI ranks and AMR levels
+    (Record__PatchCount, Record__ParticleCount, and Record__LoadBalance).
+
+    Columns:
+       Time, Step, ...    : [NBlock] values in the first line of each block (e.g., NPatch and NPar)
+       <Value>_Rank       : [NBlock][NRank][NLevel] value of each rank and level (e.g., "NPatch_Rank")
+       <Percent>_Rank     : [NBlock][NRank][NLevel] percentage of each rank and level (e.g., "Coverage_Rank")
+       Sum, Ave, Max, Imb : [NBlock][NLevel] summary of each level (if present); percentages in parentheses
+                            are stored as "<name>_Pct"
+       WLI                : [NBlock] weighted load-imbalance factor in percent
+    Blocks with fewer ranks (e.g., after restarting with fewer processes) are padded with NaN.
+    """
+    def __init__( self, filename, labels=None ):
+        base        = os.path.basename( filename )
+        self.labels = labels if labels is not None else \
+                      next( ( v for k, v in BLOCK_LABELS.items() if base.startswith(k) ), ("Value", "Percent") )
+        super().__init__( filename )
+
+    def _reset( self ):
+        self.blocks = []
+        self._cache = {}
+
+    def _state( self ):
+        arrays, keys = _pack_dicts( self.blocks )
+        return arrays, { "labels": list( self.labels ), "keys": keys, "nblock": len( self.blocks ) }
+
+    def _restore( self, arrays, info ):
+        self.labels = tuple( info["labels"] )
+        self.blocks = _unpack_dicts( arrays, info["keys"], info["nblock"] )
+
+    def __len__( self ):
+        return len( self.blocks )
+
+    def keys( self ):
+        keys = []
+        for b in self.blocks:
+            keys += [ k for k in b if k not in keys ]
+        return keys
+
+    def column( self, key ):
+        if key not in self._cache:
+            vals = [ b.get(key) for b in self.blocks ]
+            ref  = next( ( v for v in vals if v is not None ), None )
+            if ref is None: raise KeyError( key )
+            if np.ndim( ref ) == 0:
+                out = np.array( [ np.nan if v is None else v for v in vals ] )
+            else:
+                shape = np.max( [ np.shape(v) for v in vals if v is not None ], axis=0 )
+                out   = np.full( (len(vals),) + tuple(shape), np.nan )
+                for i, v in enumerate( vals ):
+                    if v is not None: out[ (i,) + tuple( slice(0, n) for n in np.shape(v) ) ] = v
+            self._cache[key] = out
+        return self._cache[key]
+
+    def _parse_block( self, lines ):
+        out = {}
+        for key, val in _HEAD_REGEX.findall( lines[0] ):
+            out[key] = int( val ) if re.fullmatch( r"[-+]?\d+", val ) else float( val )
+
+        value, pct = [], []
+        for line in lines[1:]:
+            tokens = line.split()
+            if len(tokens) == 0  or  tokens[0] == "Rank"  or  line.startswith("---"): continue
+
+            if tokens[0].isdigit():
+                pairs = _PAIR_REGEX.findall( line )
+                value.append( [ float(p[0]) for p in pairs ] )
+                pct.append  ( [ float(p[1]) for p in pairs ] )
+            elif tokens[0].endswith( ":" ):
+                label = tokens[0][:-1]
+                rest  = line.split( ":", 1 )[1]
+                pairs = _PAIR_REGEX.findall( rest )
+                if pairs:
+                    out[label]        = np.array( [ float(p[0]) for p in pairs ] )
+                    out[label+"_Pct"] = np.array( [ float(p[1]) for p in pairs ] )
+                else:
+                    out[label]        = np.array( [ float(v) for v in _NUMBER_REGEX.findall(rest) ] )
+            elif line.startswith( "Weighted load-imbalance factor" ):
+                out["WLI"] = float( _NUMBER_REGEX.findall( line.split("=")[1] )[0] )
+
+        out[ self.labels[0]+"_Rank" ] = np.array( value )
+        out[ self.labels[1]+"_Rank" ] = np.array( pct )
+        return out
+
+    def _parse( self, text ):
+        """
+        A block starts with a line beginning with "Time" and ends with the dashed line following
+        "Weighted load-imbalance factor".
+        """
+        pos, used = 0, 0
+        block     = None
+        weighted  = False
+        for line in text.splitlines( keepends=True ):
+            pos += len( line )
+            if not line.endswith( "\n" ): break
+            if line.startswith( "Time" ):
+                block, weighted = [ line ], False
+            elif block is not None:
+                block.append( line )
+                if line.startswith( "Weighted" ):
+                    weighted = True
+                elif weighted and line.startswith( "---" ):
+                    self.blocks.append( self._parse_block(block) )
+                    block, used = None, pos
+            else:
+                used = pos   # text between blocks
+
+        if len(self.blocks) > 0: self._cache = {}
+        return used
+
+
+
+class RecordTiming( _Record ):
+    """
+    Detailed timing analysis written by the option --timing (Record__Timing).
+
+    Each step block records the time (in second) of each code section in the last root-level step. Its rows
+    are stored as "<section>/<row>/<column>", where <row> is the AMR level (or "Sum") for the per-level
+    sections, the row label (e.g., "Time" and "Frac") for the summary, and is prefixed by "Max", "Min", or
+    "Ave" with OPT__TIMING_BALANCE. Empty row labels are omitted. For example,
+       "Main Loop/Total", "Main Loop/Max/Total"
+       "Integration Loop/0/Flu_Adv", "Integration Loop/Sum/Refine", "Integration Loop/Max 1/Buf_Flu1"
+       "Summary/Time/Gra_Adv", "Summary/Frac/Gra_Adv", "Summary/Imbalance/Gra_Adv"
+       "GPU/CPU solvers/0/Flu_Sol"
+    Sub-timers included in the preceding column are prefixed by its name (e.g., "Par_2Sib-MPI_Sib" and
+    "Par_Coll-MPI_Sib"). Percentages are stored without "%". "Time", "dTime", and "Step" are the physical time, time-step, and
+    step at the end of each block.
+
+    The accumulated results appended at the end of each run are stored in `accumulated` (one dictionary per
+    run with the keys "Total Number of Steps", "Final Physical Time", "Total Simulation Time", and the
+    "Timing Diagnosis/<row>/<column>" entries), and the column descriptions in `legend`, where sub-timers
+    are keyed in the same way.
+    """
+    def _reset( self ):
+        self.blocks      = []
+        self.accumulated = []
+        self.legend      = {}
+        self._parent     = None   # last legend entry that is not a sub-timer
+        self._cache      = {}
+
+    def _state( self ):
+        blocks, keys = _pack_dicts( self.blocks,      "b" )
+        accum,  akey = _pack_dicts( self.accumulated, "a" )
+        info = { "legend": self.legend, "parent": self._parent, "keys": keys, "nblock": len( self.blocks ),
+                 "akeys": akey, "naccumulated": len( self.accumulated ) }
+        return { **blocks, **accum }, info
+
+    def _restore( self, arrays, info ):
+        self.legend      = info["legend"]
+        self._parent     = info["parent"]
+        self.blocks      = _unpack_dicts( arrays, info["keys"],  info["nblock"],       "b" )
+        self.accumulated = _unpack_dicts( arrays, info["akeys"], info["naccumulated"], "a" )
+
+    def __len__( self ):
+        return len( self.blocks )
+
+    def keys( self ):
+        keys = []
+        for b in self.blocks:
+            keys += [ k for k in b if k not in keys ]
+        return keys
+
+    def column( self, key ):
+        if key not in self._cache:
+            if not any( key in b for b in self.blocks ): raise KeyError( key )
+            self._cache[key] = np.array( [ b.get(key, np.nan) for b in self.blocks ], dtype=np.float64 )
+        return self._cache[key]
+
+    def rows( self, section ):
+        """
+        Return the row labels of a section in the order of their first appearance (e.g., the AMR levels).
+        """
+        rows = []
+        for key in self.keys():
+            parts = key[ len(section)+1: ].rsplit( "/", 1 ) if key.startswith( section+"/" ) else []
+            row   = parts[0] if len(parts) == 2 else ""
+            if parts and row not in rows: rows.append( row )
+        return rows
+
+    @classmethod
+    def _split_row( cls, line, ends ):
+        """
+        Split a row into its label and values by the fixed column widths of Aux_Timing.cpp, where the header
+        names are printed right-aligned with the same widths as the values, so column c ends where the c-th
+        header name ends. A value filling its entire width (e.g., 1000.000 for "%8.3f") touches the preceding
+        field and is still separated correctly. A value overflowing its width (e.g., 10000.000 for "%8.3f")
+        shifts all following columns, which are then split by the number of decimals instead. It is the same
+        for all values in a row (as well as the "%" suffix) and taken from the last one. Rows not aligned with
+        the header are split by whitespace, with the values in the last columns.
+
+        Return the label, the values, and the column of the first value (None for the last columns), or None if
+        the row is not a table row.
+        """
+        line = line.rstrip()
+        m    = re.search( r"\.(\d+)(%?)$", line )
+        if m is None: return None
+        number = r"[-+]?(?:\d+\.\d{%d}|nan|inf)%s"%( len( m.group(1) ), m.group(2) )
+
+#       the first field may follow the row label (e.g., "Max", "Time", and "Imbalance"), be the label itself
+#       (e.g., "Sum" in the column "Lv"), or overflow into the next field
+        head  = line[ :ends[0] ].rstrip()
+        if len(head) < min( ends[0], len(line) ): return cls._split_tokens( line )
+        trunc = re.search( r"[-+]?\d+\.\d*%?$", head )
+        if trunc is not None and not re.fullmatch( number, head[ trunc.start(): ], re.IGNORECASE ):
+            label, vals, first, start = head[ :trunc.start() ].split(), [], 0, trunc.start()
+        else:
+            m = re.search( r"(?:%s|\d+)$"%number, head, re.IGNORECASE )
+            if m is not None: label, vals, first = head[ :m.start() ].split(), [ m.group(0) ], 0
+            else:             label, vals, first = head.split(), [], 1
+            start = None
+            for c in range( 1, len(ends) ):
+                field = line[ ends[c-1]:ends[c] ]
+                if field.strip() and field[-1] == " ": return cls._split_tokens( line )
+                field = field.strip()
+                if not re.fullmatch( number, field, re.IGNORECASE ):
+                    start = ends[c-1]
+                    break
+                vals.append( field )
+            if start is None and len(line) > ends[-1]: return None
+
+#       values after an overflow, which must extend the row beyond the header
+        if start is not None:
+            rest = line[ start: ]
+            if rest.strip() and len(line) <= ends[-1]: return cls._split_tokens( line )
+            if not re.fullmatch( r"(?:\s*%s)*"%number, rest, re.IGNORECASE ): return None
+            vals += re.findall( number, rest, re.IGNORECASE )
+        return label, vals, first
+
+    @staticmethod
+    def _split_tokens( line ):
+        """
+        Split a row by whitespace into the leading label tokens and the trailing values.
+        """
+        tokens = line.split()
+        nlabel = len(tokens)
+        while nlabel > 0  and  _NUMBER_REGEX.fullmatch( tokens[nlabel-1].rstrip("%") ): nlabel -= 1
+        if nlabel == len(tokens): return None
+        return tokens[ :nlabel ], tokens[ nlabel: ], None
+
+    @classmethod
+    def _parse_sections( cls, lines, out ):
+        """
+        Parse the sections "<title>", "-----", "<column names>", followed by the rows, into `out`.
+        """
+        title, names = None, None
+        for i, line in enumerate( lines ):
+            tokens = line.split()
+            if len(tokens) == 0  or  set(line.strip()) <= set("-=*"):
+                if line.startswith( "---" ) and i > 0:
+                    title, names = lines[i-1].strip().rstrip( ":" ).strip(), None
+                continue
+            if title is None  or  i+1 < len(lines) and lines[i+1].startswith( "---" ): continue
+            if names is None:
+#               sub-timers (e.g., "-MPI_Sib") are included in the preceding column and may appear more than once
+                names, parent = [], None
+                for t in tokens:
+                    if t.startswith( "-" ) and parent is not None: t = parent + t
+                    else:                                          parent = t
+                    names.append( t )
+                ends = [ m.end() for m in re.finditer( r"\S+", line ) ]
+                continue
+
+            row = cls._split_row( line, ends )
+            if row is None: continue
+            label, vals, first = row
+            first = max( len(names)-len(vals), 0 ) if first is None else first
+            cols  = names[ first:first+len(vals) ]
+            vals  = vals[ len(vals)-len(cols): ]
+            if names[0] == "Lv" and first == 0:   # level of the per-level sections
+                label, cols, vals = label + vals[:1], cols[1:], vals[1:]
+            prefix = "/".join( [title] + ( [" ".join(label)] if label else [] ) ) + "/"
+            for c, v in zip( cols, vals ): out[ prefix+c ] = float( v.rstrip("%") )
+
+    def _parse( self, text ):
+        """
+        A step block starts with a line "Time : ... -> ..., Step : ... -> ..." and ends with the second of
+        two consecutive lines of "=". The accumulated results start and end with lines of "*".
+        """
+        pos, used = 0, 0
+        block     = None
+        for line in text.splitlines( keepends=True ):
+            pos += len( line )
+            if not line.endswith( "\n" ): break
+            if block is None:
+                m = _TIMING_REGEX.match( line )
+                if m is not None:
+                    block, kind = [ line ], "step"
+                elif line.startswith( "****" ):
+                    block, kind = [ line ], "accumulated"
+                else:
+                    m = _LEGEND_REGEX.match( line )
+                    if m is not None and not set( m.group(1) ) <= set("-"):
+                        name = m.group(1)
+                        if name.startswith( "-" ) and self._parent is not None: name = self._parent + name
+                        else:                                                   self._parent = name
+                        self.legend[ name ] = m.group(2)
+                    used = pos   # text between blocks
+                continue
+
+            block.append( line )
+            if kind == "step" and line.startswith( "====" ) and block[-2].startswith( "====" ):
+                m   = _TIMING_REGEX.match( block[0] )
+                out = { "Time": float( m.group(2) ), "dTime": float( m.group(2) ) - float( m.group(1) ),
+                        "Step": int( m.group(4) ) }
+                self._parse_sections( block[1:], out )
+                self.blocks.append( out )
+                block, used = None, pos
+            elif kind == "accumulated" and line.startswith( "****" ) and sum( l.startswith("****") for l in block ) == 4:
+                out = {}
+                for l in block:
+                    key, sep, val = l.partition( ":" )
+                    val = _NUMBER_REGEX.findall( val ) if sep else []
+                    if len(val) > 0: out[ key.strip() ] = float( val[0] )
+                self._parse_sections( block[1:], out )
+                self.accumulated.append( out )
+                block, used = None, pos
+
+        if len(self.blocks) > 0: self._cache = {}
+        return used
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def record_class( filename ):
+    """
+    Return the parser class of a log according to its name.
+    """
+    base = os.path.basename( filename )
+    if base.startswith( UNSUPPORTED ): raise ValueError( "%s is not a table or block log"%base )
+    if base.startswith( "Record__Timing" ): return RecordTiming
+    return RecordBlocks if base.startswith( tuple(BLOCK_LABELS) ) else RecordTable
+
+def load_record( filename, cache=False ):
+    """
+    Parse a `Record__*` log.
+
+    filename : string. Log filename.
+    cache    : bool. Resume from and update the sidecar cache.
+
+    Return a RecordTable, RecordBlocks, or RecordTiming, which can be refreshed with `update()`.
+    """
+    return record_class( filename ).open( filename, cache=cache )
+
+def _pack_dicts( dicts, prefix="b" ):
+    """
+    Pack a list of dictionaries of numbers and arrays into flat arrays for `np.savez`.
+
+    Return the arrays "<prefix><k>_val" (concatenated values), "<prefix><k>_ndim" (number of dimensions, or -1
+    if missing), and "<prefix><k>_dims" (concatenated shapes) of the k-th key, and the list of keys.
+    """
+    keys   = list( dict.fromkeys( k for d in dicts for k in d ) )
+    arrays = {}
+    for c, key in enumerate( keys ):
+        vals = [ d.get(key) for d in dicts ]
+        flat = [ np.ravel(v) for v in vals if v is not None ]
+        arrays[ "%s%d_val" %(prefix, c) ] = np.concatenate( flat ) if flat else np.empty( 0 )
+        arrays[ "%s%d_ndim"%(prefix, c) ] = np.array( [ -1 if v is None else np.ndim(v) for v in vals ], dtype=np.int64 )
+        arrays[ "%s%d_dims"%(prefix, c) ] = np.array( [ n for v in vals if v is not None for n in np.shape(v) ], dtype=np.int64 )
+    return arrays, keys
+
+def _unpack_dicts( arrays, keys, ndict, prefix="b" ):
+    """
+    Inverse of `_pack_dicts`.
+    """
+    dicts = [ {} for _ in range( ndict ) ]
+    for c, key in enumerate( keys ):
+        val, ndim, dims = ( arrays[ "%s%d_%s"%(prefix, c, s) ] for s in ( "val", "ndim", "dims" ) )
+        pos, pdim = 0, 0
+        for d, nd in zip( dicts, ndim ):
+            if nd < 0: continue
+            shape     = tuple( dims[ pdim:pdim+nd ] )
+            size      = int( np.prod( shape ) )
+            d[key]    = val[pos].item() if nd == 0 else val[ pos:pos+size ].reshape( shape )
+            pos, pdim = pos+size, pdim+nd
+    return dicts
+
+def _read_rows( text, usecols, ncol ):
+    """
+    Read the selected columns of data lines, skipping malformed lines (e.g., a line cut by a crash).
+    """
+    try:
+        return np.loadtxt( io.StringIO(text), usecols=usecols, ndmin=2, dtype=np.float64 )
+    except ValueError:
+        good = "".join( line for line in text.splitlines( keepends=True ) if len(line.split()) == ncol )
+        if len(good) == 0: return np.empty( (0, len(usecols)) )
+        return np.loadtxt( io.StringIO(good), usecols=usecols, ndmin=2, dtype=np.float64 )
+
+def iter_columns( filename, columns, chunk_bytes=CHUNK_BYTES ):
+    """
+    Stream selected columns of a table log in chunks without loading the entire log.
+
+    filename    : string. Log filename.
+    columns     : list of column names or 0-based column indices.
+    chunk_bytes : int. Approximate number of bytes read at once.
+
+    Yield a dictionary mapping each entry of `columns` to a float64 array for each chunk. Column names are
+    resolved with the last header before the data, so they remain valid across restarts even if the
+    columns change.
+    """
+    names, pending, usecols = None, None, None
+
+    def read( text ):
+        nonlocal names, pending, usecols
+        if len( text.strip() ) == 0: return None
+        if pending is not None:
+            names, pending = pending, None
+            usecols        = None
+        if usecols is None:
+            if names is None and not all( isinstance(c, (int, np.integer)) for c in columns ):
+                raise KeyError( "no header found in %s to resolve the columns %s"%(filename, columns) )
+            usecols = [ c if isinstance(c, (int, np.integer)) else names.index(c) for c in columns ]
+        ncol = len(names) if names is not None else len( next( l for l in text.splitlines() if l.strip() ).split() )
+        rows = _read_rows( text, usecols, ncol )
+        return { c: rows[:, i] for i, c in enumerate(columns) } if rows.shape[0] > 0 else None
+
+    carry = b""
+    with open( filename, "rb" ) as f:
+        while True:
+            data  = f.read( chunk_bytes )
+            final = len(data) == 0
+            data  = carry + data
+            end   = data.rfind( b"\n" ) + 1   # a trailing line without a newline may still be being written
+            carry = data[end:]
+            text  = data[:end].decode( "latin-1" )
+
+#           data lines between two non-data lines are read at once
+            pos = 0
+            for m in _TEXT_REGEX.finditer( text ):
+                out = read( text[pos:m.start()] )
+                if out is not None: yield out
+                line = m.group( 0 )
+                if _META_REGEX.match( line ) is None  and  len( RecordTable._header_names(line) ) > 0:
+                    pending = RecordTable._header_names( line )
+                pos = m.end()
+
+            out = read( text[pos:] )
+            if out is not None: yield out
+            if final: break
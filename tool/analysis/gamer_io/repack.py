@@ -0,0 +1,204 @@
+"""
+Rewrite a GAMER HDF5 snapshot with chunked and compressed datasets.
+
+The output keeps the original layout (`Info`, `User`, `Tree`, `GridData/<field>[NPatch][PS1][PS1][PS1]`,
+`Particle/<attribute>[NPar]`) so that it can still be loaded by yt and used as a restart file. In addition:
+   1. GridData datasets are chunked by patch groups (i.e., `patches_per_chunk` patches with consecutive GIDs)
+      so that reading a patch only decompresses its own chunk
+   2. All chunked datasets use the HDF5 built-in shuffle and deflate filters, which require no plugin to read
+   3. Per-level views are stored as HDF5 virtual datasets `LevelData/Lv<lv>/<field>` pointing to the GID range
+      of each level, which take no extra space
+   4. Optionally, the mantissa of GridData floating-point values can be rounded to `keep_bits` bits, which
+      bounds the relative error by 2^-(keep_bits+1) and greatly improves the compression ratio
+
+Chunks are compressed by a pool of worker processes and written with `write_direct_chunk()` by the
+main process, so at most a few blocks of chunks are held in memory at once.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import collections
+import multiprocessing
+import zlib
+import h5py
+import numpy as np
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+ROWS_PER_TASK  = 4096       # maximum number of rows (patches or particles) compressed by a worker at once
+TREE_CHUNK     = 4096       # number of patches per chunk in Tree
+PAR_CHUNK      = 65536      # number of particles per chunk
+LEVEL_GROUP    = "LevelData"
+_worker        = {}
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def round_mantissa( data, keep_bits ):
+    """
+    Round the mantissa of floating-point values to `keep_bits` bits (round half to even).
+
+    The relative error is bounded by 2^-(keep_bits+1).
+    """
+    nbits = { 4: 23, 8: 52 }[ data.dtype.itemsize ]
+    if keep_bits >= nbits: return data
+
+    utype = { 4: np.uint32, 8: np.uint64 }[ data.dtype.itemsize ]
+    drop  = utype( nbits - keep_bits )
+    one   = utype( 1 )
+    bits  = np.ascontiguousarray( data ).view( utype )
+    bits  = ( bits + ( (one << (drop-one)) - one ) + ( (bits >> drop) & one ) ) & ~( (one << drop) - one )
+    out   = bits.view( data.dtype )
+    return np.where( np.isfinite(data), out, data )
+
+def compress_chunk( data, level ):
+    """
+    Apply the HDF5 shuffle and deflate filters to a chunk.
+    """
+    itemsize = data.dtype.itemsize
+    raw      = np.ascontiguousarray( data ).view( np.uint8 ).reshape( -1, itemsize ).T.tobytes()
+    return zlib.compress( raw, level )
+
+def _init_worker( filename ):
+    _worker["h5"] = h5py.File( filename, "r" )
+
+def _compress_rows( args ):
+    """
+    Read rows [start, stop) of a dataset and return the compressed chunks.
+    """
+    name, start, stop, chunk_rows, level, keep_bits = args
+    dset   = _worker["h5"][name]
+    data   = dset[start:stop]
+    if keep_bits is not None and data.dtype.kind == "f": data = round_mantissa( data, keep_bits )
+
+    chunks = []
+    for s in range( 0, stop-start, chunk_rows ):
+        block = data[s:s+chunk_rows]
+        if block.shape[0] < chunk_rows:   # edge chunk must be stored in full size
+            pad   = np.zeros( (chunk_rows,)+block.shape[1:], dtype=block.dtype )
+            pad[:block.shape[0]] = block
+            block = pad
+        chunks.append( (start+s, compress_chunk(block, level)) )
+    return name, chunks
+
+def _copy_attrs( src, dst ):
+    for key, val in src.attrs.items(): dst.attrs[key] = val
+
+def _create_chunked( h5_out, src, chunk_rows, level ):
+    dset = h5_out.create_dataset( src.name, shape=src.shape, dtype=src.dtype,
+                                  chunks=(chunk_rows,)+src.shape[1:], shuffle=True, compression="gzip",
+                                  compression_opts=level )
+    _copy_attrs( src, dset )
+    return dset
+
+def _add_level_views( h5_out, npatch ):
+    """
+    Add per-level virtual datasets of all GridData fields.
+    """
+    gid_start = np.concatenate( ([0], np.cumsum(npatch)) )
+    for name, dset in h5_out["GridData"].items():
+        for lv in range( len(npatch) ):
+            if npatch[lv] == 0: continue
+            s, e   = int(gid_start[lv]), int(gid_start[lv+1])
+            layout = h5py.VirtualLayout( shape=(e-s,)+dset.shape[1:], dtype=dset.dtype )
+            layout[:] = h5py.VirtualSource( ".", dset.name, shape=dset.shape )[s:e]
+            h5_out.create_virtual_dataset( "%s/Lv%02d/%s"%(LEVEL_GROUP, lv, name), layout )
+
+def repack( filename_in, filename_out, level=4, keep_bits=None, patches_per_chunk=8, nproc=1, level_views=True ):
+    """
+    Repack a snapshot.
+
+    filename_in       : string. Input snapshot.
+    filename_out      : string. Output snapshot.
+    level             : int. Deflate compression level (1-9).
+    keep_bits         : int. Number of mantissa bits kept in GridData (None=lossless).
+    patches_per_chunk : int. Number of patches per chunk in GridData (8 = a patch group of siblings).
+    nproc             : int. Number of processes for compression.
+    level_views       : bool. Whether or not to add the per-level virtual datasets.
+    """
+    h5_in  = h5py.File( filename_in,  "r" )
+    h5_out = h5py.File( filename_out, "w" )
+    _copy_attrs( h5_in, h5_out )
+    h5_out.attrs["RepackKeepBits"] = -1 if keep_bits is None else keep_bits
+
+    pool = multiprocessing.Pool( nproc, _init_worker, (filename_in,) ) if nproc > 1 else None
+    if pool is None: _init_worker( filename_in )
+
+    try:
+#       1. small groups are copied as is
+        for name in ( "Info", "User" ):
+            if name in h5_in: h5_in.copy( h5_in[name], h5_out, name=name )
+
+#       2. set up the chunked datasets and the compression tasks
+        tasks = []
+        for group, chunk_rows, lossy in ( ("Tree", TREE_CHUNK, False), ("GridData", patches_per_chunk, True), ("Particle", PAR_CHUNK, False) ):
+            if group not in h5_in: continue
+            h5_out.create_group( group )
+            _copy_attrs( h5_in[group], h5_out[group] )
+            for src in h5_in[group].values():
+                if src.shape[0] == 0:
+                    h5_out.create_dataset( src.name, shape=src.shape, dtype=src.dtype )
+                    continue
+                rows = min( src.shape[0], chunk_rows )
+                _create_chunked( h5_out, src, rows, level )
+                step = max( rows, ROWS_PER_TASK//rows*rows )
+                for start in range( 0, src.shape[0], step ):
+                    tasks.append( (src.name, start, min(start+step, src.shape[0]), rows, level,
+                                   keep_bits if lossy else None) )
+
+#       3. compress in parallel and write the raw chunks with a bounded number of pending tasks
+        pending = collections.deque()
+        def write( result ):
+            name, chunks = result
+            dset = h5_out[name]
+            for start, buf in chunks:
+                dset.id.write_direct_chunk( (start,)+(0,)*(dset.ndim-1), buf )
+
+        for task in tasks:
+            if pool is None:
+                write( _compress_rows(task) )
+                continue
+            pending.append( pool.apply_async(_compress_rows, (task,)) )
+            if len(pending) >= 2*nproc: write( pending.popleft().get() )
+        while pending: write( pending.popleft().get() )
+
+#       4. per-level views
+        if level_views and "GridData" in h5_out and "Info/KeyInfo" in h5_in:
+            _add_level_views( h5_out, np.asarray(h5_in["Info/KeyInfo"]["NPatch"]) )
+
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        h5_out.close()
+        h5_in.close()
+        if "h5" in _worker: _worker.pop( "h5" ).close()
+
+def verify( filename_in, filename_out, keep_bits=None ):
+    """
+    Check that the repacked snapshot matches the original one.
+
+    Return a list of the mismatched datasets.
+    """
+    bad = []
+    with h5py.File( filename_in, "r" ) as h5_in, h5py.File( filename_out, "r" ) as h5_out:
+        for group in ( "Tree", "GridData", "Particle" ):
+            if group not in h5_in: continue
+            for name, src in h5_in[group].items():
+                dst = h5_out[group][name]
+                for start in range( 0, src.shape[0], ROWS_PER_TASK ):
+                    a = src[start:start+ROWS_PER_TASK]
+                    b = dst[start:start+ROWS_PER_TASK]
+                    if group == "GridData" and keep_bits is not None and a.dtype.kind == "f":
+                        ok = np.allclose( a, b, rtol=2.0**-(keep_bits+1), atol=0.0, equal_nan=True )
+                    else:
+                        ok = np.array_equal( a, b, equal_nan=(a.dtype.kind == "f") )
+                    if not ok:
+                        bad.append( src.name )
+                        break
+    return bad
@@ -0,0 +1,195 @@
+"""
+Resample the leaf patches of a GAMER HDF5 snapshot to a uniform grid on a target level.
+
+   1. Coarser leaf patches are prolonged by injection (i.e., each coarse cell is copied to all
+      overlapping target cells)
+   2. Finer leaf patches are restricted by volume averaging
+   3. Leaf patches on the target level are copied directly
+
+The output grid is processed in slabs along z so that the memory consumption is bounded by the slab
+size instead of the grid size, and slabs can be distributed to multiple processes. The output array
+is stored in the [z][y][x] order (i.e., x varies fastest), the same as the patch data of GAMER.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import multiprocessing
+import numpy as np
+
+from .snapshot import Snapshot
+from .spatial  import PatchIndex
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+_worker = {}   # per-process snapshot and index
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def uniform_dims( snap, lv ):
+    """
+    Number of cells of the uniform grid on level `lv` in the [x,y,z] order.
+    """
+    return np.asarray( snap.key_info["NX0"], dtype=np.int64 )*2**lv
+
+def slab_ranges( snap, lv, nz_slab ):
+    """
+    Split the z range of the uniform grid into slabs.
+
+    The slab thickness is rounded up to a multiple of the patch size so that all patches on level >= lv
+    fall entirely within a single slab.
+    """
+    ps      = snap.patch_size
+    nz      = int( uniform_dims(snap, lv)[2] )
+    nz_slab = max( ps, int(np.ceil(nz_slab/ps))*ps )
+    return [ (z, min(z+nz_slab, nz)) for z in range(0, nz, nz_slab) ]
+
+def auto_slab_size( snap, lv, field, max_mem ):
+    """
+    Slab thickness such that a slab of `field` takes about `max_mem` bytes.
+    """
+    dims     = uniform_dims( snap, lv )
+    itemsize = snap.grid[field].dtype.itemsize
+    return max( 1, int( max_mem//(dims[0]*dims[1]*itemsize) ) )
+
+def resample_slab( snap, index, field, lv, z_range, fine="restrict", batch=4096 ):
+    """
+    Resample a single slab.
+
+    snap    : gamer_io.Snapshot.
+    index   : gamer_io.PatchIndex of the snapshot.
+    field   : string. Target field in GridData.
+    lv      : int. Target level.
+    z_range : (int, int). The range of target cells [z_start, z_end) along z.
+    fine    : string. "restrict": restrict the leaf patches above lv by volume averaging
+                      "father"  : use the data stored in the non-leaf patches on lv instead, which have been
+                                  restricted by GAMER during the run (faster, but requires OPT__FIXUP_RESTRICT)
+    batch   : int. Maximum number of patches loaded at once.
+
+    Return the slab with the shape [z_end-z_start][Ny][Nx].
+    """
+    ps         = snap.patch_size
+    nx, ny, nz = uniform_dims( snap, lv )
+    zs, ze     = z_range
+    scale_lv   = index.cell_scale[lv]                               # target cell size in the unit of Corner
+    dh         = scale_lv*index.cvt2phy
+    dset       = snap.grid[field]
+    slab       = np.zeros( (ze-zs, ny, nx), dtype=dset.dtype )
+
+    lo   = np.array( [0.0,     0.0,     zs*dh] )
+    hi   = np.array( [nx*dh,   ny*dh,   ze*dh] )
+    gids = index.query_box( lo, hi, leaf_only=True, max_level=(lv if fine == "father" else None) )
+
+    for L in np.unique( index.level[gids] ):
+        g_lv = gids[ index.level[gids] == L ]
+        for b in range( 0, g_lv.size, batch ):
+            g      = g_lv[b:b+batch]
+            data   = dset.take( g )
+            origin = index.corner[g]//scale_lv if L <= lv else index.corner[g]*1.0/scale_lv   # [x,y,z] in target cells
+
+#           1. same level: copy
+#           2. finer level with patch >= one target cell: average blocks of r^3 cells
+            if L == lv  or  ( L > lv  and  2**(L-lv) <= ps ):
+                r    = 2**(L-lv)
+                w    = ps//r
+                if r > 1: data = data.reshape( g.size, w, r, w, r, w, r ).mean( axis=(2,4,6), dtype=np.float64 )
+                org  = origin.astype( np.int64 )
+                view = slab.reshape( (ze-zs)//w, w, ny//w, w, nx//w, w )
+                view[ (org[:,2]-zs)//w, :, org[:,1]//w, :, org[:,0]//w, : ] = data
+
+#           3. finer level with patch < one target cell: accumulate the volume-weighted patch average
+            elif L > lv:
+                frac = ( ps/2.0**(L-lv) )**3
+                org  = np.floor( origin ).astype( np.int64 )
+                np.add.at( slab, (org[:,2]-zs, org[:,1], org[:,0]), data.mean(axis=(1,2,3), dtype=np.float64)*frac )
+
+#           4. coarser level: prolong by injection, clipped to the slab
+#              --> all patches with the same z offset at once, upsampling each coarse row in x and y once
+            else:
+                r    = 2**(lv-L)
+                w    = ps*r                                               # patch width in target cells
+                org  = origin.astype( np.int64 )
+                view = slab.reshape( ze-zs, ny//w, w, nx//w, w )
+                for oz in np.unique( org[:,2] ):
+                    p = np.nonzero( org[:,2] == oz )[0]
+                    y = org[p,1]//w
+                    x = org[p,0]//w
+                    for k in range( max(0, (zs-oz)//r), min(ps, -(-(ze-oz)//r)) ):
+                        z0, z1 = max( zs, oz+k*r ), min( ze, oz+(k+1)*r )
+                        view[ z0-zs:z1-zs, y, :, x, : ] = data[p, k].repeat( r, axis=1 ).repeat( r, axis=2 )[:, None]
+
+    return slab
+
+def _init_worker( filename ):
+    _worker["snap"]  = Snapshot( filename )
+    _worker["index"] = PatchIndex.open( _worker["snap"], save=False )
+
+def _run_slab( args ):
+    field, lv, z_range, fine, out_bin = args
+    slab = resample_slab( _worker["snap"], _worker["index"], field, lv, z_range, fine )
+    if out_bin is None: return z_range, slab
+
+    out = np.memmap( out_bin, dtype=slab.dtype, mode="r+", shape=(int(uniform_dims(_worker["snap"], lv)[2]),)+slab.shape[1:] )
+    out[ z_range[0]:z_range[1] ] = slab
+    out.flush()
+    del out
+    return z_range, None
+
+def resample_uniform( filename, fields, lv, output, fmt="bin", nproc=1, nz_slab=None, max_mem=256*1024**2, fine="restrict" ):
+    """
+    Resample fields of a snapshot to a uniform grid on level `lv` and write them to disk.
+
+    filename : string. Snapshot filename.
+    fields   : list of strings. Target fields in GridData.
+    lv       : int. Target level.
+    output   : string or dict. fmt="bin" : dict mapping each field to its output filename
+                               fmt="hdf5": output filename; one dataset per field
+    nproc    : int. Number of processes.
+    nz_slab  : int. Slab thickness in cells. Default is set by `max_mem`.
+    max_mem  : int. Approximate memory per slab in bytes if `nz_slab` is not set.
+    fine     : string. See `resample_slab()`.
+    """
+    snap       = Snapshot( filename )
+    nx, ny, nz = uniform_dims( snap, lv )
+    if lv >= snap.npatch.size: raise ValueError( "target level %d exceeds the maximum level %d"%(lv, snap.npatch.size-1) )
+    if fine not in ( "restrict", "father" ): raise ValueError( "unknown option fine=\"%s\""%fine )
+
+    h5 = None
+    if fmt == "hdf5":
+        import h5py
+        h5 = h5py.File( output, "w" )
+
+    pool = multiprocessing.Pool( nproc, _init_worker, (filename,) ) if nproc > 1 else None
+    if pool is None: _init_worker( filename )
+
+    try:
+        for field in fields:
+            dtype  = snap.grid[field].dtype
+            slabs  = slab_ranges( snap, lv, nz_slab if nz_slab is not None else auto_slab_size(snap, lv, field, max_mem) )
+
+            if fmt == "bin":
+                out_bin = output[field]
+                np.memmap( out_bin, dtype=dtype, mode="w+", shape=(nz, ny, nx) ).flush()
+            else:
+                out_bin = None
+                dset    = h5.create_dataset( field, shape=(nz, ny, nx), dtype=dtype,
+                                             chunks=( slabs[0][1]-slabs[0][0], min(ny, 256), min(nx, 256) ) )
+                dset.attrs["Level"]    = lv
+                dset.attrs["CellSize"] = snap.cell_size[lv]
+                dset.attrs["Time"]     = snap.time
+
+            tasks   = [ (field, lv, z_range, fine, out_bin) for z_range in slabs ]
+            results = pool.imap_unordered( _run_slab, tasks ) if pool is not None else map( _run_slab, tasks )
+            for z_range, slab in results:
+                if slab is not None: h5[field][ z_range[0]:z_range[1] ] = slab
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if h5 is not None: h5.close()
+        snap.close()
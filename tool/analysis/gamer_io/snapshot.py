@@ -0,0 +1,271 @@
+"""
+Lightweight reader of GAMER HDF5 snapshots (`Data_XXXXXX`).
+
+The data layout follows `src/Output/Output_DumpData_Total_HDF5.cpp`:
+   Info     : KeyInfo, Makefile, SymConst, InputPara, InputTest (scalar compound datasets)
+   Tree     : Corner, LBIdx, Father, Son, Sibling, NPar (sorted by GID)
+   GridData : one dataset per field with the shape [NPatch][PS1][PS1][PS1] (sorted by GID)
+   Particle : one dataset per attribute with the shape [NPar] (sorted by the GID of the host patch)
+
+Opening a snapshot only reads the file header. Compound datasets are decoded once on first access
+and all other datasets are exposed as `LazyArray`.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import os
+import h5py
+import numpy as np
+
+from .lazy import LazyArray
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def decode_compound( record ):
+    """
+    Convert a scalar compound record to a dictionary of Python/NumPy objects.
+
+    Byte strings are decoded to `str` and 0-d numbers are converted to Python scalars.
+    """
+    out = {}
+    for key in record.dtype.names:
+        val = record[key]
+        if isinstance( val, bytes ):            val = val.decode( "utf-8", "replace" )
+        elif isinstance( val, np.ndarray ):
+            if val.dtype.kind == "O":           val = [ v.decode("utf-8", "replace") if isinstance(v, bytes) else v for v in val.tolist() ]
+            elif val.ndim == 0:                 val = val.item()
+        elif isinstance( val, np.generic ):     val = val.item()
+        out[key] = val
+    return out
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class Group():
+    """
+    Dictionary-like access to the datasets in an HDF5 group as `LazyArray`.
+    """
+    def __init__( self, snapshot, name ):
+        self.snapshot = snapshot
+        self.name     = name
+        self._group   = snapshot.h5[name] if name in snapshot.h5 else None
+        self._arrays  = {}
+
+    def __contains__( self, key ):
+        return self._group is not None and key in self._group
+
+    def __iter__( self ):
+        return iter( self.keys() )
+
+    def __len__( self ):
+        return len( self.keys() )
+
+    def __getitem__( self, key ):
+        if key not in self._arrays:
+            if key not in self: raise KeyError( "dataset \"%s\" does not exist in the group \"%s\" of %s"%(key, self.name, self.snapshot.filename) )
+            self._arrays[key] = LazyArray( self._group[key], use_mmap=self.snapshot.use_mmap )
+        return self._arrays[key]
+
+    def keys( self ):
+        return [] if self._group is None else list( self._group.keys() )
+
+    @property
+    def exists( self ):
+        return self._group is not None
+
+
+
+class PatchGroup( Group ):
+    """
+    Group whose datasets are indexed by GID (i.e., "Tree" and "GridData").
+    """
+    def level( self, key, lv ):
+        """
+        Read the data of all patches on level `lv`.
+        """
+        start, stop = self.snapshot.level_range( lv )
+        return self[key][start:stop]
+
+    def patches( self, key, gids ):
+        """
+        Read the data of the patches with the given GIDs.
+        """
+        return self[key].take( gids )
+
+
+
+class ParticleGroup( Group ):
+    """
+    The "Particle" group. Particles are sorted by the GID of their host patches.
+    """
+    @property
+    def npar( self ):
+        return self.snapshot.key_info.get( "Par_NPar", 0 ) if self.exists else 0
+
+    def patch_offsets( self ):
+        """
+        Return the offset of the first particle of each patch (length NPatchAllLv+1).
+        """
+        if "NPar_Offset" not in self.snapshot._cache:
+            npar = np.asarray( self.snapshot.tree["NPar"][:], dtype=np.int64 )
+            self.snapshot._cache["NPar_Offset"] = np.concatenate( ([0], np.cumsum(npar)) )
+        return self.snapshot._cache["NPar_Offset"]
+
+
+
+class Snapshot():
+    """
+    A GAMER HDF5 snapshot.
+
+    Example:
+       with Snapshot( "Data_000010" ) as snap:
+          time = snap.key_info["Time"][0]
+          dens = snap.grid.level( "Dens", 1 )         # all patches on level 1
+          posx = snap.particle["ParPosX"][0:1000]     # first 1000 particles
+    """
+    def __init__( self, filename, use_mmap=True ):
+        """
+        filename : string. Path to the snapshot.
+        use_mmap : bool. Whether or not to memory-map contiguous datasets.
+        """
+        if not os.path.isfile( filename ): raise IOError( "file \"%s\" does not exist"%filename )
+
+        self.filename = filename
+        self.use_mmap = use_mmap
+        self.h5       = h5py.File( filename, "r" )
+        self._cache   = {}
+
+        self.tree     = PatchGroup   ( self, "Tree"     )
+        self.grid     = PatchGroup   ( self, "GridData" )
+        self.particle = ParticleGroup( self, "Particle" )
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *args ):
+        self.close()
+
+    def __repr__( self ):
+        return "<Snapshot %s>"%self.filename
+
+    def close( self ):
+        self.tree._arrays.clear()
+        self.grid._arrays.clear()
+        self.particle._arrays.clear()
+        self.h5.close()
+
+    def _compound( self, name ):
+        if name not in self._cache:
+            self._cache[name] = decode_compound( self.h5[name][()] ) if name in self.h5 else {}
+        return self._cache[name]
+
+    @property
+    def key_info( self ):
+        return self._compound( "Info/KeyInfo" )
+
+    @property
+    def makefile( self ):
+        return self._compound( "Info/Makefile" )
+
+    @property
+    def sym_const( self ):
+        return self._compound( "Info/SymConst" )
+
+    @property
+    def input_para( self ):
+        return self._compound( "Info/InputPara" )
+
+    @property
+    def input_test( self ):
+        return self._compound( "Info/InputTest" )
+
+    @property
+    def user_para( self ):
+        return self._compound( "User/UserPara" )
+
+    @property
+    def time( self ):
+        return self.key_info["Time"][0]
+
+    @property
+    def step( self ):
+        return self.key_info["Step"]
+
+    @property
+    def patch_size( self ):
+        return self.key_info["PatchSize"]
+
+    @property
+    def npatch( self ):
+        """
+        Number of patches on each level.
+        """
+        return np.asarray( self.key_info["NPatch"], dtype=np.int64 )
+
+    @property
+    def nlevel( self ):
+        """
+        Number of levels with at least one patch.
+        """
+        return int( np.count_nonzero(self.npatch) )
+
+    @property
+    def gid_start( self ):
+        """
+        GID of the first patch on each level (length NLevel+1).
+        """
+        if "GID_Start" not in self._cache:
+            self._cache["GID_Start"] = np.concatenate( ([0], np.cumsum(self.npatch)) )
+        return self._cache["GID_Start"]
+
+    def level_range( self, lv ):
+        """
+        Return the GID range [start, stop) of the patches on level `lv`.
+        """
+        if lv < 0 or lv >= self.npatch.size: raise ValueError( "level %d is out of range [0, %d)"%(lv, self.npatch.size) )
+        return int( self.gid_start[lv] ), int( self.gid_start[lv+1] )
+
+    def gid_level( self, gids ):
+        """
+        Return the level of each GID.
+        """
+        return np.searchsorted( self.gid_start, gids, side="right" ) - 1
+
+    @property
+    def cell_size( self ):
+        return np.asarray( self.key_info["CellSize"] )
+
+    @property
+    def box_size( self ):
+        return np.asarray( self.key_info["BoxSize"] )
+
+    @property
+    def cvt2phy( self ):
+        """
+        Factor for converting `Tree/Corner` to physical coordinates (i.e., the finest cell size).
+        """
+        return float( self.h5["Tree/Corner"].attrs["Cvt2Phy"] )
+
+    @property
+    def cell_scale( self ):
+        """
+        Cell size of each level in the unit of `Tree/Corner`.
+        """
+        return np.asarray( self.key_info["CellScale"], dtype=np.int64 )
+
+    def leaf_mask( self, lv=None ):
+        """
+        Return a boolean array marking the leaf patches (i.e., patches without sons).
+
+        lv : int. Only return the patches on this level if not None.
+        """
+        if "Leaf" not in self._cache:
+            self._cache["Leaf"] = np.asarray( self.tree["Son"][:] ) == -1
+        if lv is None: return self._cache["Leaf"]
+        start, stop = self.level_range( lv )
+        return self._cache["Leaf"][start:stop]
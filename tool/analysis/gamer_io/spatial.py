@@ -0,0 +1,208 @@
+"""
+Spatial patch index for fast region queries on GAMER HDF5 snapshots.
+
+The index is a pointer octree built from `Tree/Corner` and `Tree/Son`:
+   1. A dense lookup table maps the root-level patch coordinates to their GIDs
+   2. Sons of a patch are always stored as 8 consecutive GIDs starting from `Son[GID]`
+A region query looks up the root patches overlapping the region and then descends level by level
+into the sons of the overlapping patches only. It thus visits O(k) patches for k overlapping
+patches plus the O(log N) ancestors along the way, and all work on each level is vectorized.
+
+The index is persisted as a sidecar file `<snapshot>.patchidx.npz` next to the snapshot and is
+rebuilt automatically if it does not match the snapshot.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import os
+import numpy as np
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+SIDECAR_SUFFIX  = ".patchidx.npz"
+INDEX_VERSION   = 1
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def sidecar_name( filename ):
+    return filename + SIDECAR_SUFFIX
+
+def snapshot_fingerprint( snap ):
+    """
+    Values identifying a snapshot: file size, step, and UniqueDataID (-1 if not available).
+    """
+    return np.array( [ os.path.getsize(snap.filename), snap.step, snap.key_info.get("UniqueDataID", -1) ], dtype=np.int64 )
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class PatchIndex():
+    """
+    Octree index of all patches in a snapshot.
+
+    All coordinates are physical coordinates (i.e., `Tree/Corner*Cvt2Phy`).
+    """
+    def __init__( self, corner, son, lbidx, gid_start, patch_size, cell_scale, cvt2phy, nx0, fingerprint ):
+        self.corner      = np.asarray( corner, dtype=np.int64 )
+        self.son         = np.asarray( son,    dtype=np.int64 )
+        self.lbidx       = np.asarray( lbidx,  dtype=np.int64 )
+        self.gid_start   = np.asarray( gid_start, dtype=np.int64 )
+        self.patch_size  = int( patch_size )
+        self.cell_scale  = np.asarray( cell_scale, dtype=np.int64 )
+        self.cvt2phy     = float( cvt2phy )
+        self.nx0         = np.asarray( nx0, dtype=np.int64 )
+        self.fingerprint = np.asarray( fingerprint, dtype=np.int64 )
+
+        self.level       = np.repeat( np.arange(self.gid_start.size-1), np.diff(self.gid_start) )
+        self.width       = self.patch_size*self.cell_scale[self.level]   # patch width in the unit of Corner
+        self.root_table  = self._build_root_table()
+
+    def _build_root_table( self ):
+        """
+        Map the root-level patch coordinates (i,j,k) to GID (-1 if absent).
+        """
+        root_width = self.patch_size*self.cell_scale[0]
+        nroot      = self.nx0//self.patch_size
+        table      = -np.ones( nroot, dtype=np.int64 )
+        start, end = self.gid_start[0], self.gid_start[1]
+        ijk        = self.corner[start:end]//root_width
+        table[ ijk[:,0], ijk[:,1], ijk[:,2] ] = np.arange( start, end )
+        return table
+
+    @classmethod
+    def build( cls, snap ):
+        """
+        Build the index of a `gamer_io.Snapshot`.
+        """
+        ki = snap.key_info
+        return cls( corner      = snap.tree["Corner"][:],
+                    son         = snap.tree["Son"][:],
+                    lbidx       = snap.tree["LBIdx"][:],
+                    gid_start   = snap.gid_start,
+                    patch_size  = snap.patch_size,
+                    cell_scale  = snap.cell_scale,
+                    cvt2phy     = snap.cvt2phy,
+                    nx0         = ki["NX0"],
+                    fingerprint = snapshot_fingerprint(snap) )
+
+    @classmethod
+    def load( cls, filename ):
+        with np.load( filename ) as f:
+            if int( f["version"] ) != INDEX_VERSION: raise ValueError( "unsupported index version %d in %s"%(int(f["version"]), filename) )
+            return cls( **{ key: f[key] for key in ( "corner", "son", "lbidx", "gid_start", "patch_size", "cell_scale",
+                                                     "cvt2phy", "nx0", "fingerprint" ) } )
+
+    @classmethod
+    def open( cls, snap, save=True ):
+        """
+        Load the sidecar index of a snapshot, or build it if it does not exist or is out of date.
+
+        snap : gamer_io.Snapshot.
+        save : bool. Whether or not to store a newly built index as a sidecar file.
+        """
+        filename = sidecar_name( snap.filename )
+        if os.path.isfile( filename ):
+            try:
+                index = cls.load( filename )
+                if np.array_equal( index.fingerprint, snapshot_fingerprint(snap) ): return index
+            except (ValueError, KeyError, OSError):
+                pass
+
+        index = cls.build( snap )
+        if save:
+            try:
+                index.save( filename )
+            except OSError:
+                pass   # read-only directory --> just use the index in memory
+        return index
+
+    def save( self, filename ):
+        tmp = filename + ".tmp.npz"
+        np.savez( tmp, version=INDEX_VERSION, corner=self.corner.astype(np.int32), son=self.son.astype(np.int32),
+                  lbidx=self.lbidx, gid_start=self.gid_start, patch_size=self.patch_size, cell_scale=self.cell_scale,
+                  cvt2phy=self.cvt2phy, nx0=self.nx0, fingerprint=self.fingerprint )
+        os.replace( tmp, filename )
+
+    @property
+    def npatch( self ):
+        return self.son.size
+
+    def patch_edges( self, gids ):
+        """
+        Return the physical left and right edges of the given patches with the shape [N][3].
+        """
+        gids = np.asarray( gids, dtype=np.int64 )
+        left = self.corner[gids]
+        return left*self.cvt2phy, ( left + self.width[gids][:,None] )*self.cvt2phy
+
+    def _root_candidates( self, lo, hi ):
+        """
+        GIDs of the root patches overlapping the physical box [lo, hi].
+        """
+        root_width = self.patch_size*self.cell_scale[0]*self.cvt2phy
+        nroot      = np.array( self.root_table.shape )
+        ilo        = np.clip( np.floor(np.asarray(lo)/root_width).astype(np.int64), 0, nroot )
+        ihi        = np.clip( np.floor(np.asarray(hi)/root_width).astype(np.int64)+1, 0, nroot )
+        gids       = self.root_table[ ilo[0]:ihi[0], ilo[1]:ihi[1], ilo[2]:ihi[2] ].ravel()
+        return gids[ gids >= 0 ]
+
+    def _query( self, lo, hi, overlap, leaf_only, max_level ):
+        out  = []
+        cand = self._root_candidates( lo, hi )
+        lv   = 0
+        while cand.size > 0:
+            left, right = self.patch_edges( cand )
+            cand        = cand[ overlap( left, right ) ]
+            son         = self.son[cand]
+            is_leaf     = ( son < 0 ) if max_level is None or lv < max_level else np.ones( cand.size, dtype=bool )
+
+            out.append( cand[is_leaf] if leaf_only else cand )
+            cand = ( son[~is_leaf][:,None] + np.arange(8) ).ravel()
+            lv  += 1
+
+        gids = np.concatenate( out ) if out else np.empty( 0, dtype=np.int64 )
+        return np.sort( gids )
+
+    def query_box( self, lo, hi, leaf_only=True, max_level=None ):
+        """
+        Return the sorted GIDs of the patches overlapping the box [lo, hi].
+
+        lo/hi     : array of 3 floats. Physical coordinates of the box corners.
+        leaf_only : bool. Only return leaf patches (True) or all overlapping patches (False).
+        max_level : int. Treat patches on this level as leaves if not None.
+        """
+        lo = np.asarray( lo, dtype=np.float64 )
+        hi = np.asarray( hi, dtype=np.float64 )
+        overlap = lambda left, right: np.all( (left < hi) & (right > lo), axis=1 )
+        return self._query( lo, hi, overlap, leaf_only, max_level )
+
+    def query_sphere( self, center, radius, leaf_only=True, max_level=None ):
+        """
+        Return the sorted GIDs of the patches overlapping the sphere of the given center and radius.
+        """
+        center = np.asarray( center, dtype=np.float64 )
+        def overlap( left, right ):
+            dist = np.clip( center, left, right ) - center
+            return np.sum( dist**2, axis=1 ) <= radius**2
+        return self._query( center-radius, center+radius, overlap, leaf_only, max_level )
+
+    def hilbert_order( self, gids ):
+        """
+        Sort GIDs by level and then by LBIdx (i.e., along the space-filling curve of each level).
+        """
+        gids = np.asarray( gids, dtype=np.int64 )
+        return gids[ np.lexsort( (self.lbidx[gids], self.level[gids]) ) ]
+
+    def read( self, snap, field, gids ):
+        """
+        Read the GridData rows of the given patches only.
+        """
+        return snap.grid[field].take( gids )
@@ -0,0 +1,201 @@
+"""
+Streaming per-level statistics of GridData fields.
+
+A single pass over the leaf cells (i.e., cells in patches without sons, judged by `Tree/Son`) computes on each level
+   1. the number of cells and the total weight
+   2. the weighted mean and variance (merged with the parallel algorithm of Chan et al.)
+   3. the minimum and maximum together with the cell-center coordinates where they occur
+   4. a weighted histogram with user-specified bins (optional)
+Rows are read one block at a time, so the memory consumption is independent of the snapshot size, and the row
+ranges can be distributed to multiple processes whose partial results are merged at the end.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import multiprocessing
+import numpy as np
+
+from .snapshot import Snapshot
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+BLOCK_ROWS = 1024   # number of patches per block if the dataset is not chunked
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class LevelStats():
+    """
+    Accumulator of the statistics on all levels.
+
+    weight : "volume" (cell volume), "mass" (Dens times cell volume), "cell" (1 per cell), or a GridData field name.
+    bins   : array of histogram bin edges, or None to disable the histogram.
+    """
+    def __init__( self, nlevel, bins=None ):
+        self.nlevel   = nlevel
+        self.bins     = None if bins is None else np.asarray( bins, dtype=np.float64 )
+        self.count    = np.zeros( nlevel, dtype=np.int64 )
+        self.weight   = np.zeros( nlevel )
+        self.mean     = np.zeros( nlevel )
+        self.m2       = np.zeros( nlevel )
+        self.min      = np.full ( nlevel,  np.inf )
+        self.max      = np.full ( nlevel, -np.inf )
+        self.min_pos  = np.full ( (nlevel, 3), np.nan )
+        self.max_pos  = np.full ( (nlevel, 3), np.nan )
+        self.hist     = None if bins is None else np.zeros( (nlevel, self.bins.size-1) )
+
+    def _merge_moments( self, lv, n, w, mean, m2 ):
+        if w <= 0.0: return
+        w_tot          = self.weight[lv] + w
+        delta          = mean - self.mean[lv]
+        self.mean[lv] += delta*w/w_tot
+        self.m2[lv]   += m2 + delta**2*self.weight[lv]*w/w_tot
+        self.weight[lv] = w_tot
+        self.count[lv] += n
+
+    def add( self, lv, value, weight, pos_func ):
+        """
+        Add the values of cells on level `lv`.
+
+        value    : array of cell values.
+        weight   : array of cell weights with the same shape as `value`.
+        pos_func : function returning the cell-center coordinates of a flattened cell index.
+        """
+        value  = np.asarray( value,  dtype=np.float64 ).ravel()
+        weight = np.asarray( weight, dtype=np.float64 ).ravel()
+        if value.size == 0: return
+
+        w = weight.sum()
+        if w > 0.0:
+            mean = np.dot( weight, value )/w
+            m2   = np.dot( weight, (value-mean)**2 )
+            self._merge_moments( lv, value.size, w, mean, m2 )
+        else:
+            self.count[lv] += value.size
+
+        imin, imax = np.nanargmin( value ), np.nanargmax( value )
+        if value[imin] < self.min[lv]: self.min[lv], self.min_pos[lv] = value[imin], pos_func( imin )
+        if value[imax] > self.max[lv]: self.max[lv], self.max_pos[lv] = value[imax], pos_func( imax )
+
+        if self.hist is not None:
+            self.hist[lv] += np.histogram( value, bins=self.bins, weights=weight )[0]
+
+    def merge( self, other ):
+        for lv in range( self.nlevel ):
+            if other.count[lv] == 0: continue
+            if other.weight[lv] > 0.0:
+                self._merge_moments( lv, other.count[lv], other.weight[lv], other.mean[lv], other.m2[lv] )
+            else:
+                self.count[lv] += other.count[lv]
+            if other.min[lv] < self.min[lv]: self.min[lv], self.min_pos[lv] = other.min[lv], other.min_pos[lv]
+            if other.max[lv] > self.max[lv]: self.max[lv], self.max_pos[lv] = other.max[lv], other.max_pos[lv]
+        if self.hist is not None: self.hist += other.hist
+        return self
+
+    @property
+    def variance( self ):
+        with np.errstate( invalid="ignore", divide="ignore" ):
+            return np.where( self.weight > 0.0, self.m2/self.weight, np.nan )
+
+    def total( self ):
+        """
+        Statistics over all levels.
+        """
+        out = LevelStats( 1, self.bins )
+        for lv in range( self.nlevel ):
+            part = LevelStats( 1, self.bins )
+            part.count[0], part.weight[0], part.mean[0], part.m2[0] = self.count[lv], self.weight[lv], self.mean[lv], self.m2[lv]
+            part.min[0], part.max[0], part.min_pos[0], part.max_pos[0] = self.min[lv], self.max[lv], self.min_pos[lv], self.max_pos[lv]
+            if self.hist is not None: part.hist[0] = self.hist[lv]
+            out.merge( part )
+        return out
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def _cell_weight( snap, weight, lv, rows, leaf_cells ):
+    dv = snap.cell_size[lv]**3
+    if   weight == "cell":   return np.ones( leaf_cells.sum() )
+    elif weight == "volume": return np.full( leaf_cells.sum(), dv )
+    elif weight == "mass":   return snap.grid["Dens"][rows][leaf_cells]*dv
+    else:                    return snap.grid[weight][rows][leaf_cells]
+
+def reduce_rows( filename, field, start, stop, weight="volume", bins=None, leaf_only=True ):
+    """
+    Compute the statistics of the patches with GID in [start, stop).
+    """
+    snap   = Snapshot( filename )
+    dset   = snap.grid[field]
+    ps     = snap.patch_size
+    stats  = LevelStats( snap.npatch.size, bins )
+    block  = dset.chunks[0] if dset.chunks is not None else BLOCK_ROWS
+    block  = max( block, BLOCK_ROWS//block*block )
+    corner = snap.tree["Corner"]
+    scale  = snap.cell_scale
+    cvt    = snap.cvt2phy
+    leaf   = snap.leaf_mask()
+    idx    = ( np.arange(ps) + 0.5 )
+
+    for lv in range( snap.npatch.size ):
+        lv_start, lv_stop = snap.level_range( lv )
+        s0, e0 = max( start, lv_start ), min( stop, lv_stop )
+        for s in range( s0, e0, block ):
+            e          = min( s+block, e0 )
+            rows       = slice( s, e )
+            leaf_patch = leaf[s:e] if leaf_only else np.ones( e-s, dtype=bool )
+            if not leaf_patch.any(): continue
+
+            leaf_cells = np.broadcast_to( leaf_patch[:,None,None,None], (e-s, ps, ps, ps) )
+            value      = dset[rows][leaf_cells]
+            cr         = corner[rows][leaf_patch]
+
+            def pos_func( i, cr=cr ):
+                p, k, j, ii = np.unravel_index( i, (cr.shape[0], ps, ps, ps) )
+                return ( cr[p] + np.array([idx[ii], idx[j], idx[k]])*scale[lv] )*cvt
+
+            stats.add( lv, value, _cell_weight(snap, weight, lv, rows, leaf_cells), pos_func )
+
+    snap.close()
+    return stats
+
+def _reduce_task( args ):
+    return reduce_rows( *args )
+
+def field_stats( filename, field, weight="volume", bins=None, nproc=1, leaf_only=True ):
+    """
+    Compute the per-level statistics of a GridData field.
+
+    filename  : string. Snapshot filename.
+    field     : string. Target field in GridData.
+    weight    : string. See `LevelStats`.
+    bins      : array of histogram bin edges, or None to disable the histogram.
+    nproc     : int. Number of processes.
+    leaf_only : bool. Exclude the cells of non-leaf patches.
+
+    Return a `LevelStats` object.
+    """
+    with Snapshot( filename ) as snap:
+        npatch = int( snap.gid_start[-1] )
+        nlevel = snap.npatch.size
+        dset   = snap.grid[field]
+        align  = dset.chunks[0] if dset.chunks is not None else 1
+
+    ntask  = max( 1, 4*nproc )
+    size   = max( align, -(-npatch//ntask)//align*align )
+    tasks  = [ (filename, field, s, min(s+size, npatch), weight, bins, leaf_only) for s in range(0, npatch, size) ]
+
+    if nproc > 1:
+        with multiprocessing.Pool( nproc ) as pool: parts = pool.map( _reduce_task, tasks )
+    else:
+        parts = [ _reduce_task(t) for t in tasks ]
+
+    stats = LevelStats( nlevel, bins )
+    for p in parts: stats.merge( p )
+    return stats
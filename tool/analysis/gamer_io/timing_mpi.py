@@ -0,0 +1,289 @@
+"""
+Per-rank MPI timing logs written by the option OPT__TIMING_MPI (Record__TimingMPI_Rank*).
+
+Each rank appends one row per buffer exchange (LB_GetBufferData) or particle exchange (Par_LB_SendParticleData):
+   Lv  Mode  NVar  NBuf  Prep(s)  Close(s)  MPI(s)  Send(MB)  Recv(MB)  Send(MB/s)  Recv(MB/s)
+where the fields not measured for particles are "X". These exchanges are collective, so all ranks write their
+rows in the same order, and the i-th rows of all files describe the same call. The rows of all ranks are
+therefore loaded into a columnar store of [NRank][NCall] arrays.
+
+For each call, the ranks reaching the collective early wait for the last one, so the MPI time of a rank minus
+the minimum MPI time over all ranks is taken as its wait time, the rank with the minimum MPI time as the last
+arrival, and the maximum over ranks as the length of the call on the critical path. A rank (or node) is a
+straggler if the wait time it causes as the last arrival is much larger than its fair share.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import glob
+import multiprocessing
+import os
+import re
+import numpy as np
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+FILE_PATTERN  = "Record__TimingMPI_Rank*"
+STORE_NAME    = ".Record__TimingMPI.npz"
+NTOKEN        = 11   # number of tokens per row
+FLOAT_COLUMNS = { "Prep": 4, "Close": 5, "MPI": 6, "Send": 7, "Recv": 8 }   # column name --> token index
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class TimingMPIStore():
+    """
+    Rows of all Record__TimingMPI_Rank* files in a directory, stored by column.
+
+    Example:
+       store = TimingMPIStore.open( "./", nproc=16 )
+       tab   = store.table()   # [NRank][NCall] arrays of the calls common to all ranks
+
+    Attributes:
+       ranks   : [NRank] rank of each file
+       modes   : list of the exchange modes (e.g., "Flu", "Pot4Poi", "Par_2Son")
+       offsets : [NRank+1] first row of each rank in the columns
+       columns : "Lv", "Mode" (index to `modes`), "Prep", "Close", "MPI", "Send", "Recv" as 1D arrays of all rows
+       stamps  : [NRank][2] size and modification time of each file when it was read
+    """
+    def __init__( self, path="." ):
+        self.path    = path
+        self.files   = []
+        self.ranks   = np.empty( 0, dtype=np.int64 )
+        self.modes   = []
+        self.offsets = np.zeros( 1, dtype=np.int64 )
+        self.columns = {}
+        self.stamps  = np.empty( (0, 2), dtype=np.int64 )
+
+    @classmethod
+    def open( cls, path=".", nproc=1, cache=True ):
+        """
+        Load all rank files in `path` with `nproc` processes. With `cache`, the store is kept in the hidden file
+        `.Record__TimingMPI.npz` and only the files modified since then are read again.
+        """
+        files = sorted( glob.glob( os.path.join(path, FILE_PATTERN) ), key=_rank_of )
+        files = [ f for f in files if _rank_of(f) >= 0 ]
+        if len(files) == 0: raise FileNotFoundError( "no %s found in %s"%(FILE_PATTERN, path) )
+
+        stamps = np.array( [ (st.st_size, st.st_mtime_ns) for st in map(os.stat, files) ], dtype=np.int64 )
+        old    = cls._load( os.path.join(path, STORE_NAME) ) if cache else None
+
+        parts = [ None ]*len( files )
+        if old is not None:
+            prev = { r: i for i, r in enumerate( old.ranks ) }
+            for i, f in enumerate( files ):
+                j = prev.get( _rank_of(f) )
+                if j is not None and np.array_equal( old.stamps[j], stamps[i] ): parts[i] = old._part( j )
+
+        todo = [ i for i, p in enumerate(parts) if p is None ]
+        if todo:
+            if nproc > 1 and len(todo) > 1:
+                with multiprocessing.Pool( min(nproc, len(todo)) ) as pool:
+                    new = pool.map( read_timing_mpi, [ files[i] for i in todo ], chunksize=max(1, len(todo)//(4*nproc)) )
+            else:
+                new = [ read_timing_mpi( files[i] ) for i in todo ]
+            for i, p in zip( todo, new ): parts[i] = p
+
+        store = cls( path )
+        store._assemble( files, stamps, parts )
+        if cache and todo: store.save()
+        return store
+
+    def _part( self, j ):
+        s, e = self.offsets[j], self.offsets[j+1]
+        out  = { k: v[s:e] for k, v in self.columns.items() }
+        out["ModeNames"] = self.modes
+        return out
+
+    def _assemble( self, files, stamps, parts ):
+        modes = sorted( set().union( *[ set(p["ModeNames"]) for p in parts ] ) )
+        code  = { m: i for i, m in enumerate( modes ) }
+        remap = [ np.array( [code[m] for m in p["ModeNames"]], dtype=np.int16 ) for p in parts ]
+        self.files   = list( files )
+        self.ranks   = np.array( [ _rank_of(f) for f in files ], dtype=np.int64 )
+        self.modes   = modes
+        self.stamps  = stamps
+        self.offsets = np.concatenate( ( [0], np.cumsum( [ p["Lv"].size for p in parts ] ) ) ).astype( np.int64 )
+        self.columns = { "Lv"  : np.concatenate( [ p["Lv"] for p in parts ] ).astype( np.int16 ),
+                         "Mode": np.concatenate( [ r[ p["Mode"] ] if r.size > 0 else p["Mode"] for r, p in zip(remap, parts) ] ) }
+        for k in FLOAT_COLUMNS:
+            self.columns[k] = np.concatenate( [ p[k] for p in parts ] ).astype( np.float32 )
+
+    @classmethod
+    def _load( cls, filename ):
+        if not os.path.isfile( filename ): return None
+        try:
+            with np.load( filename, allow_pickle=False ) as f:
+                store         = cls( os.path.dirname(filename) )
+                store.ranks   = f["ranks"]
+                store.modes   = f["modes"].tolist()
+                store.offsets = f["offsets"]
+                store.stamps  = f["stamps"]
+                store.columns = { k: f["col_"+k] for k in ( "Lv", "Mode", *FLOAT_COLUMNS ) }
+            return store
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save( self ):
+        """
+        Store the columns in `.Record__TimingMPI.npz`. Nothing is done if the directory is not writable.
+        """
+        try:
+            tmp = os.path.join( self.path, STORE_NAME+".tmp.npz" )
+            np.savez( tmp, ranks=self.ranks, modes=np.array(self.modes, dtype=str), offsets=self.offsets,
+                      stamps=self.stamps, **{ "col_"+k: v for k, v in self.columns.items() } )
+            os.replace( tmp, os.path.join(self.path, STORE_NAME) )
+        except OSError:
+            pass
+
+    @property
+    def nrow( self ):
+        return np.diff( self.offsets )
+
+    def table( self, last=None ):
+        """
+        Return the calls common to all ranks as a dictionary of [NRank][NCall] arrays ("Prep", "Close", "MPI",
+        "Send", "Recv") and [NCall] arrays ("Lv", "Mode"). Calls beyond the shortest file, or from the first
+        call whose level or mode differs among ranks, are dropped. Only the last `last` calls are kept if set.
+        """
+        ncall = int( self.nrow.min() )
+        idx   = self.offsets[:-1, None] + np.arange( ncall )[None, :]
+        lv    = self.columns["Lv"  ][idx]
+        mode  = self.columns["Mode"][idx]
+        bad   = np.where( ( lv != lv[0] ).any( axis=0 ) | ( mode != mode[0] ).any( axis=0 ) )[0]
+        if bad.size > 0: ncall = int( bad[0] )
+        start = 0 if last is None else max( 0, ncall-int(last) )
+
+        out = { "Lv": lv[0, start:ncall].astype( np.int64 ), "Mode": mode[0, start:ncall].astype( np.int64 ),
+                "NCallDropped": int( self.nrow.max() ) - ncall }
+        for k in FLOAT_COLUMNS: out[k] = self.columns[k][ idx[:, start:ncall] ]
+        return out
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def _rank_of( filename ):
+    m = re.search( r"Rank(\d+)$", os.path.basename(filename) )
+    return int( m.group(1) ) if m is not None else -1
+
+def read_timing_mpi( filename ):
+    """
+    Read one Record__TimingMPI_Rank* file.
+
+    Return a dictionary of 1D arrays "Lv" (int64), "Mode" (int16 index to the list "ModeNames"), and "Prep",
+    "Close", "MPI", "Send", "Recv" (float64; NaN for "X"). Header lines and a trailing line without a newline
+    are skipped.
+    """
+    with open( filename, "rb" ) as f: data = f.read()
+    data = data[ :data.rfind(b"\n")+1 ].replace( b" X ", b" nan " )
+    try:
+        tokens = data.split()
+        if len(tokens) % NTOKEN != 0: raise ValueError
+        for i in reversed( [ i for i, t in enumerate( tokens[0::NTOKEN] ) if t == b"Lv" ] ):   # headers
+            del tokens[ i*NTOKEN:(i+1)*NTOKEN ]
+        return _convert( tokens )
+    except ValueError:
+#       malformed lines (e.g., cut by a crash) --> check line by line
+        rows = [ line.split() for line in data.splitlines() ]
+        return _convert( [ t for r in rows if len(r) == NTOKEN and r[0] != b"Lv" for t in r ] )
+
+def _convert( tokens ):
+    """
+    Convert the tokens of complete rows to the columns returned by `read_timing_mpi()`.
+    """
+    names = {}
+    mode  = np.array( [ names.setdefault( m.decode("latin-1"), len(names) ) for m in tokens[1::NTOKEN] ], dtype=np.int16 )
+    out   = { "Lv": np.fromiter( map(int, tokens[0::NTOKEN]), dtype=np.int64 ), "Mode": mode, "ModeNames": list(names) }
+    for k, c in FLOAT_COLUMNS.items():
+        out[k] = np.fromiter( map(float, tokens[c::NTOKEN]), dtype=np.float64 )
+    return out
+
+def call_stats( mpi ):
+    """
+    Per-call statistics of the MPI time [NRank][NCall].
+
+    Return a dictionary of
+       "Critical" : [NCall] maximum MPI time over ranks
+       "Min"      : [NCall] minimum MPI time over ranks
+       "Wait"     : [NRank][NCall] MPI time minus "Min"
+       "Last"     : [NCall] rank index (in the store) of the last arrival, i.e., the rank with the minimum MPI time
+    """
+    mpi  = np.asarray( mpi )
+    tmin = np.nanmin( mpi, axis=0 ) if mpi.size > 0 else np.empty( mpi.shape[1:] )
+    return { "Critical": np.nanmax( mpi, axis=0 ) if mpi.size > 0 else np.empty( mpi.shape[1:] ), "Min": tmin,
+             "Wait": mpi - tmin[None, :], "Last": np.argmin( np.nan_to_num(mpi, nan=np.inf), axis=0 ) }
+
+def phase_stats( tab, calls ):
+    """
+    Aggregate the calls of each phase (level and mode).
+
+    tab   : dictionary returned by `TimingMPIStore.table()`.
+    calls : dictionary returned by `call_stats()`.
+
+    Return a list of dictionaries with the keys "Lv", "Mode", "NCall", "Critical" (sum of the critical-path
+    time), "Wait" (sum of the mean wait time over ranks), "MaxWait" (sum of the maximum wait time), "Prep" and
+    "Close" (sum of the maximum over ranks), and "MB" (data sent by all ranks), sorted by "Critical".
+    """
+    key        = tab["Lv"]*( int(tab["Mode"].max())+1 if tab["Mode"].size > 0 else 1 ) + tab["Mode"]
+    uniq, inv  = np.unique( key, return_inverse=True )
+    mean_wait  = np.nanmean( calls["Wait"], axis=0 ) if calls["Wait"].size > 0 else np.empty( 0 )
+
+    def total( v ):
+        return np.bincount( inv, weights=np.nan_to_num(v, nan=0.0), minlength=uniq.size )
+
+    out = []
+    for i, (crit, wait, wmax, prep, close, mb) in enumerate( zip(
+            total( calls["Critical"] ), total( mean_wait ), total( np.nanmax(calls["Wait"], axis=0) ),
+            total( _nanmax0(tab["Prep"]) ), total( _nanmax0(tab["Close"]) ), total( np.nansum(tab["Send"], axis=0) ) ) ):
+        first = np.argmax( inv == i )
+        out.append( { "Lv": int(tab["Lv"][first]), "Mode": int(tab["Mode"][first]), "NCall": int( (inv == i).sum() ),
+                      "Critical": crit, "Wait": wait, "MaxWait": wmax, "Prep": prep, "Close": close, "MB": mb } )
+    return sorted( out, key=lambda p: -p["Critical"] )
+
+def _nanmax0( v ):
+    """
+    Maximum over ranks, which is zero for the calls where all values are NaN (e.g., "Prep" of particles).
+    """
+    return np.nan_to_num( np.max( np.nan_to_num(v, nan=-np.inf), axis=0 ), neginf=0.0 ) if v.size > 0 else np.empty( 0 )
+
+def straggler_stats( calls, group=None, factor=3.0, alpha=0.01 ):
+    """
+    Wait time caused by each rank (or group of ranks, e.g., a node) as the last arrival.
+
+    calls  : dictionary returned by `call_stats()`.
+    group  : [NRank] group index of each rank, or None for the ranks themselves.
+    factor : float. A group is a straggler if it causes more than `factor` times its fair share (i.e., its
+             fraction of ranks) of the total wait time ...
+    alpha  : float. ... and if it arrives last more often than expected for randomly chosen last arrivals at the
+             significance level `alpha` over all groups. The Poisson tail probability is bounded by the Chernoff
+             bound exp(-m)*(e*m/n)^n, where n and m are the observed and expected numbers of last arrivals.
+
+    Return a dictionary of [NGroup] arrays "Caused" (sum over the calls of the mean wait time over ranks),
+    "Share" (fraction of the total), "Fair" (fraction of ranks), "NLast" (number of calls as the last arrival),
+    "Wait" (mean wait time of the group itself per call), and "Straggler" (bool).
+    """
+    nrank = calls["Wait"].shape[0]
+    group = np.arange( nrank ) if group is None else np.asarray( group, dtype=np.int64 )
+    ngrp  = int( group.max() ) + 1 if group.size > 0 else 0
+    mean  = np.nan_to_num( np.nanmean( calls["Wait"], axis=0 ), nan=0.0 ) if calls["Wait"].size > 0 else np.empty( 0 )
+    lastg = group[ calls["Last"] ]
+
+    caused = np.bincount( lastg, weights=mean, minlength=ngrp )
+    nlast  = np.bincount( lastg, minlength=ngrp )
+    fair   = np.bincount( group, minlength=ngrp )/max( nrank, 1 )
+    size   = np.bincount( group, minlength=ngrp )
+    wait   = np.bincount( group, weights=np.nansum( calls["Wait"], axis=1 ), minlength=ngrp )
+    ncall  = max( calls["Wait"].shape[1], 1 )
+    share  = caused/caused.sum() if caused.sum() > 0.0 else np.zeros( ngrp )
+    expect = fair*calls["Last"].size
+    with np.errstate( invalid="ignore", divide="ignore" ):
+        log_p = np.where( nlast > expect, -expect + nlast*( 1.0 + np.log(expect) - np.log(np.maximum(nlast, 1)) ), 0.0 )
+        return { "Caused": caused, "Share": share, "Fair": fair, "NLast": nlast, "Wait": wait/np.maximum(size, 1)/ncall,
+                 "Straggler": ( share > factor*fair ) & ( size > 0 ) & ( log_p < np.log(alpha/max(ngrp, 1)) ) }
@@ -0,0 +1,267 @@
+"""
+Timing hierarchy of Record__Timing (--timing, with the GPU/CPU solvers of --timing_solver) for flame graphs.
+
+Each step block of Record__Timing is rebuilt into the tree of nested timers of one root-level step:
+   Total (Main Loop)
+      Integration
+         Lv 0, Lv 1, ...          (time spent at each level, excluding the finer levels)
+            dt, Flu_Adv, Gra_Adv, ..., Refine
+            MPI_Grid             (Buf_Rho, Buf_Pot, ..., Buf_Che)
+            Par                  (Par_KD, ..., Par_2Sib, Par_2Son, Par_Coll with their MPI sub-timers)
+      Output, Auxiliary, LoadBalance, CorrSync, libyt
+where the GPU/CPU solvers (e.g., Flu_Pre, Flu_Sol, Flu_Clo) are nested in the timers calling them. The groups
+MPI_Grid and Par follow the Summary section of the log. The time of a node not covered by its children (e.g.,
+Total minus the sum of Integration, Output, ...) is its self time, as in a profiler. Children exceeding their
+parent (e.g., the solver timers are the maximum over all ranks, and the log is rounded) leave a zero self time.
+
+The trees of all steps are kept as [NBlock] arrays, so they can be aggregated over any range of steps and
+written as collapsed stacks (one "frame;frame;... value" line per stack, read by flamegraph.pl, inferno, and
+speedscope) or as a speedscope profile.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import json
+import numpy as np
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+# node: ( frame, column, children ); the value of a node without a column is the sum of its children
+_SOLVER  = lambda *cols: tuple( ( c, c, () ) for c in cols )
+_SUB     = lambda parent, *subs: tuple( ( parent+"-"+s, parent+"-"+s, () ) for s in subs )
+LEVEL_TREE = (
+    ( "dt",       "dt",       _SOLVER( "dtFlu_Pre", "dtFlu_Sol", "dtFlu_Clo", "dtGra_Pre", "dtGra_Sol", "dtGra_Clo" ) ),
+    ( "Flu_Adv",  "Flu_Adv",  _SOLVER( "Flu_Pre", "Flu_Sol", "Flu_Clo" ) ),
+    ( "Gra_Adv",  "Gra_Adv",  ( ( "Poi_Pre", "Poi_Pre", _SOLVER( "PreRho", "PreFlu", "PrePot_C", "Pre_Pot_F" ) ), )
+                              + _SOLVER( "Poi_Sol", "Poi_Clo" ) ),
+    ( "Src_Adv",  "Src_Adv",  () ),
+    ( "Che_Adv",  "Che_Adv",  _SOLVER( "Che_Pre", "Che_Sol", "Che_Clo" ) ),
+    ( "SF",       "SF",       () ),
+    ( "FB_Adv",   "FB_Adv",   () ),
+    ( "FixUp",    "FixUp",    () ),
+    ( "Flag",     "Flag",     () ),
+    ( "Refine",   "Refine",   () ),
+    ( "MPI_Grid", None,       _SOLVER( "Buf_Rho", "Buf_Pot", "Buf_Flu1", "Buf_Flu2", "Buf_Ref", "Buf_Flux", "Buf_Res", "Buf_Che" ) ),
+    ( "Par",      None,       _SOLVER( "Par_KD", "Par_K", "Par_K-1" )
+                              + ( ( "Par_2Sib", "Par_2Sib", _SUB( "Par_2Sib", "MPI_Sib", "MPI_FaSib" ) ),
+                                  ( "Par_2Son", "Par_2Son", _SUB( "Par_2Son", "MPI" ) ),
+                                  ( "Par_Coll", "Par_Coll", _SUB( "Par_Coll", "MPI_Real", "MPI_Sib", "MPI_FaSib" ) ) ) ),
+)
+MAIN_TREE  = ( ( "Output", "Output", () ), ( "Auxiliary", "Auxiliary", () ), ( "LoadBalance", "LoadBalance", () ),
+               ( "CorrSync", "CorrSync", () ), ( "libyt", "libyt", () ) )
+STATS      = ( "Max", "Min", "Ave" )
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class TimingNode():
+    """
+    Node of the timing hierarchy.
+
+    Attributes:
+       name     : frame name (e.g., "Flu_Adv" or "Lv 1")
+       value    : inclusive time in second, an [NBlock] array or a float after `reduce`
+       children : list of the child nodes
+    """
+    def __init__( self, name, value, children=None ):
+        self.name     = name
+        self.value    = value
+        self.children = children if children is not None else []
+
+    def self_value( self ):
+        """
+        Time not covered by the children (zero if the children exceed this node).
+        """
+        covered = sum( ( c.value for c in self.children ), 0.0 )
+        diff    = self.value - covered
+        out     = np.where( diff > 1.0e-9*np.abs( self.value ), diff, 0.0 )   # ignore the round-off of the sums
+        return out if out.ndim > 0 else float( out )
+
+    def excess( self ):
+        """
+        Time by which the children exceed this node.
+        """
+        covered = sum( ( c.value for c in self.children ), 0.0 )
+        return np.maximum( covered - self.value, 0.0 )
+
+    def reduce( self, index=slice(None), how="sum" ):
+        """
+        Return a copy with the scalar values reduced over the selected blocks, where `how` is "sum" or "mean".
+        """
+        if how not in ( "sum", "mean" ): raise ValueError( "unknown reduction %s"%how )
+        v = np.asarray( self.value )[index]
+        v = v.sum() if how == "sum" else ( v.mean() if v.size > 0 else 0.0 )
+        return TimingNode( self.name, float( v ), [ c.reduce( index, how ) for c in self.children ] )
+
+    def walk( self, stack=() ):
+        """
+        Yield ( stack, node ) of this node and all its descendants in depth-first order, where `stack` is the
+        tuple of the frame names from the root.
+        """
+        stack = stack + ( self.name, )
+        yield stack, self
+        for c in self.children:
+            yield from c.walk( stack )
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def timing_stats( rec ):
+    """
+    Return the statistics over ranks recorded in Record__Timing: [""] without OPT__TIMING_BALANCE, and
+    ["Max", "Min", "Ave"] with it.
+    """
+    keys = rec.keys()
+    if "Main Loop/Total" in keys: return [ "" ]
+    return [ s for s in STATS if "Main Loop/%s/Total"%s in keys ]
+
+def timing_levels( rec ):
+    """
+    Return the AMR levels recorded in the Integration Loop section.
+    """
+    levels = []
+    for row in rec.rows( "Integration Loop" ):
+        lv = row.split()[-1]
+        if lv.isdigit() and int( lv ) not in levels: levels.append( int( lv ) )
+    return sorted( levels )
+
+def timing_tree( rec, stat=None, merge_levels=False ):
+    """
+    Rebuild the timing hierarchy of each step block of a RecordTiming (see the module docstring).
+
+    rec          : RecordTiming.
+    stat         : string. Statistic over ranks with OPT__TIMING_BALANCE ("Max", "Min", or "Ave"); default is
+                   "Max". The GPU/CPU solvers are always the maximum over ranks.
+    merge_levels : bool. Sum each timer over all levels instead of nesting the timers in the levels, in which
+                   case the time of the levels not covered by their timers becomes the self time of Integration.
+
+    Return the root TimingNode with [NBlock] values, where the timers absent from the log are omitted and the
+    timers missing in some blocks (e.g., after a restart with different options) are zero there.
+    """
+    stats = timing_stats( rec )
+    if len( stats ) == 0: raise ValueError( "no Main Loop section found in %s"%rec.filename )
+    if stat is None: stat = stats[0] if stats == [""] else "Max"
+    if stat not in stats: raise ValueError( "statistic %s is not recorded in %s (%s)"%(stat, rec.filename, stats) )
+    keys   = set( rec.keys() )
+    prefix = stat + " " if stat else ""
+
+    def column( key ):
+        return np.nan_to_num( rec.column( key ), nan=0.0 ) if key in keys else None
+
+    def build( spec, lookup ):
+        nodes = []
+        for frame, col, sub in spec:
+            children = build( sub, lookup )
+            value    = lookup( col ) if col is not None else None
+            if value is None:
+                if col is not None  or  len( children ) == 0: continue
+                value = sum( c.value for c in children )
+            nodes.append( TimingNode( frame, value, children ) )
+        return nodes
+
+    main = lambda col: column( "Main Loop/%s%s"%(stat+"/" if stat else "", col) )
+    root = TimingNode( "Total", main( "Total" ), build( MAIN_TREE, main ) )
+
+    levels = []
+    for lv in timing_levels( rec ):
+        def lookup( col, lv=lv ):
+            value = column( "Integration Loop/%s%d/%s"%(prefix, lv, col) )
+            return value if value is not None else column( "GPU/CPU solvers/%d/%s"%(lv, col) )
+        total = lookup( "Total" )
+        if total is None: continue
+        levels.append( TimingNode( "Lv %d"%lv, total, build( LEVEL_TREE, lookup ) ) )
+
+    integration = main( "Integration" )
+    if integration is not None:
+        if merge_levels: levels = _merge( sum( ( n.children for n in levels ), [] ) )
+        root.children.insert( 0, TimingNode( "Integration", integration, levels ) )
+    return root
+
+def _merge( nodes ):
+    """
+    Sum the nodes of the same name, recursively merging their children.
+    """
+    merged = {}
+    for n in nodes:
+        if n.name not in merged: merged[n.name] = ( n.value, list( n.children ) )
+        else:                    merged[n.name] = ( merged[n.name][0] + n.value, merged[n.name][1] + n.children )
+    return [ TimingNode( name, value, _merge( children ) ) for name, ( value, children ) in merged.items() ]
+
+def collapsed_stacks( node, scale=1.0e6 ):
+    """
+    Return the collapsed stacks of a reduced tree (see `TimingNode.reduce`) as a list of "frame;frame;... value"
+    lines, where the value is the self time of the innermost frame times `scale` (microseconds by default),
+    rounded to an integer. Stacks with a zero value are omitted.
+    """
+    lines = []
+    for stack, n in node.walk():
+        value = int( round( scale*n.self_value() ) )
+        if value > 0: lines.append( "%s %d"%( ";".join( stack ), value ) )
+    return lines
+
+def speedscope( tree, name="Record__Timing", aggregated=None, index=None, exporter="gamer_io" ):
+    """
+    Return a speedscope profile (https://www.speedscope.app) as a dictionary to be written in JSON.
+
+    tree       : root TimingNode with [NBlock] values (see `timing_tree`). The blocks are laid out back to back in
+                 an evented profile, whose time axis is the cumulative wall time of the steps.
+    name       : string. Profile name.
+    aggregated : reduced root TimingNode (see `TimingNode.reduce`), also stored as a sampled profile weighted by the
+                 self times. It is the first profile if given.
+    index      : indices of the blocks laid out in the evented profile. Default is all blocks.
+    """
+    frames, ids = [], {}
+    def frame( name ):
+        if name not in ids:
+            ids[name] = len( frames )
+            frames.append( { "name": name } )
+        return ids[name]
+
+    profiles = []
+    if aggregated is not None:
+        samples, weights = [], []
+        for stack, n in aggregated.walk():
+            w = n.self_value()
+            if w > 0.0:
+                samples.append( [ frame( f ) for f in stack ] )
+                weights.append( w )
+        profiles.append( { "type": "sampled", "name": name+" (aggregated)", "unit": "seconds", "startValue": 0.0,
+                           "endValue": float( sum( weights ) ), "samples": samples, "weights": weights } )
+
+    events = []
+    def layout( node, b, start ):
+        """ Open and close the frame of a node at block b, and return its end. """
+        opened = len( events )
+        events.append( None )   # replaced by the opening event if the frame is not empty
+        end    = start
+        for c in node.children:
+            end = layout( c, b, end )
+        end = max( start + float( node.value[b] ), end )
+        if end > start:
+            events[opened] = { "type": "O", "frame": frame( node.name ), "at": start }
+            events.append( { "type": "C", "frame": frame( node.name ), "at": end } )
+        return end
+
+    now = 0.0
+    for b in ( range( np.size( tree.value ) ) if index is None else index ):
+        now = layout( tree, b, now )
+    profiles.append( { "type": "evented", "name": name+" (steps)", "unit": "seconds", "startValue": 0.0,
+                       "endValue": now, "events": [ e for e in events if e is not None ] } )
+
+    return { "$schema": SPEEDSCOPE_SCHEMA, "shared": { "frames": frames }, "profiles": profiles, "name": name,
+             "activeProfileIndex": 0, "exporter": exporter }
+
+def write_speedscope( filename, profile ):
+    """
+    Write a speedscope profile (see `speedscope`) in JSON.
+    """
+    with open( filename, "w" ) as f:
+        json.dump( profile, f )
@@ -0,0 +1,181 @@
+"""
+Particle trajectories across snapshots.
+
+The order of particles within a patch is unspecified in the HDF5 output, so particles must be matched by an
+ID attribute. GAMER does not define one by default; a test problem can add it with, for example,
+`AddParticleAttributeInt( "ParPID" )` and assign unique values in its particle initializer.
+
+For each snapshot, a permutation sorting the IDs is stored as a sidecar file `<snapshot>.pididx.npy`
+holding a [2][NPar] int64 array (row 0: sorted IDs, row 1: the corresponding particle rows). The sidecar is
+memory-mapped, so looking up k sorted IDs is a merge of two sorted arrays via `np.searchsorted()` that only
+touches O(k log NPar) entries, and the matched particle rows are then read as contiguous hyperslabs.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import multiprocessing
+import os
+import numpy as np
+
+from .snapshot import Snapshot
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+PID_SUFFIX = ".pididx.npy"
+PID_ATTR   = "ParPID"
+PID_BLOCK  = 1 << 22   # number of IDs read at once when building the index
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class PIDIndex():
+    """
+    Sorted particle IDs and the corresponding rows of a snapshot.
+
+    Example:
+       index = PIDIndex.open( snap )
+       rows  = index.lookup( [10, 20, 30] )
+    """
+    def __init__( self, table ):
+        """
+        table : [2][NPar] int64 array. Sorted IDs and their particle rows.
+        """
+        self.table = table
+
+    @property
+    def ids( self ):
+        return self.table[0]
+
+    @property
+    def rows( self ):
+        return self.table[1]
+
+    @property
+    def npar( self ):
+        return self.table.shape[1]
+
+    @classmethod
+    def build( cls, snap, id_attr=PID_ATTR ):
+        """
+        Build the index by sorting the IDs of all particles.
+        """
+        if id_attr not in snap.particle:
+            raise KeyError( "particle attribute \"%s\" does not exist in %s (particle IDs must be added as a "
+                            "particle attribute by the test problem)"%(id_attr, snap.filename) )
+
+        dset = snap.particle[id_attr]
+        ids  = np.empty( dset.shape[0], dtype=np.int64 )
+        for s, block in dset.iter_chunks( PID_BLOCK ):
+            ids[s:s+block.shape[0]] = np.rint( block ) if block.dtype.kind == "f" else block
+
+        table    = np.empty( (2, ids.size), dtype=np.int64 )
+        table[1] = np.argsort( ids, kind="stable" )
+        table[0] = ids[ table[1] ]
+        return cls( table )
+
+    @classmethod
+    def open( cls, snap, id_attr=PID_ATTR, save=True ):
+        """
+        Memory-map the sidecar index of a snapshot, or build it if it does not exist or is out of date.
+
+        snap    : Snapshot.
+        id_attr : string. Name of the particle ID attribute.
+        save    : bool. Whether or not to store a newly built index as a sidecar file.
+        """
+        filename = snap.filename + PID_SUFFIX
+        if os.path.isfile( filename ) and os.path.getmtime( filename ) >= os.path.getmtime( snap.filename ):
+            try:
+                table = np.load( filename, mmap_mode="r" )
+                if table.shape == (2, snap.particle.npar): return cls( table )
+            except (ValueError, OSError):
+                pass
+
+        index = cls.build( snap, id_attr )
+        if save:
+            try:
+                tmp = filename + ".tmp.npy"
+                np.save( tmp, index.table )
+                os.replace( tmp, filename )
+            except OSError:
+                pass   # read-only directory --> just use the index in memory
+        return index
+
+    def lookup( self, pids ):
+        """
+        Return the particle rows of the given IDs (-1 for the IDs not found).
+
+        pids : 1D integer array. Target IDs in any order.
+        """
+        pids  = np.asarray( pids, dtype=np.int64 )
+        order = np.argsort( pids, kind="stable" )
+        found = np.full( pids.size, -1, dtype=np.int64 )
+        if self.npar == 0 or pids.size == 0: return found
+
+        query = pids[order]
+        loc   = np.minimum( np.searchsorted(self.ids, query), self.npar-1 )
+        match = np.asarray( self.ids[loc] ) == query
+        found[ order[match] ] = self.rows[ loc[match] ]
+        return found
+
+    def duplicates( self ):
+        """
+        Return the IDs that appear more than once.
+        """
+        ids = np.asarray( self.ids )
+        return np.unique( ids[1:][ ids[1:] == ids[:-1] ] )
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def _track_snapshot( args ):
+    filename, pids, attributes, id_attr, save = args
+    with Snapshot( filename ) as snap:
+        rows  = PIDIndex.open( snap, id_attr, save ).lookup( pids )
+        found = rows >= 0
+        out   = {}
+        for v in attributes:
+            data         = np.full( pids.size, np.nan )
+            data[found]  = snap.particle[v].take( rows[found] )
+            out[v]       = data
+        return snap.time, snap.step, found, out
+
+def track_particles( filenames, pids, attributes=("ParPosX", "ParPosY", "ParPosZ"), id_attr=PID_ATTR, nproc=1,
+                     save=True ):
+    """
+    Extract the trajectories of the given particles.
+
+    filenames  : list of strings. Snapshots in time order.
+    pids       : 1D integer array. Target particle IDs.
+    attributes : list of strings. Particle attributes to be recorded.
+    id_attr    : string. Name of the particle ID attribute.
+    nproc      : int. Number of processes (each process handles different snapshots).
+    save       : bool. Whether or not to store the sidecar ID indices.
+
+    Return a dictionary with
+       "Time"/"Step" : [NSnap] arrays
+       "PID"         : [NID] array
+       "Found"       : [NSnap][NID] boolean array (False if a particle does not exist in a snapshot)
+       <attribute>   : [NSnap][NID] float64 array (NaN if not found)
+    """
+    pids  = np.asarray( pids, dtype=np.int64 )
+    tasks = [ (fn, pids, list(attributes), id_attr, save) for fn in filenames ]
+
+    if nproc > 1 and len(tasks) > 1:
+        with multiprocessing.Pool( nproc ) as pool: parts = pool.map( _track_snapshot, tasks, chunksize=1 )
+    else:
+        parts = [ _track_snapshot(t) for t in tasks ]
+
+    out = { "Time"  : np.array( [p[0] for p in parts], dtype=np.float64 ),
+            "Step"  : np.array( [p[1] for p in parts], dtype=np.int64 ),
+            "PID"   : pids,
+            "Found" : np.array( [p[2] for p in parts], dtype=bool ).reshape( len(parts), pids.size ) }
+    for v in attributes:
+        out[v] = np.array( [p[3][v] for p in parts] ).reshape( len(parts), pids.size )
+    return out
@@ -0,0 +1,307 @@
+"""
+Cost model of the wall-clock time per root-level step and the prediction of the wall time remaining for a run.
+
+The ElapsedTime of each step in Record__Performance is modeled as a linear combination of
+   NUpdate_Cell : cell updates per MPI rank, scaled by 1+WLI if Record__PatchCount is available so that it
+                  approximates the cell updates of the most loaded rank
+   NCell        : cells per MPI rank (e.g., refinement and load balancing once per step)
+   NUpdate_Par  : particle updates per MPI rank
+   NSubstep     : sum of NUpdate_Lv* over all levels (per-level overhead, e.g., synchronization and the
+                  ghost-zone exchange, which does not shrink with more ranks)
+   Const        : one (per-step overhead)
+with non-negative coefficients. The number of ranks is taken from Record__Note, or estimated by
+Perf_Overall/Perf_PerRank otherwise, so a single model can be fitted to archived runs with different numbers
+of ranks.
+
+The remaining wall time of a run is the integral of the modeled cost per unit physical time from the latest
+record to END_T. The rate of each feature per unit physical time (i.e., feature/dt) over the latest steps is
+extrapolated with a constant, linear, or exponential trend in time, so that a growing refinement (or a
+shrinking time-step) increases the cost of the remaining steps.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import os
+import numpy as np
+from .imbalance import hold
+from .records   import load_record
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+FEATURES    = ( "NUpdate_Cell", "NCell", "NUpdate_Par", "NSubstep", "Const" )
+TRENDS      = ( "constant", "linear", "exponential" )
+NTREND_BIN  = 10     # number of bins of the latest steps used for fitting the trends
+NGRID       = 1000   # number of time intervals for integrating the extrapolated rates
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class StepCostModel():
+    """
+    Linear model of the wall-clock time of a root-level step, ElapsedTime = sum_f coef[f]*feature[f].
+
+    Example:
+       model = StepCostModel().fit( [ run["Feature"] for run in runs ], [ run["ElapsedTime"] for run in runs ] )
+       print( model.predict( runs[0]["Feature"] ).sum() )
+    """
+    def __init__( self, features=FEATURES ):
+        self.features = tuple( features )
+        self.coef     = np.zeros( len(self.features) )
+        self.nfit     = 0        # number of steps used in the fit
+        self.r2       = np.nan   # coefficient of determination
+
+    def fit( self, feats, elapsed ):
+        """
+        feats   : list of dictionaries of [NStep] feature arrays (see `step_features`), one per run.
+        elapsed : list of [NStep] arrays of ElapsedTime.
+
+        Steps dumping snapshots are not excluded since they also count towards the wall time of a run.
+        Return self.
+        """
+        a = np.concatenate( [ np.column_stack( [ f[k] for k in self.features ] ) for f in feats ] ).astype( np.float64 )
+        b = np.concatenate( elapsed ).astype( np.float64 )
+        good = np.isfinite( a ).all( axis=1 ) & np.isfinite( b )
+        a, b = a[good], b[good]
+        if b.size < len( self.features ):   raise ValueError( "too few steps (%d) to fit the model"%b.size )
+
+        self.coef = _nonneg_lstsq( a, b )
+        self.nfit = b.size
+        ss        = ( (b - b.mean())**2 ).sum()
+        self.r2   = 1.0 - ( (b - a.dot(self.coef))**2 ).sum()/ss if ss > 0.0 else np.nan
+        return self
+
+    def predict( self, feat ):
+        """
+        Modeled ElapsedTime of each step for a dictionary of feature arrays.
+        """
+        return sum( c*np.asarray( feat[k], dtype=np.float64 ) for k, c in zip(self.features, self.coef) )
+
+    def as_dict( self ):
+        return dict( zip( self.features, self.coef ) )
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def read_parameters( filename, name ):
+    """
+    All values of a runtime parameter listed as "NAME   value" in Record__Note or Input__Parameter, in the
+    order of appearance (Record__Note is appended after each restart). Return an empty list if the file or
+    the parameter does not exist.
+    """
+    values = []
+    if not os.path.isfile( filename ): return values
+    with open( filename, errors="replace" ) as f:
+        for line in f:
+            tokens = line.split()
+            if len(tokens) < 2  or  tokens[0] != name: continue
+            try:
+                values.append( int(tokens[1]) )
+            except ValueError:
+                try:    values.append( float(tokens[1]) )
+                except ValueError: pass
+    return values
+
+def unique_steps( step ):
+    """
+    Indices of the last record of each step in time order, which drops the steps redone after restarting from
+    an earlier snapshot.
+    """
+    step   = np.asarray( step )
+    _, idx = np.unique( step[::-1], return_index=True )
+    return np.sort( step.size - 1 - idx )
+
+def step_features( perf, patch=None, nranks=() ):
+    """
+    Features of the cost model of each record in Record__Performance.
+
+    perf   : RecordTable of Record__Performance.
+    patch  : RecordBlocks of Record__PatchCount (optional), whose weighted load-imbalance factor (WLI) scales the
+             cell updates to those of the most loaded rank.
+    nranks : list of the numbers of MPI ranks used by the run (e.g., MPI_NRank in Record__Note). The estimate
+             Perf_Overall/Perf_PerRank of each record, which is only accurate to the printed digits, is
+             snapped to the nearest one.
+
+    Return a dictionary of [NRecord] arrays of FEATURES, "NRank", and "WLI".
+    """
+    with np.errstate( invalid="ignore", divide="ignore" ):
+        nrank = perf["Perf_Overall"]/perf["Perf_PerRank"]
+    nrank = np.where( np.isfinite(nrank) & (nrank >= 1.0), nrank, np.nan )
+    if len( nranks ) > 0:
+        ref   = np.asarray( sorted( set(nranks) ), dtype=np.float64 )
+        near  = ref[ np.argmin( np.abs( np.nan_to_num(nrank, nan=ref[-1])[:,None] - ref[None,:] ), axis=1 ) ]
+        nrank = near
+    else:
+        nrank = np.rint( nrank )
+    nrank = _fill( nrank, 1.0 )   # e.g., a zero step time
+
+    wli = np.zeros( len(perf) )
+    if patch is not None  and  len(patch) > 0  and  "WLI" in patch:
+        wli = np.nan_to_num( hold( patch["Step"], 0.01*patch["WLI"], perf["Step"] ), nan=0.0 )
+
+    zero    = np.zeros( len(perf) )
+    nsub    = sum( perf[k] for k in perf.keys() if k.startswith("NUpdate_Lv") )
+    return { "NUpdate_Cell": perf["NUpdate_Cell"]*(1.0+wli)/nrank,
+             "NCell"       : perf["NCell"]/nrank,
+             "NUpdate_Par" : perf["NUpdate_Par"]/nrank if "NUpdate_Par" in perf else zero,
+             "NSubstep"    : nsub if np.ndim(nsub) > 0 else zero,
+             "Const"       : np.ones( len(perf) ),
+             "NRank"       : nrank,
+             "WLI"         : wli }
+
+def load_run( path, cache=False ):
+    """
+    Load the logs of a run in the directory `path` needed by the cost model.
+
+    Return a dictionary of
+       "Time", "Step", "dt", "ElapsedTime" : [NStep] arrays of the unique steps in Record__Performance
+       "Feature"                           : dictionary of the [NStep] feature arrays (see `step_features`)
+       "END_T", "END_STEP"                 : end time and step in Record__Note or Input__Parameter (None if not found)
+    """
+    perf = load_record( os.path.join(path, "Record__Performance"), cache=cache )
+    if len( perf ) == 0: raise ValueError( "no record found in %s"%os.path.join(path, "Record__Performance") )
+
+    filename = os.path.join( path, "Record__PatchCount" )
+    patch    = load_record( filename, cache=cache ) if os.path.isfile( filename ) else None
+
+    note  = os.path.join( path, "Record__Note" )
+    param = os.path.join( path, "Input__Parameter" )
+    feat  = step_features( perf, patch, read_parameters( note, "MPI_NRank" ) )
+    idx   = unique_steps( perf["Step"] )
+
+    run = { "Time": perf["Time"][idx], "Step": perf["Step"][idx], "dt": perf["dt"][idx],
+            "ElapsedTime": perf["ElapsedTime"][idx], "Feature": { k: v[idx] for k, v in feat.items() } }
+    for name in ( "END_T", "END_STEP" ):
+        values    = read_parameters( note, name ) or read_parameters( param, name )
+        run[name] = values[-1] if len( values ) > 0  and  values[-1] >= 0 else None
+    return run
+
+def extrapolate( time, dt, value, t_new, trend="linear" ):
+    """
+    Extrapolate the rate of `value` per unit physical time (i.e., sum(value)/sum(dt)) to the times `t_new`.
+
+    The records are grouped into NTREND_BIN bins of consecutive steps, whose rates are fitted with a constant,
+    a linear, or an exponential function of time, weighted by the physical time covered by each bin. Binning
+    suppresses the scatter of steps shortened to hit the output times. Negative rates are set to zero.
+    """
+    if trend not in TRENDS:   raise ValueError( "unknown trend \"%s\" (%s)"%(trend, ", ".join(TRENDS)) )
+    time, dt, value = [ np.asarray( v, dtype=np.float64 ) for v in (time, dt, value) ]
+    t_new           = np.asarray( t_new, dtype=np.float64 )
+    if time.size == 0  or  dt.sum() <= 0.0: return np.zeros( t_new.shape )
+
+    nbin  = min( NTREND_BIN, time.size )
+    edges = np.linspace( 0, time.size, nbin+1 ).astype( int )
+    sdt   = np.add.reduceat( dt,    edges[:-1] )
+    sval  = np.add.reduceat( value, edges[:-1] )
+    tmid  = 0.5*( time[edges[:-1]] - dt[edges[:-1]] + time[edges[1:]-1] )
+    good  = sdt > 0.0
+    sdt, rate, tmid = sdt[good], sval[good]/sdt[good], tmid[good]
+
+    if trend == "exponential":
+        pos = rate > 0.0
+        if pos.sum() >= 2  and  np.ptp( tmid[pos] ) > 0.0:
+            b, a = np.polyfit( tmid[pos], np.log(rate[pos]), 1, w=np.sqrt(sdt[pos]) )
+            return np.exp( a + b*t_new )
+    elif trend == "linear"  and  rate.size >= 2  and  np.ptp( tmid ) > 0.0:
+        b, a = np.polyfit( tmid, rate, 1, w=np.sqrt(sdt) )
+        return np.maximum( a + b*t_new, 0.0 )
+
+    return np.full( t_new.shape, sval.sum()/sdt.sum() )
+
+def predict_remaining( model, run, end_t, end_step=None, window=200, trend="linear", scale=None, upto=None ):
+    """
+    Predict the wall time from the latest record of a run to `end_t` (or `end_step`).
+
+    model    : fitted StepCostModel.
+    run      : dictionary returned by `load_run`.
+    window   : int. Number of the latest steps used for the trends.
+    scale    : dictionary of factors applied to the extrapolated features (e.g., {"NUpdate_Cell": 0.5} when
+               doubling the number of ranks).
+    upto     : int. Only use the first `upto` steps of the run (e.g., to validate the prediction on a finished run).
+
+    Return a dictionary of
+       "WallTime"  : predicted remaining wall time in seconds
+       "NStep"     : predicted number of remaining steps
+       "EndTime"   : physical time at which the run ends (less than `end_t` if END_STEP is reached first)
+       "Component" : dictionary of the remaining wall time of each feature
+       "Time", "CumWallTime", "CumNStep" : [NGRID+1] cumulative predictions from the latest record
+    """
+    n    = run["Time"].size if upto is None else min( upto, run["Time"].size )
+    sel  = slice( max(0, n-window), n )
+    t0   = run["Time"][n-1]
+    out  = { "WallTime": 0.0, "NStep": 0.0, "EndTime": t0, "Component": { k: 0.0 for k in model.features },
+             "Time": np.array([t0]), "CumWallTime": np.zeros(1), "CumNStep": np.zeros(1) }
+    if end_t <= t0: return out
+
+    scale = {} if scale is None else scale
+    tg    = np.linspace( t0, end_t, NGRID+1 )
+    time, dt = run["Time"][sel], run["dt"][sel]
+    cum   = {}
+    for k, c in zip( model.features, model.coef ):
+        rate   = c*scale.get( k, 1.0 )*extrapolate( time, dt, run["Feature"][k][sel], tg, trend )
+        cum[k] = _cumtrapz( rate, tg )
+    cum_wall = sum( cum.values() )
+    cum_step = _cumtrapz( extrapolate( time, dt, np.ones(time.size), tg, trend ), tg )
+
+#   stop at END_STEP if it comes first
+    nmax = None if end_step is None else end_step - run["Step"][n-1]
+    if nmax is not None  and  cum_step[-1] > nmax:
+        t_end    = np.interp( nmax, cum_step, tg )
+        cut      = np.searchsorted( tg, t_end, side="right" )
+        cum      = { k: np.interp( t_end, tg, v ) for k, v in cum.items() }
+        cum_wall = np.append( cum_wall[:cut], np.interp( t_end, tg, cum_wall ) )
+        cum_step = np.append( cum_step[:cut], nmax )
+        tg       = np.append( tg[:cut], t_end )
+    else:
+        cum = { k: v[-1] for k, v in cum.items() }
+
+    out.update( { "WallTime": cum_wall[-1], "NStep": cum_step[-1], "EndTime": tg[-1], "Component": cum,
+                  "Time": tg, "CumWallTime": cum_wall, "CumNStep": cum_step } )
+    return out
+
+def njob( walltime, job_walltime, overhead=0.0 ):
+    """
+    Number of jobs with the wall-time limit `job_walltime` needed for `walltime`, each losing `overhead` (e.g.,
+    startup, restart, and the work since the last snapshot). Raise ValueError if overhead >= job_walltime.
+    """
+    if overhead >= job_walltime:   raise ValueError( "overhead (%g) >= job wall time (%g)"%(overhead, job_walltime) )
+    return int( np.ceil( walltime/(job_walltime-overhead) ) ) if walltime > 0.0 else 0
+
+def _nonneg_lstsq( a, b ):
+    """
+    Least-squares solution with non-negative coefficients, obtained by repeatedly dropping the most negative
+    coefficient (sufficient for a few features). Columns are normalized for the conditioning, and all-zero
+    columns (e.g., no particles) get zero coefficients.
+    """
+    norm   = np.sqrt( (a**2).sum( axis=0 ) )
+    active = list( np.where( norm > 0.0 )[0] )
+    x      = np.zeros( a.shape[1] )
+    while len( active ) > 0:
+        sol = np.linalg.lstsq( a[:, active]/norm[active], b, rcond=None )[0]/norm[active]
+        if ( sol >= 0.0 ).all():
+            x[active] = sol
+            break
+        active.pop( int( np.argmin(sol) ) )
+    return x
+
+def _cumtrapz( y, x ):
+    return np.concatenate( ( [0.0], np.cumsum( 0.5*(y[1:]+y[:-1])*np.diff(x) ) ) )
+
+def _fill( v, default ):
+    """
+    Replace NaN by the previous finite value (or `default` before the first one).
+    """
+    v    = np.asarray( v, dtype=np.float64 )
+    good = np.isfinite( v )
+    if not good.any(): return np.full( v.shape, default )
+    idx  = np.where( good, np.arange(v.size), 0 )
+    np.maximum.accumulate( idx, out=idx )
+    out  = v[idx]
+    out[ :np.argmax(good) ] = default
+    return out
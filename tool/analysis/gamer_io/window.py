@@ -0,0 +1,143 @@
+"""
+Streaming moving-window statistics of long time series (e.g., the time-steps in Record__TimeStep).
+
+Data are pushed in chunks, and only the rows not yet covered by a complete window are buffered. Window means
+are computed from cumulative sums, and minima, maxima, and percentiles from strided views of the buffer, so
+no Python loop runs over the rows. The exponentially weighted moving average (EWMA) is evaluated in blocks
+short enough for its closed form to stay accurate.
+"""
+#====================================================================================================
+# Imports
+#====================================================================================================
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+
+#====================================================================================================
+# Classes
+#====================================================================================================
+class WindowReducer():
+    """
+    Moving-window statistics of (x, y) pairs, where x is usually the time.
+
+    Example:
+       red = WindowReducer( window=10, stride=5, percentiles=[50, 90], ewma=0.1 )
+       for t, dt in chunks:
+          write( red.push(t, dt) )
+       write( red.finish() )
+
+    Each window yields:
+       "x"      : mean of x
+       "y"      : mean of y
+       "N"      : number of rows (less than `window` only for the trailing partial window)
+       "Min"    : minimum of y
+       "Max"    : maximum of y
+       "P<q>"   : q-th percentile of y (e.g., "P90")
+       "EWMA"   : EWMA of y at the last row of the window (if `ewma` is set)
+    """
+    def __init__( self, window, stride=None, percentiles=(), ewma=None ):
+        """
+        window      : int. Number of rows per window.
+        stride      : int. Number of rows between the starts of two adjacent windows. Default is `window`
+                      (i.e., non-overlapping windows).
+        percentiles : list of floats in [0, 100].
+        ewma        : float in (0, 1]. Smoothing factor of the EWMA, or None to disable it.
+        """
+        if window < 1:                              raise ValueError( "window (%d) < 1"%window )
+        if stride is not None and stride < 1:       raise ValueError( "stride (%d) < 1"%stride )
+        if ewma is not None and not 0.0 < ewma <= 1.0: raise ValueError( "ewma (%s) is not in (0, 1]"%ewma )
+        self.window      = int( window )
+        self.stride      = int( stride ) if stride is not None else int( window )
+        self.percentiles = list( percentiles )
+        self.alpha       = ewma
+        self.x           = np.empty( 0 )
+        self.y           = np.empty( 0 )
+        self.e           = np.empty( 0 )
+        self.ewma_last   = np.nan
+        self.next        = 0   # start of the next window relative to the buffer
+
+    def keys( self ):
+        return [ "x", "y", "N", "Min", "Max" ] + [ "P%g"%q for q in self.percentiles ] + ( ["EWMA"] if self.alpha is not None else [] )
+
+    def _reduce( self, starts, width ):
+        """
+        Statistics of the windows [s, s+width) of the buffer for all s in `starts`.
+        """
+        out = { "N": np.full( starts.size, width, dtype=np.int64 ) }
+        if starts.size == 0:
+            for key in self.keys(): out.setdefault( key, np.empty(0) )
+            return out
+
+        for key, v in ( ("x", self.x), ("y", self.y) ):
+            cs       = np.concatenate( ( [0.0], np.cumsum(v) ) )
+            out[key] = ( cs[starts+width] - cs[starts] )/width
+
+        view       = sliding_window_view( self.y, width )[starts]
+        out["Min"] = view.min( axis=1 )
+        out["Max"] = view.max( axis=1 )
+        if self.percentiles:
+            p = np.percentile( view, self.percentiles, axis=1 )
+            for q, v in zip( self.percentiles, p ): out["P%g"%q] = v
+        if self.alpha is not None:
+            out["EWMA"] = self.e[ starts+width-1 ]
+        return out
+
+    def push( self, x, y ):
+        """
+        Add rows. Return the statistics of the windows completed by these rows.
+        """
+        x = np.asarray( x, dtype=np.float64 )
+        y = np.asarray( y, dtype=np.float64 )
+        if self.alpha is not None:
+            e              = ewma( y, self.alpha, self.ewma_last )
+            self.e         = np.concatenate( (self.e, e) )
+            if e.size > 0: self.ewma_last = e[-1]
+        self.x = np.concatenate( (self.x, x) )
+        self.y = np.concatenate( (self.y, y) )
+
+        n      = self.y.size
+        starts = np.arange( self.next, n-self.window+1, self.stride ) if n >= self.window else np.empty( 0, dtype=np.int64 )
+        out    = self._reduce( starts, self.window )
+
+#       drop the rows before the next window
+        nxt    = starts[-1] + self.stride if starts.size > 0 else self.next
+        keep   = min( nxt, n )
+        self.x, self.y, self.e = self.x[keep:], self.y[keep:], self.e[keep:]
+        self.next = nxt - keep
+        return out
+
+    def finish( self ):
+        """
+        Return the statistics of the trailing partial window (empty if there are no remaining rows).
+        """
+        n = self.y.size - self.next
+        if n <= 0: return self._reduce( np.empty(0, dtype=np.int64), self.window )
+        return self._reduce( np.array( [self.next] ), n )
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def ewma( y, alpha, y0=np.nan ):
+    """
+    Exponentially weighted moving average e[i] = alpha*y[i] + (1-alpha)*e[i-1] with e[-1] = y0.
+    If y0 is NaN, the average starts from e[0] = y[0].
+
+    The recursion is evaluated in closed form within blocks short enough that (1-alpha)^-n stays below 1e12.
+    """
+    y   = np.asarray( y, dtype=np.float64 )
+    out = np.empty_like( y )
+    if y.size == 0: return out
+    if np.isnan( y0 ): y0 = y[0]
+
+    r = 1.0 - alpha
+    if r == 0.0: return y.copy()
+    block = max( 1, int( np.log(1.0e-12)/np.log(r) ) ) if r < 1.0 else y.size
+    for s in range( 0, y.size, block ):
+        yb         = y[s:s+block]
+        w          = r**np.arange( 1, yb.size+1 )   # (1-alpha)^(i+1)
+        out[s:s+yb.size] = w*( y0 + np.cumsum( alpha*yb/w ) )
+        y0         = out[s+yb.size-1]
+    return out
@@ -0,0 +1,120 @@
+import argparse
+import os
+import sys
+import numpy as np
+import gamer_io
+from gamer_io.imbalance import correlation, hold, level_imbalance, lost_time, rank_imbalance, weight_levels
+
+
+# load the command-line parameters
+parser = argparse.ArgumentParser( description='Analyze the per-rank and per-level workloads in Record__LoadBalance '
+                                              '(or Record__PatchCount/Record__ParticleCount): overloaded ranks, levels driving '
+                                              'the imbalance, and the wall time lost to it' )
+
+parser.add_argument( '-i', action='store', required=False, type=str, dest='filename_in',
+                     help='block log with the per-rank workloads [%(default)s]', default='Record__LoadBalance' )
+parser.add_argument( '-p', action='store', required=False, type=str, dest='filename_perf',
+                     help='performance log for the correlation with ElapsedTime (skipped if not found) [%(default)s]',
+                     default='Record__Performance' )
+parser.add_argument( '-t', action='store', required=False, type=float, dest='threshold',
+                     help='a rank is overloaded if its load exceeds the average by this percentage [%(default)g]',
+                     default=5.0 )
+parser.add_argument( '-f', action='store', required=False, type=float, dest='persistent',
+                     help='a rank is persistently overloaded if it is overloaded in this fraction of the records [%(default)g]',
+                     default=0.5 )
+parser.add_argument( '-k', action='store', required=False, type=int, dest='nrank_show',
+                     help='number of the most loaded ranks listed [%(default)d]', default=10 )
+parser.add_argument( '-o', action='store', required=False, type=str, dest='prefix_out',
+                     help='prefix of the output tables [%(default)s]', default='LoadImbalance' )
+parser.add_argument( '--cache', action='store_true', dest='cache',
+                     help='resume from and update the sidecar caches of the log parsers [False]' )
+
+args=parser.parse_args()
+
+# take note
+print( '\nCommand-line arguments:' )
+print( '-------------------------------------------------------------------' )
+print( ' '.join(map(str, sys.argv)) )
+print( '-------------------------------------------------------------------\n' )
+
+
+# load the (record x rank x level) workload tensor
+rec = gamer_io.load_record( args.filename_in, cache=args.cache )
+if not isinstance( rec, gamer_io.RecordBlocks ):   sys.exit( '%s is not a per-rank block log'%args.filename_in )
+if len(rec) == 0:                                  sys.exit( 'no record found in %s'%args.filename_in )
+
+load  = rec[ rec.labels[0]+'_Rank' ]
+step  = rec['Step']
+time  = rec['Time']
+nrec, nrank, nlv = load.shape
+perf  = gamer_io.load_record( args.filename_perf, cache=args.cache ) if os.path.isfile( args.filename_perf ) else None
+
+# weight the patch and particle counts by NUpdateLv as in Record__LoadBalance
+if rec.labels[0] != 'Load':
+   nupdate = 2.0**np.arange( nlv )*np.ones( (nrec, 1) )   # default OPT__DT_LEVEL
+   if perf is not None and 'NUpdate_Lv0' in perf:
+      for lv in range( nlv ):
+         held          = hold( perf['Step'], perf['NUpdate_Lv%d'%lv], step )
+         nupdate[:,lv] = np.where( np.isfinite(held), held, nupdate[:,lv] )
+   else:
+      print( 'NUpdate_Lv* not found in %s --> assume NUpdateLv = 2^lv'%args.filename_perf )
+   load = weight_levels( load, nupdate )
+
+lvs   = level_imbalance( load )
+ranks = rank_imbalance( load, 0.01*args.threshold )
+wli   = 0.01*rec['WLI'] if 'WLI' in rec else lvs['WLI']   # use the recorded factor if available
+np.savez( '%s_Tensor.npz'%args.prefix_out, Step=step, Time=time, Load=load )
+
+print( '%s : %d records, %d ranks, %d levels'%(args.filename_in, nrec, nrank, nlv) )
+print( 'WLI : mean %6.2f%%, median %6.2f%%, max %6.2f%% (step %d)'%
+       ( 100.0*np.nanmean(wli), 100.0*np.nanmedian(wli), 100.0*np.nanmax(wli), step[np.nanargmax(wli)] ) )
+
+
+# levels driving the imbalance
+cont = np.nanmean( lvs['Contribution'], axis=0 )
+print( '\n%5s  %13s  %13s  %13s'%('Level', 'Mean Imb', 'Contribution', 'Share of WLI') )
+for lv in np.argsort( -cont ):
+   print( '%5d  %12.2f%%  %12.2f%%  %12.1f%%'%
+          ( lv, 100.0*np.nanmean(lvs['Imb'][:, lv]), 100.0*cont[lv], 100.0*cont[lv]/cont.sum() if cont.sum() > 0.0 else 0.0 ) )
+
+
+# overloaded ranks
+order      = np.argsort( -np.nan_to_num(ranks['MeanExcess'], nan=-np.inf) )
+persistent = np.where( ranks['FracOver'] >= args.persistent )[0]
+print( '\n%5s  %13s  %13s  %s'%('Rank', 'Mean Excess', 'Overloaded', 'NMax on Lv 0, 1, ...') )
+for r in order[ :args.nrank_show ]:
+   print( '%5d  %12.2f%%  %12.1f%%  %s'%( r, 100.0*ranks['MeanExcess'][r], 100.0*ranks['FracOver'][r],
+                                          ' '.join( '%d'%n for n in ranks['NMax'][r] ) ) )
+print( '\nPersistently overloaded ranks (> %g%% in >= %g%% of the records): %s'%
+       ( args.threshold, 100.0*args.persistent, ' '.join( '%d'%r for r in persistent[ np.argsort(-ranks['FracOver'][persistent]) ] ) or 'none' ) )
+
+with open( '%s_Rank.txt'%args.prefix_out, 'w' ) as f:
+   f.write( '#%5s  %13s  %13s' % ('Rank', 'MeanExcess', 'FracOver') + ''.join( '  %11s%02d' % ('NMax_Lv', lv) for lv in range(nlv) ) + '\n' )
+   for r in range( nrank ):
+      f.write( ' %5d  %13.6e  %13.6e' % (r, ranks['MeanExcess'][r], ranks['FracOver'][r]) +
+               ''.join( '  %13d' % n for n in ranks['NMax'][r] ) + '\n' )
+
+
+# correlation with the performance log and the wall time lost to the imbalance
+if perf is not None:
+   wli_s   = hold( step, wli, perf['Step'] )
+   elapsed = perf['ElapsedTime']
+   lost    = lost_time( elapsed, wli_s )
+   with np.errstate( invalid='ignore', divide='ignore' ):
+      cost = elapsed/perf['NUpdate_Cell']   # wall time per cell update, insensitive to the total workload
+
+   print( '\nCorrelation with %s (%d steps)'%(args.filename_perf, elapsed.size) )
+   print( '   %-31s  Pearson %+6.3f  Spearman %+6.3f'%( 'WLI vs ElapsedTime', *correlation(wli_s, elapsed) ) )
+   print( '   %-31s  Pearson %+6.3f  Spearman %+6.3f'%( 'WLI vs ElapsedTime/NUpdate_Cell', *correlation(wli_s, cost) ) )
+   print( '\nEstimated wall time lost to load imbalance : %13.6e s (%5.2f%% of %13.6e s)'%
+          ( np.nansum(lost), 100.0*np.nansum(lost)/np.nansum(elapsed), np.nansum(elapsed) ) )
+else:
+   print( '\n%s not found --> skip the correlation with ElapsedTime'%args.filename_perf )
+
+with open( '%s_Record.txt'%args.prefix_out, 'w' ) as f:
+   f.write( '#%13s  %13s  %13s' % ('Time', 'Step', 'WLI') + ''.join( '  %11s%02d' % ('Contrib_Lv', lv) for lv in range(nlv) ) + '\n' )
+   for t in range( nrec ):
+      f.write( ' %13.7e  %13d  %13.6e' % (time[t], step[t], wli[t]) +
+               ''.join( '  %13.6e' % c for c in lvs['Contribution'][t] ) + '\n' )
+
+print( '\nOutput: %s_Record.txt, %s_Rank.txt, %s_Tensor.npz'%((args.prefix_out,)*3) )
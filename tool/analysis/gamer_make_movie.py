@@ -0,0 +1,125 @@
+import argparse
+import functools
+import multiprocessing
+import subprocess
+import sys
+import gamer_io
+from gamer_io.image import colormap_lut, auto_zlim, field_image, to_rgb
+
+
+def render( filename, field, lv, axis, mode, coord, weight, max_mem ):
+   with gamer_io.Snapshot( filename ) as snap:
+      index = gamer_io.PatchIndex.open( snap, save=False )
+      return field_image( snap, index, field, lv, axis, mode, coord, weight, max_mem )
+
+
+def render_frame( filename, image, zlim, log, lut, zoom ):
+   return to_rgb( image(filename), zlim, log, lut, zoom ).tobytes()
+
+
+def main():
+   # load the command-line parameters
+   parser = argparse.ArgumentParser( description='Make a movie of slices or projections of GAMER HDF5 snapshots. Frames are rendered '
+                                                 'in parallel and piped to ffmpeg in order without writing intermediate images.' )
+
+   parser.add_argument( '-s', action='store', required=True,  type=int, dest='idx_start',
+                        help='first data index' )
+   parser.add_argument( '-e', action='store', required=True,  type=int, dest='idx_end',
+                        help='last data index' )
+   parser.add_argument( '-d', action='store', required=False, type=int, dest='didx',
+                        help='delta data index [%(default)d]', default=1 )
+   parser.add_argument( '-i', action='store', required=False, type=str, dest='prefix',
+                        help='data path prefix [%(default)s]', default='./' )
+   parser.add_argument( '-f', action='store', required=False, type=str, dest='field',
+                        help='target field [%(default)s]', default='Dens' )
+   parser.add_argument( '-lv', action='store', required=False, type=int, dest='lv',
+                        help='sampling level [%(default)d]', default=0 )
+   parser.add_argument( '-a', action='store', required=False, type=str, dest='axis', choices=['x', 'y', 'z'],
+                        help='slice/projection axis [%(default)s]', default='z' )
+   parser.add_argument( '-c', action='store', required=False, type=float, dest='coord',
+                        help='slice coordinate along the axis [box center]', default=None )
+   parser.add_argument( '-p', '--proj', action='store_true', dest='proj',
+                        help='projection instead of slice [False]' )
+   parser.add_argument( '-w', action='store', required=False, type=str, dest='weight',
+                        help='weighting field of the projection [none]', default=None )
+   parser.add_argument( '-z', '--zlim', action='store', required=False, type=float, nargs=2, dest='zlim',
+                        help='color range [min/max of the first frame]', default=None )
+   parser.add_argument( '--linear', action='store_true', dest='linear',
+                        help='linear color scale [False]' )
+   parser.add_argument( '--cmap', action='store', required=False, type=str, dest='cmap',
+                        help='colormap (non-gray colormaps require matplotlib) [%(default)s]', default='viridis' )
+   parser.add_argument( '--zoom', action='store', required=False, type=int, dest='zoom',
+                        help='number of pixels per cell along each direction [%(default)d]', default=1 )
+   parser.add_argument( '-r', action='store', required=False, type=str, dest='framerate',
+                        help='frame rate [%(default)s]', default='5/1' )
+   parser.add_argument( '-o', action='store', required=False, type=str, dest='filename_out',
+                        help='output movie [Movie_<field>.mp4]', default=None )
+   parser.add_argument( '-n', action='store', required=False, type=int, dest='nproc',
+                        help='number of processes [%(default)d]', default=1 )
+   parser.add_argument( '-m', action='store', required=False, type=float, dest='max_mem',
+                        help='approximate memory per slab in MB [%(default)g]', default=256.0 )
+   parser.add_argument( '--ffmpeg', action='store', required=False, type=str, dest='ffmpeg',
+                        help='ffmpeg executable [%(default)s]', default='ffmpeg' )
+
+   args=parser.parse_args()
+
+   # take note
+   print( '\nCommand-line arguments:' )
+   print( '-------------------------------------------------------------------' )
+   print( ' '.join(map(str, sys.argv)) )
+   print( '-------------------------------------------------------------------\n' )
+
+
+   filenames    = [ args.prefix+'/Data_%06d'%idx for idx in range(args.idx_start, args.idx_end+1, args.didx) ]
+   filename_out = args.filename_out if args.filename_out is not None else 'Movie_%s.mp4'%args.field
+   mode         = 'proj' if args.proj else 'slice'
+   log          = not args.linear
+   lut          = colormap_lut( args.cmap )
+   max_mem      = int( args.max_mem*1024**2 )
+   image        = functools.partial( render, field=args.field, lv=args.lv, axis=args.axis, mode=mode, coord=args.coord,
+                                     weight=args.weight, max_mem=max_mem )
+
+
+   # the first frame sets the frame size and the default color range
+   first = image( filenames[0] )
+   zlim  = args.zlim if args.zlim is not None else auto_zlim( first, log )
+   frame = to_rgb( first, zlim, log, lut, args.zoom )
+   h, w  = frame.shape[:2]
+   print( 'Frame size = %d x %d, color range = [%13.7e, %13.7e]'%(w, h, zlim[0], zlim[1]) )
+
+   # yuv420p requires even dimensions --> pad the frames
+   cmd = [ args.ffmpeg, '-y', '-loglevel', 'error',
+           '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', '%dx%d'%(w, h), '-framerate', args.framerate, '-i', '-',
+           '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-c:v', 'libx264', '-preset', 'slow', '-tune', 'animation',
+           '-pix_fmt', 'yuv420p', filename_out ]
+   proc = subprocess.Popen( cmd, stdin=subprocess.PIPE )
+
+   pool = multiprocessing.Pool( args.nproc ) if args.nproc > 1 and len(filenames) > 1 else None
+   try:
+      proc.stdin.write( frame.tobytes() )
+      print( '%s : done'%filenames[0], flush=True )
+
+      worker = functools.partial( render_frame, image=image, zlim=zlim, log=log, lut=lut, zoom=args.zoom )
+      frames = pool.imap( worker, filenames[1:], chunksize=1 ) if pool is not None else map( worker, filenames[1:] )
+      for filename, data in zip( filenames[1:], frames ):
+         if len(data) != frame.nbytes:
+            raise ValueError( 'frame size of %s differs from that of %s'%(filename, filenames[0]) )
+         proc.stdin.write( data )
+         print( '%s : done'%filename, flush=True )
+   except BrokenPipeError:
+      pass   # ffmpeg exited early --> report its return code below
+   finally:
+      if pool is not None: pool.terminate()
+      try:
+         proc.stdin.close()
+      except BrokenPipeError:
+         pass
+      proc.wait()
+
+   if proc.returncode != 0:   sys.exit( 'ffmpeg failed with the return code %d'%proc.returncode )
+   print( 'Output movie: %s'%filename_out )
+
+
+
+if __name__ == '__main__':
+   main()
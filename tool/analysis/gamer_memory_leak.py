@@ -0,0 +1,112 @@
+import argparse
+import os
+import sys
+import numpy as np
+import gamer_io
+from gamer_io.memory import fit_memory, load_memory, project_limit
+
+
+# load the command-line parameters
+parser = argparse.ArgumentParser( description='Separate the expected memory growth (more patches and particles) from leaks in '
+                                              'Record__MemInfo and project when the memory will exceed the node memory. '
+                                              'Exit with status 1 if an alert is raised.' )
+
+parser.add_argument( '-i', action='store', required=False, type=str, dest='path',
+                     help='directory of the simulation logs [%(default)s]', default='./' )
+parser.add_argument( '-c', action='store', required=False, type=str, dest='column',
+                     help='memory column, where the *_Max columns are compared with the patches and particles of the most '
+                          'loaded rank and the *_Sum columns with the totals [%(default)s]', default='Phy_Max' )
+parser.add_argument( '-m', action='store', required=False, type=float, dest='node_memory',
+                     help='memory per node in GB [none]', default=None )
+parser.add_argument( '-p', action='store', required=False, type=int, dest='ranks_per_node',
+                     help='number of MPI ranks per node sharing the node memory (ignored for the *_Sum columns) [%(default)d]',
+                     default=1 )
+parser.add_argument( '-l', '--limit', action='store', required=False, type=float, dest='limit',
+                     help='memory limit in MB compared with the column directly [node memory/ranks per node]', default=None )
+parser.add_argument( '-n', action='store', required=False, type=int, dest='window',
+                     help='number of the latest records used for the workload trends [%(default)d]', default=100 )
+parser.add_argument( '-s', action='store', required=False, type=float, dest='nsigma',
+                     help='a leak is significant if its rate exceeds this multiple of its standard error [%(default)g]',
+                     default=3.0 )
+parser.add_argument( '-t', '--horizon', action='store', required=False, type=float, dest='horizon',
+                     help='alert if the limit is projected to be exceeded within this wall time in hours [%(default)g]',
+                     default=24.0 )
+parser.add_argument( '--current', action='store_true', dest='current',
+                     help='use the current numbers of patches and particles instead of their high-water marks since the '
+                          'last restart [False]' )
+parser.add_argument( '-o', action='store', required=False, type=str, dest='filename_out',
+                     help='output table of the recorded and modeled memory [none]', default=None )
+parser.add_argument( '--cache', action='store_true', dest='cache',
+                     help='resume from and update the sidecar caches of the log parsers [False]' )
+
+args=parser.parse_args()
+
+# take note
+print( '\nCommand-line arguments:' )
+print( '-------------------------------------------------------------------' )
+print( ' '.join(map(str, sys.argv)) )
+print( '-------------------------------------------------------------------\n' )
+
+
+# fit the memory model
+data  = load_memory( args.path, args.column, args.current, args.cache )
+fit   = fit_memory( data )
+coef  = fit['Coef']
+error = fit['Error']
+step  = data['Step']
+print( '%s : %d records, %d process(es) since the first record, column %s'%
+       ( os.path.join(args.path, 'Record__MemInfo'), step.size, np.unique(data['First']).size, data['Column'] ) )
+print( '\n%8s  %13s  %13s  %s'%('Term', 'Value', 'Error', 'Unit') )
+for t, unit in ( ('M0', 'MB'), ('MPatch', 'MB per patch'), ('MPar', 'MB per particle'), ('Leak', 'MB per step') ):
+   print( '%8s  %13.6e  %13.6e  %s'%(t, coef[t], error[t], unit) )
+print( 'Residual : rms %.3f MB, lag-1 autocorrelation %.3f'%(np.sqrt(np.nanmean(fit['Residual']**2)), fit['Rho']) )
+
+alerts = []
+leak   = coef['Leak'] > 0.0  and  coef['Leak'] > args.nsigma*error['Leak']
+print( '\nLeak     : %+.3f +- %.3f MB per 1000 steps (%s)'%
+       ( 1.0e3*coef['Leak'], 1.0e3*error['Leak'], 'SIGNIFICANT' if leak else 'not significant' ) )
+if np.isfinite( fit['Collinear'] )  and  abs( fit['Collinear'] ) > 0.99:
+   print( '           the workload grows almost linearly with the step (correlation %.4f), so the leak cannot be '
+          'reliably separated from the expected growth'%fit['Collinear'] )
+if leak: alerts.append( 'memory leak of %.3f MB per 1000 steps'%(1.0e3*coef['Leak']) )
+
+
+# projection
+limit = args.limit
+if limit is None  and  args.node_memory is not None:
+   limit = 1024.0*args.node_memory/( 1 if data['Column'].endswith('_Sum') else args.ranks_per_node )
+
+if limit is not None:
+   proj = project_limit( data, fit, limit, args.window )
+   print( '\nMemory   : %.2f MB of the limit %.2f MB (%.1f%%) at step %d'%
+          ( data['Memory'][-1], limit, 100.0*data['Memory'][-1]/limit, step[-1] ) )
+   print( 'Growth   : %+.4f MB per step (expected %+.4f, leak %+.4f)'%( proj['Rate'], proj['Expected'], coef['Leak'] ) )
+
+   hours    = np.nan
+   filename = os.path.join( args.path, 'Record__Performance' )
+   if os.path.isfile( filename ):
+      perf  = gamer_io.load_record( filename, cache=args.cache )
+      hours = proj['NStep']*np.nanmean( perf['ElapsedTime'][-args.window:] )/3600.0
+
+   if np.isfinite( proj['NStep'] ):
+      print( 'Exceeded : at step %d, %d steps from now%s'%( np.ceil(proj['Step']), np.ceil(proj['NStep']),
+             ', ~%.1f hours of wall time'%hours if np.isfinite(hours) else '' ) )
+      soon = hours <= args.horizon if np.isfinite( hours ) else False
+      if soon: alerts.append( 'memory limit projected to be exceeded in %.1f hours (step %d)'%(hours, np.ceil(proj['Step'])) )
+   else:
+      print( 'Exceeded : never (the memory does not grow)' )
+else:
+   print( '\nNo memory limit given (-m or -l) --> skip the projection' )
+
+
+if args.filename_out is not None:
+   model = data['Memory'] - fit['Residual']
+   with open( args.filename_out, 'w' ) as f:
+      f.write( '#%13s  %13s  %13s  %13s  %13s  %13s  %13s\n'%('Time', 'Step', 'Memory', 'Model', 'Leak', 'NPatch', 'NPar') )
+      for r in range( step.size ):
+         f.write( ' %13.7e  %13d  %13.6e  %13.6e  %13.6e  %13.6e  %13.6e\n'%( data['Time'][r], step[r], data['Memory'][r],
+                  model[r], coef['Leak']*data['Age'][r], data['NPatch'][r], data['NPar'][r] ) )
+   print( '\nOutput: %s'%args.filename_out )
+
+for a in alerts: print( 'ALERT : %s'%a )
+if alerts: sys.exit( 1 )
@@ -0,0 +1,236 @@
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import traceback
+import matplotlib
+matplotlib.use('Agg')
+import yt
+
+
+MANIFEST = '.plot_manifest.json'
+OPTIONS  = ( 'cmap', 'zlim', 'log', 'unit', 'width', 'axes_unit', 'center', 'weight', 'time', 'grids', 'name' )
+FLAGS    = ( 'grids', )   # options without a value
+
+
+def parse_field( field ):
+   return tuple( field.split(',') ) if ',' in field else field
+
+
+def parse_figure( line ):
+   """
+   Parse a figure description into (kind, axis, field, options).
+   """
+   tokens = line.split()
+   if len(tokens) < 3:                 raise ValueError( 'incomplete figure "%s"'%line )
+   kind, axis, field = tokens[:3]
+   if kind not in ( 'slice', 'proj' ): raise ValueError( 'unknown figure type "%s" in "%s"'%(kind, line) )
+   if axis not in ( 'x', 'y', 'z' ):   raise ValueError( 'unknown axis "%s" in "%s"'%(axis, line) )
+
+   opts = {}
+   for t in tokens[3:]:
+      key, _, val = t.partition( '=' )
+      if key not in OPTIONS:           raise ValueError( 'unknown option "%s" in "%s"'%(key, line) )
+      if key in FLAGS:
+         if val:                       raise ValueError( 'option "%s" takes no value in "%s"'%(key, line) )
+         opts[key] = True
+      elif not val:                    raise ValueError( 'option "%s" requires a value in "%s"'%(key, line) )
+      else:
+         opts[key] = val
+   if kind == 'slice' and 'weight' in opts:
+      raise ValueError( 'option "weight" only applies to projections in "%s"'%line )
+   return kind, axis, field, opts
+
+
+def figure_name( data_name, figure, detail=False ):
+   """
+   Output name of a figure. With `detail`, figures without a given name are suffixed by their options
+   (e.g., "_center-m_width-1_Mpc" for "center=m width=1,Mpc").
+   """
+   kind, axis, field, opts = figure
+   name = '%s_%s_%s_%s'%( data_name, 'Slice' if kind == 'slice' else 'Projection', axis, field.replace(',', '_') )
+   if 'name' in opts: name += '_' + opts['name']
+   elif detail:       name += re.sub( r'[^\w.+-]', '_', ''.join( '_'+key if val is True else '_%s-%s'%(key, val)
+                                                                 for key, val in sorted(opts.items()) ) )
+   return name + '.png'
+
+
+def figure_details( figures ):
+   """
+   Flag the figures differing only in their options so that they are named by `figure_name( ..., detail=True )`.
+   Raise ValueError if the output names still collide.
+   """
+   names  = [ figure_name( '', fig ) for fig in figures ]
+   detail = [ names.count(name) > 1 for name in names ]
+   names  = [ figure_name( '', fig, d ) for fig, d in zip( figures, detail ) ]
+   for name in names:
+      if names.count(name) > 1:  raise ValueError( 'multiple figures are saved as "Data_*%s" (use name=<suffix>)'%name[:-4] )
+   return detail
+
+
+def fingerprint( filename ):
+   st = os.stat( filename )
+   return [ st.st_size, st.st_mtime_ns ]
+
+
+def get_center( ds, mode, cache ):
+   if mode not in cache:
+      if   mode == 'c':  cache[mode] = ds.domain_center
+      elif mode == 'm':  cache[mode] = ds.find_max( ('gas', 'density') )[1]
+      else:              cache[mode] = ds.arr( [ float(v) for v in mode.split(',') ], 'code_length' )
+   return cache[mode]
+
+
+def render( task ):
+   """
+   Plot all figures of a snapshot. Return the names of the figures done.
+   """
+   filename, figures, dpi = task
+   ds      = yt.load( filename )
+   centers = {}
+   sources = {}
+   done    = []
+
+#  share one slice/projection object among all fields with the same axis, center, and weight
+   groups = {}
+   for out, (kind, axis, field, opts) in figures:
+      key = ( kind, axis, opts.get('center', 'c'), opts.get('weight', None) )
+      groups.setdefault( key, [] ).append( parse_field(field) )
+
+   for key, fields in groups.items():
+      kind, axis, center, weight = key
+      c = get_center( ds, center, centers )
+      if kind == 'slice':
+         sources[key] = ds.slice( axis, c[ 'xyz'.index(axis) ], center=c )
+      else:
+         sources[key] = ds.proj( list(fields), axis, weight_field=( None if weight is None else parse_field(weight) ), center=c )
+
+   for out, (kind, axis, field, opts) in figures:
+      try:
+         key = ( kind, axis, opts.get('center', 'c'), opts.get('weight', None) )
+         fld = parse_field( field )
+         p   = sources[key].to_pw( fields=fld, center=get_center(ds, key[2], centers) )
+
+         if 'width'     in opts:
+            w = opts['width'].split( ',' )
+            p.set_width( ( float(w[0]), w[1] if len(w) > 1 else 'code_length' ) )
+         if 'unit'      in opts:  p.set_unit( fld, opts['unit'] )
+         if 'zlim'      in opts:  p.set_zlim( fld, *[ float(v) for v in opts['zlim'].split(',') ] )
+         if 'log'       in opts:  p.set_log( fld, bool(int(opts['log'])) )
+         if 'cmap'      in opts:  p.set_cmap( fld, opts['cmap'] )
+         if 'axes_unit' in opts:  p.set_axes_unit( opts['axes_unit'] )
+         if opts.get( 'time', 'code_time' ) != 'none':
+            p.annotate_timestamp( time_unit=opts.get('time', 'code_time'), corner='upper_right' )
+         if 'grids'     in opts:  p.annotate_grids()
+
+         p.save( out, mpl_kwargs={'dpi':dpi} )
+         done.append( out )
+      except Exception:
+         print( 'Failed to plot %s:\n%s'%(out, traceback.format_exc()), flush=True )
+
+   return filename, done
+
+
+def save_manifest( filename, manifest ):
+   tmp = filename + '.tmp'
+   with open( tmp, 'w' ) as f: json.dump( manifest, f, indent=1 )
+   os.replace( tmp, filename )
+
+
+def main():
+   # load the command-line parameters
+   parser = argparse.ArgumentParser( description='Plot slices and projections of multiple GAMER snapshots. Each snapshot is loaded '
+                                                 'only once for all figures, and figures whose inputs are unchanged are skipped.',
+                                     epilog='Figure format: "<slice|proj> <x|y|z> <field> [option=value ...]" with the options '
+                                            'cmap=<name>, zlim=<min>,<max>, log=<0|1>, unit=<unit>, width=<value>[,<unit>], '
+                                            'axes_unit=<unit>, center=<c|m|x,y,z>, weight=<field> (proj only), time=<unit|none>, '
+                                            'grids, and name=<suffix>. Fields can be given as "<type>,<name>" (e.g., "gas,density"). Figures '
+                                            'differing only in the options are named by the options unless name is given.' )
+
+   parser.add_argument( '-s', action='store', required=True,  type=int, dest='idx_start',
+                        help='first data index' )
+   parser.add_argument( '-e', action='store', required=True,  type=int, dest='idx_end',
+                        help='last data index' )
+   parser.add_argument( '-d', action='store', required=False, type=int, dest='didx',
+                        help='delta data index [%(default)d]', default=1 )
+   parser.add_argument( '-i', action='store', required=False, type=str, dest='prefix',
+                        help='data path prefix [%(default)s]', default='../' )
+   parser.add_argument( '-p', action='append', required=False, type=str, dest='figures',
+                        help='figure to be plotted (can be repeated; see the format below)', default=[] )
+   parser.add_argument( '-c', action='store', required=False, type=str, dest='filename_cfg',
+                        help='file listing one figure per line (lines starting with "#" are ignored) [none]', default=None )
+   parser.add_argument( '-o', action='store', required=False, type=str, dest='out_dir',
+                        help='output directory [%(default)s]', default='./' )
+   parser.add_argument( '-n', action='store', required=False, type=int, dest='nproc',
+                        help='number of processes [%(default)d]', default=1 )
+   parser.add_argument( '--dpi', action='store', required=False, type=int, dest='dpi',
+                        help='figure resolution [%(default)d]', default=150 )
+   parser.add_argument( '--force', action='store_true', dest='force',
+                        help='replot all figures even if their inputs are unchanged [False]' )
+
+   args=parser.parse_args()
+
+   # take note
+   print( '\nCommand-line arguments:' )
+   print( '-------------------------------------------------------------------' )
+   print( ' '.join(map(str, sys.argv)) )
+   print( '-------------------------------------------------------------------\n' )
+
+
+   # collect the figures
+   lines = list( args.figures )
+   if args.filename_cfg is not None:
+      with open( args.filename_cfg ) as f:
+         lines += [ line.strip() for line in f if line.strip() and not line.lstrip().startswith('#') ]
+   if len(lines) == 0:   parser.error( 'no figure is given (use -p or -c)' )
+   figures = [ ( ' '.join(line.split()), parse_figure(line) ) for line in lines ]
+   details = figure_details( [ fig for _, fig in figures ] )
+
+   os.makedirs( args.out_dir, exist_ok=True )
+   manifest_name = os.path.join( args.out_dir, MANIFEST )
+   manifest      = {}
+   if os.path.isfile( manifest_name ):
+      with open( manifest_name ) as f: manifest = json.load( f )
+
+   # only load the snapshots with figures to be updated
+   tasks  = []
+   inputs = {}
+   for idx in range( args.idx_start, args.idx_end+1, args.didx ):
+      filename  = args.prefix+'/Data_%06d'%idx
+      data_name = 'Data_%06d'%idx
+      if not os.path.isfile( filename ):
+         print( '%s does not exist --> skipped'%filename )
+         continue
+
+      todo = []
+      for (spec, fig), detail in zip( figures, details ):
+         out   = os.path.join( args.out_dir, figure_name(data_name, fig, detail) )
+         entry = { 'input': fingerprint(filename), 'figure': spec, 'dpi': args.dpi }
+         inputs[out] = entry
+         if not args.force and os.path.isfile( out ) and manifest.get( out ) == entry: continue
+         todo.append( (out, fig) )
+
+      if len(todo) > 0:  tasks.append( (filename, todo, args.dpi) )
+      print( '%s : %d figure(s) to plot, %d up to date'%(filename, len(todo), len(figures)-len(todo)) )
+
+
+   # record the finished figures after each snapshot so that an interrupted run can be resumed
+   if args.nproc > 1 and len(tasks) > 1:
+      with multiprocessing.Pool( args.nproc ) as pool:
+         for filename, done in pool.imap_unordered( render, tasks, chunksize=1 ):
+            manifest.update( { out: inputs[out] for out in done } )
+            save_manifest( manifest_name, manifest )
+            print( '%s : done'%filename, flush=True )
+   else:
+      for task in tasks:
+         filename, done = render( task )
+         manifest.update( { out: inputs[out] for out in done } )
+         save_manifest( manifest_name, manifest )
+         print( '%s : done'%filename, flush=True )
+
+
+
+if __name__ == '__main__':
+   main()
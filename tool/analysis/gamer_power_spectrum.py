@@ -0,0 +1,139 @@
+import argparse
+import os
+import sys
+import tempfile
+import numpy as np
+import gamer_io
+from gamer_io.particles import PAR_BLOCK
+from gamer_io.power import cic_deposit, power_spectrum
+from gamer_io.resample import resample_uniform, uniform_dims
+
+
+def load_grid( filename, snap, field, lv, tmp_dir, tmp, nproc, max_mem ):
+   """
+   Return a memory-mapped uniform grid [z][y][x] of a field. The name of its temporary file is appended to
+   the list `tmp` right after it is created so that the caller can remove it even if this function fails.
+   """
+   N        = uniform_dims( snap, lv )
+   fd, name = tempfile.mkstemp( suffix='.bin', dir=tmp_dir )
+   os.close( fd )
+   tmp.append( name )
+
+   if field == 'Par':
+      grid = np.memmap( name, dtype=np.float64, mode='w+', shape=(N[2], N[1], N[0]) )
+      par  = snap.particle
+      for s in range( 0, int(par.npar), PAR_BLOCK ):
+         e = min( s+PAR_BLOCK, int(par.npar) )
+         cic_deposit( [ par['ParPos'+d][s:e] for d in 'XYZ' ], par['ParMass'][s:e], N, snap.box_size, out=grid )
+      grid.flush()
+      return grid
+
+   resample_uniform( filename, [field], lv, {field: name}, fmt='bin', nproc=nproc, max_mem=max_mem )
+   return np.memmap( name, dtype=snap.grid[field].dtype, mode='r', shape=(N[2], N[1], N[0]) )
+
+
+def main():
+   # load the command-line parameters
+   parser = argparse.ArgumentParser( description='Compute the (cross) power spectra of GAMER HDF5 snapshots without yt. '
+                                                 'Grids larger than the memory limit are transformed out of core.' )
+
+   parser.add_argument( '-s', action='store', required=True,  type=int, dest='idx_start',
+                        help='first data index' )
+   parser.add_argument( '-e', action='store', required=True,  type=int, dest='idx_end',
+                        help='last data index' )
+   parser.add_argument( '-d', action='store', required=False, type=int, dest='didx',
+                        help='delta data index [%(default)d]', default=1 )
+   parser.add_argument( '-i', action='store', required=False, type=str, dest='prefix',
+                        help='data path prefix [%(default)s]', default='./' )
+   parser.add_argument( '-lv', action='store', required=False, type=int, dest='lv',
+                        help='sampling level [%(default)d]', default=0 )
+   parser.add_argument( '-f', action='store', required=False, type=str, nargs='+', dest='fields',
+                        help='one field for the auto spectrum or two fields for the cross spectrum; '
+                             '"Par" stands for the CIC-deposited particle density [%(default)s]', default=['Dens'] )
+   parser.add_argument( '-L', action='store', required=False, type=float, dest='L_box',
+                        help='box size along x in the output units (e.g., Mpc/h) [code units]', default=None )
+   parser.add_argument( '-ndim', action='store', required=False, type=int, dest='ndim',
+                        help='number of dimensions for power spectrum: 1 (x-line), 2 (x-y plane), or 3 [%(default)d]', default=3 )
+   parser.add_argument( '-n', action='store', required=False, type=int, dest='nproc',
+                        help='number of processes for resampling [%(default)d]', default=1 )
+   parser.add_argument( '-t', action='store', required=False, type=int, dest='nthread',
+                        help='number of FFT threads [%(default)d]', default=1 )
+   parser.add_argument( '-m', action='store', required=False, type=float, dest='max_mem',
+                        help='approximate memory per slab in MB [%(default)g]', default=256.0 )
+   parser.add_argument( '--tmp', action='store', required=False, type=str, dest='tmp_dir',
+                        help='directory of the temporary files [system default]', default=None )
+   parser.add_argument( '--overdensity', action='store_true', dest='overdensity',
+                        help='compute the spectrum of field/mean-1 (always for "Par") [False]' )
+   parser.add_argument( '--plot', action='store_true', dest='plot',
+                        help='also plot the spectra [False]' )
+
+   args=parser.parse_args()
+
+   # take note
+   print( '\nCommand-line arguments:' )
+   print( '-------------------------------------------------------------------' )
+   print( ' '.join(map(str, sys.argv)) )
+   print( '-------------------------------------------------------------------\n' )
+
+   assert 1 <= len(args.fields) <= 2, 'please specify one or two fields'
+   assert args.ndim in ( 1, 2, 3 ), '-ndim (%d) is not in [1, 3]'%args.ndim
+
+   max_mem = int( args.max_mem*1024**2 )
+
+   if args.plot:
+      import matplotlib
+      matplotlib.use('Agg')
+      import matplotlib.pyplot as plt
+
+
+   for idx in range( args.idx_start, args.idx_end+1, args.didx ):
+      filename = args.prefix+'/Data_%06d'%idx
+      tmp      = []
+
+      with gamer_io.Snapshot( filename ) as snap:
+         N     = uniform_dims( snap, args.lv )
+         scale = 1.0 if args.L_box is None else args.L_box/snap.box_size[0]
+         box   = np.asarray( snap.box_size[::-1], dtype=np.float64 )*scale   # [z][y][x]
+
+         try:
+            grids = []
+            for field in args.fields:
+               grids.append( load_grid( filename, snap, field, args.lv, args.tmp_dir, tmp, args.nproc, max_mem ) )
+
+            if   args.ndim == 1:  grids, box = [ g[0, 0] for g in grids ], box[2:]
+            elif args.ndim == 2:  grids, box = [ g[0]    for g in grids ], box[1:]
+
+   #        only the CIC-deposited particle density is normalized and deconvolved by default
+            fields = args.fields*( 3-len(args.fields) )   # the same field twice for the auto spectrum
+            ps = power_spectrum( grids[0], box, data2=(grids[1] if len(grids) > 1 else None),
+                                 overdensity=[ args.overdensity or f == 'Par' for f in fields ],
+                                 deconvolve_cic=[ f == 'Par' for f in fields ], nthread=args.nthread, max_mem=max_mem,
+                                 tmp_dir=args.tmp_dir )
+         finally:
+            del grids
+            for t in tmp: os.remove( t )
+
+      name = '_'.join( v.capitalize() for v in args.fields )
+      f    = (name, idx, args.lv, N[0], args.ndim)
+      with open( 'power_spectrum_%s_%06d_lv_%02d_%d_ndim_%d.txt'%f, 'w' ) as out:
+         out.write( '#%13s  %14s  %14s  %14s\n'%('k', 'k_avg', 'P(k)', 'NMode') )
+         for k, k_avg, p, n in zip( ps['k'], ps['k_avg'], ps['P'], ps['NMode'] ):
+            if n > 0: out.write( ' %13.7e  %14.7e  % 14.7e  %14d\n'%(k, k_avg, p, n) )
+      print( 'Data_%06d : done'%idx )
+
+      if args.plot:
+         good = ps['NMode'] > 0
+         plt.figure( figsize=(8, 6) )
+         plt.loglog( ps['k_avg'][good], np.abs(ps['P'][good]), label='Power Spectrum' )
+         plt.xlabel( 'k' )
+         plt.ylabel( 'P(k)' )
+         plt.title( '%s Power Spectrum'%name )
+         plt.grid()
+         plt.legend()
+         plt.savefig( 'power_spectrum_%s_%06d_lv_%02d_%d_ndim_%d.png'%f )
+         plt.close()
+
+
+
+if __name__ == '__main__':
+   main()
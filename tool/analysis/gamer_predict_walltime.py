@@ -0,0 +1,128 @@
+import argparse
+import sys
+import numpy as np
+from gamer_io.walltime import TRENDS, StepCostModel, load_run, njob, predict_remaining
+
+
+# load the command-line parameters
+parser = argparse.ArgumentParser( description='Fit a cost model of the wall-clock time per step to archived Record__Performance '
+                                              '(and Record__PatchCount) logs and predict the wall time and the number of jobs '
+                                              'still needed by a run in progress' )
+
+parser.add_argument( '-i', action='store', required=False, type=str, dest='path',
+                     help='directory of the run in progress [%(default)s]', default='./' )
+parser.add_argument( '-a', action='store', required=False, type=str, dest='archive', nargs='+',
+                     help='directories of archived runs also used for fitting the model [none]', default=[] )
+parser.add_argument( '-e', action='store', required=False, type=float, dest='end_t',
+                     help='end time [END_T in Record__Note or Input__Parameter]', default=None )
+parser.add_argument( '-s', action='store', required=False, type=int, dest='end_step',
+                     help='end step [END_STEP in Record__Note or Input__Parameter]', default=None )
+parser.add_argument( '-n', action='store', required=False, type=int, dest='window',
+                     help='number of the latest steps used for extrapolating the refinement and time-step trends [%(default)d]',
+                     default=200 )
+parser.add_argument( '-t', '--trend', action='store', required=False, type=str, dest='trend', choices=TRENDS,
+                     help='trend of the cost per unit physical time [%(default)s]', default='linear' )
+parser.add_argument( '-r', '--nrank', action='store', required=False, type=int, dest='nrank',
+                     help='number of MPI ranks of the remaining jobs [same as the latest record]', default=None )
+parser.add_argument( '-w', '--walltime', action='store', required=False, type=float, dest='job_walltime',
+                     help='wall-time limit of each job in hours [none]', default=None )
+parser.add_argument( '--overhead', action='store', required=False, type=float, dest='overhead',
+                     help='wall time lost by each job in seconds (startup, restart, and work since the last snapshot) '
+                          '[%(default)g]', default=0.0 )
+parser.add_argument( '-v', action='store', required=False, type=float, dest='validate',
+                     help='validate the prediction on each archived run from this fraction of its steps [%(default)g]',
+                     default=0.5 )
+parser.add_argument( '-o', action='store', required=False, type=str, dest='filename_out',
+                     help='output table of the predicted cumulative wall time and number of steps [none]', default=None )
+parser.add_argument( '--shell', action='store_true', dest='shell',
+                     help='only print shell variable assignments for the queue scripts (see example/queue) [False]' )
+parser.add_argument( '--cache', action='store_true', dest='cache',
+                     help='resume from and update the sidecar caches of the log parsers [False]' )
+
+args=parser.parse_args()
+
+# take note
+if not args.shell:
+   print( '\nCommand-line arguments:' )
+   print( '-------------------------------------------------------------------' )
+   print( ' '.join(map(str, sys.argv)) )
+   print( '-------------------------------------------------------------------\n' )
+
+
+# load the logs and fit the model
+run     = load_run( args.path, args.cache )
+archive = [ load_run( path, args.cache ) for path in args.archive ]
+runs    = archive + [ run ]
+model   = StepCostModel().fit( [ r['Feature'] for r in runs ], [ r['ElapsedTime'] for r in runs ] )
+
+end_t    = args.end_t    if args.end_t    is not None else run['END_T']
+end_step = args.end_step if args.end_step is not None else run['END_STEP']
+if end_t is None:   sys.exit( 'END_T is not found in %s --> set it by -e'%args.path )
+
+nrank_now = run['Feature']['NRank'][-1]
+nrank     = nrank_now if args.nrank is None else args.nrank
+ratio     = nrank_now/nrank
+scale     = { 'NUpdate_Cell': ratio, 'NCell': ratio, 'NUpdate_Par': ratio }
+pred      = predict_remaining( model, run, end_t, end_step, args.window, args.trend, scale )
+
+if args.job_walltime is not None:
+   nj = njob( pred['WallTime'], 3600.0*args.job_walltime, args.overhead )
+
+if args.shell:
+   print( 'GAMER_REMAIN_WALLTIME=%d'%np.ceil(pred['WallTime']) )
+   print( 'GAMER_REMAIN_STEP=%d'%np.ceil(pred['NStep']) )
+   if args.job_walltime is not None:
+      print( 'GAMER_NJOB=%d'%nj )
+      print( 'GAMER_NRESTART=%d'%nj )
+   sys.exit( 0 )
+
+
+# model
+print( 'Fitted %d steps of %d run(s), R^2 = %.4f'%(model.nfit, len(runs), model.r2) )
+print( '%14s  %13s  %s'%('Feature', 'Coefficient', 'Share of the recorded wall time') )
+total = sum( np.nansum( model.predict(r['Feature']) ) for r in runs )
+for k, c in model.as_dict().items():
+   share = sum( np.nansum( c*r['Feature'][k] ) for r in runs )/total if total > 0.0 else 0.0
+   print( '%14s  %13.6e  %6.2f%%'%(k, c, 100.0*share) )
+
+
+# validation on the archived runs: refit the model without the steps of each run after the first fraction
+# so that the recorded wall time to be predicted is not used
+if len( archive ) > 0:
+   print( '\nValidation from %g%% of the steps of each archived run (refitted without its later steps)'%(100.0*args.validate) )
+   print( '%-30s  %13s  %13s  %9s'%('Run', 'Predicted(s)', 'Recorded(s)', 'Error') )
+   for i, (path, r) in enumerate( zip( args.archive, archive ) ):
+      upto   = max( 1, int( args.validate*r['Time'].size ) )
+      others = [ o for j, o in enumerate( runs ) if j != i ]
+      feats  = [ o['Feature'] for o in others ] + [ { k: v[:upto] for k, v in r['Feature'].items() } ]
+      try:
+         loo = StepCostModel().fit( feats, [ o['ElapsedTime'] for o in others ] + [ r['ElapsedTime'][:upto] ] )
+      except ValueError as e:
+         print( '%-30s  %s'%(path, e) )
+         continue
+      val  = predict_remaining( loo, r, r['Time'][-1], None, args.window, args.trend, upto=upto )
+      real = np.nansum( r['ElapsedTime'][upto:] )
+      print( '%-30s  %13.6e  %13.6e  %+8.2f%%'%( path, val['WallTime'], real,
+                                                 100.0*(val['WallTime']/real-1.0) if real > 0.0 else np.nan ) )
+
+
+# prediction
+print( '\nRun in progress : %s'%args.path )
+print( '   Latest record       : Time %13.7e, Step %d, NRank %d'%(run['Time'][-1], run['Step'][-1], nrank_now) )
+print( '   Elapsed so far      : %13.6e s (%.2f hr)'%(np.nansum(run['ElapsedTime']), np.nansum(run['ElapsedTime'])/3600.0) )
+print( '   End                 : END_T %13.7e%s'%(end_t, '' if end_step is None else ', END_STEP %d'%end_step) )
+print( '   Predicted end time  : %13.7e (%s, trend of the last %d steps)'%(pred['EndTime'],
+       'END_STEP reached first' if pred['EndTime'] < end_t else 'END_T', min(args.window, run['Time'].size)) )
+print( '   Remaining steps     : %d'%np.ceil(pred['NStep']) )
+print( '   Remaining wall time : %13.6e s (%.2f hr) with %d ranks'%(pred['WallTime'], pred['WallTime']/3600.0, nrank) )
+for k, v in pred['Component'].items():
+   if v > 0.0:   print( '      %-14s : %5.1f%%'%(k, 100.0*v/pred['WallTime']) )
+if args.job_walltime is not None:
+   print( '   Jobs of %5g hr     : %d (%g s lost per job)'%(args.job_walltime, nj, args.overhead) )
+
+if args.filename_out is not None:
+   with open( args.filename_out, 'w' ) as f:
+      f.write( '#%13s  %13s  %13s\n'%('Time', 'NStep', 'WallTime') )
+      for t, n, w in zip( pred['Time'], pred['CumNStep'], pred['CumWallTime'] ):
+         f.write( ' %13.7e  %13.6e  %13.6e\n'%(t, n, w) )
+   print( '\nOutput: %s'%args.filename_out )
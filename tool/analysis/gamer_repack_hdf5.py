@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+from gamer_io.repack import repack, verify
+
+
+def main():
+   # load the command-line parameters
+   parser = argparse.ArgumentParser( description='Repack a GAMER HDF5 snapshot with chunked and compressed datasets. '
+                                                 'The output can still be loaded by yt and used as a restart file.' )
+
+   parser.add_argument( '-i', action='store', required=True,  type=str, dest='filename_in',
+                        help='input filename' )
+   parser.add_argument( '-o', action='store', required=True,  type=str, dest='filename_out',
+                        help='output filename' )
+   parser.add_argument( '-z', action='store', required=False, type=int, dest='level',
+                        help='deflate compression level (1-9) [%(default)d]', default=4 )
+   parser.add_argument( '-b', action='store', required=False, type=int, dest='keep_bits',
+                        help='lossy compression: number of mantissa bits kept in GridData; the relative error '
+                             'is bounded by 2^-(keep_bits+1) [lossless]', default=None )
+   parser.add_argument( '-c', action='store', required=False, type=int, dest='patches_per_chunk',
+                        help='number of patches per chunk [%(default)d]', default=8 )
+   parser.add_argument( '-n', action='store', required=False, type=int, dest='nproc',
+                        help='number of processes [%(default)d]', default=1 )
+   parser.add_argument( '--no_level_views', action='store_false', dest='level_views',
+                        help='do not add the per-level virtual datasets under LevelData [False]' )
+   parser.add_argument( '--verify', action='store_true', dest='verify',
+                        help='compare the output with the input after repacking [False]' )
+
+   args=parser.parse_args()
+
+   # take note
+   print( '\nCommand-line arguments:' )
+   print( '-------------------------------------------------------------------' )
+   print( ' '.join(map(str, sys.argv)) )
+   print( '-------------------------------------------------------------------\n' )
+
+   # check
+   assert os.path.isfile( args.filename_in ), 'input file \"%s\" does not exist!'%args.filename_in
+   assert not os.path.isfile( args.filename_out ), 'output file \"%s\" already exists!'%args.filename_out
+   assert 1 <= args.level <= 9, '-z (%d) is not in the range [1, 9]'%args.level
+   assert args.patches_per_chunk >= 1, '-c (%d) < 1'%args.patches_per_chunk
+
+
+   repack( args.filename_in, args.filename_out, level=args.level, keep_bits=args.keep_bits,
+           patches_per_chunk=args.patches_per_chunk, nproc=args.nproc, level_views=args.level_views )
+
+   size_in  = os.path.getsize( args.filename_in  )
+   size_out = os.path.getsize( args.filename_out )
+   print( '%-19s : %ld bytes'%('Input size',  size_in ) )
+   print( '%-19s : %ld bytes (%.2f%%)'%('Output size', size_out, 100.0*size_out/size_in) )
+
+   if args.verify:
+      bad = verify( args.filename_in, args.filename_out, args.keep_bits )
+      if len(bad) > 0:
+         print( 'Verification failed for: %s'%(' '.join(bad)) )
+         sys.exit( 1 )
+      print( 'Verification passed' )
+
+
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,69 @@
+import argparse
+import sys
+import gamer_io
+from gamer_io.resample import resample_uniform, uniform_dims
+
+
+def main():
+   # load the command-line parameters
+   parser = argparse.ArgumentParser( description='Resample GAMER HDF5 snapshots to uniform grids without yt. '
+                                                 'Data are stored in the [z][y][x] order (i.e., x varies fastest).' )
+
+   parser.add_argument( '-s', action='store', required=True,  type=int, dest='idx_start',
+                        help='first data index' )
+   parser.add_argument( '-e', action='store', required=True,  type=int, dest='idx_end',
+                        help='last data index' )
+   parser.add_argument( '-d', action='store', required=False, type=int, dest='didx',
+                        help='delta data index [%(default)d]', default=1 )
+   parser.add_argument( '-i', action='store', required=False, type=str, dest='prefix',
+                        help='data path prefix [%(default)s]', default='./' )
+   parser.add_argument( '-lv', action='store', required=False, type=int, dest='lv',
+                        help='sampling level [%(default)d]', default=0 )
+   parser.add_argument( '-f', action='store', required=False, type=str, dest='fields', nargs='+',
+                        help='fields to extract [%(default)s]', default=['Dens'] )
+   parser.add_argument( '-t', action='store', required=False, type=str, dest='fmt', choices=['bin', 'hdf5'],
+                        help='output format [%(default)s]', default='bin' )
+   parser.add_argument( '-n', action='store', required=False, type=int, dest='nproc',
+                        help='number of processes [%(default)d]', default=1 )
+   parser.add_argument( '-m', action='store', required=False, type=float, dest='max_mem',
+                        help='approximate memory per slab in MB [%(default)g]', default=256.0 )
+   parser.add_argument( '--father', action='store_true', dest='father',
+                        help='use the data of non-leaf patches on the sampling level instead of restricting '
+                             'finer leaf patches (requires OPT__FIXUP_RESTRICT) [False]' )
+
+   args=parser.parse_args()
+
+   # take note
+   print( '\nCommand-line arguments:' )
+   print( '-------------------------------------------------------------------' )
+   print( ' '.join(map(str, sys.argv)) )
+   print( '-------------------------------------------------------------------\n' )
+
+
+   idx_start   = args.idx_start
+   idx_end     = args.idx_end
+   didx        = args.didx
+   prefix      = args.prefix
+   lv          = args.lv
+   fields      = args.fields
+
+
+   for idx in range( idx_start, idx_end+1, didx ):
+       filename = prefix+'/Data_%06d'%idx
+
+       with gamer_io.Snapshot( filename ) as snap:
+           N = uniform_dims( snap, lv )
+
+       if args.fmt == 'bin':
+           output = { field: '%s_%06d_Lv_%02d_%d_%d_%d.bin'%(field, idx, lv, N[0], N[1], N[2]) for field in fields }
+       else:
+           output = 'Uniform_%06d_Lv_%02d_%d_%d_%d.hdf5'%(idx, lv, N[0], N[1], N[2])
+
+       print( 'Resampling %s to level %d (%d x %d x %d) ...'%(filename, lv, N[0], N[1], N[2]) )
+       resample_uniform( filename, fields, lv, output, fmt=args.fmt, nproc=args.nproc,
+                         max_mem=int(args.max_mem*1024**2), fine=('father' if args.father else 'restrict') )
+
+
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,111 @@
+import argparse
+import sys
+import time
+import numpy as np
+from gamer_io.timing_mpi import TimingMPIStore, call_stats, phase_stats, straggler_stats
+
+
+def main():
+   # load the command-line parameters
+   parser = argparse.ArgumentParser( description='Analyze the per-rank MPI timing logs Record__TimingMPI_Rank*: critical-path and wait time '
+                                                 'of each exchange phase and straggler ranks and nodes' )
+
+   parser.add_argument( '-i', action='store', required=False, type=str, dest='path',
+                        help='directory of the logs [%(default)s]', default='./' )
+   parser.add_argument( '-n', action='store', required=False, type=int, dest='nproc',
+                        help='number of processes for loading the logs [%(default)d]', default=1 )
+   parser.add_argument( '-l', '--last', action='store', required=False, type=int, dest='last',
+                        help='only analyze the last N calls [all]', default=None )
+   parser.add_argument( '-f', action='store', required=False, type=float, dest='factor',
+                        help='flag ranks/nodes causing more than this multiple of their fair share of the wait time [%(default)g]',
+                        default=3.0 )
+   parser.add_argument( '-a', action='store', required=False, type=float, dest='alpha',
+                        help='significance level of the excess of last arrivals over all ranks/nodes [%(default)g]', default=0.01 )
+   parser.add_argument( '-k', action='store', required=False, type=int, dest='nshow',
+                        help='number of phases, ranks, and nodes listed [%(default)d]', default=10 )
+   parser.add_argument( '--ranks_per_node', action='store', required=False, type=int, dest='ranks_per_node',
+                        help='number of consecutive ranks per node [none]', default=None )
+   parser.add_argument( '--hostfile', action='store', required=False, type=str, dest='hostfile',
+                        help='file listing the host name of each rank, one per line in the rank order [none]', default=None )
+   parser.add_argument( '--no_cache', action='store_false', dest='cache',
+                        help='do not read or write the columnar store .Record__TimingMPI.npz [False]' )
+   parser.add_argument( '-o', action='store', required=False, type=str, dest='prefix_out',
+                        help='prefix of the output tables [%(default)s]', default='TimingMPI' )
+
+   args=parser.parse_args()
+
+   # take note
+   print( '\nCommand-line arguments:' )
+   print( '-------------------------------------------------------------------' )
+   print( ' '.join(map(str, sys.argv)) )
+   print( '-------------------------------------------------------------------\n' )
+
+
+   # load all rank files into the columnar store
+   t0    = time.time()
+   store = TimingMPIStore.open( args.path, nproc=args.nproc, cache=args.cache )
+   tab   = store.table( args.last )
+   nrank, ncall = tab['MPI'].shape
+   print( 'Loaded %d ranks, %d rows in %.2f s'%(nrank, store.nrow.sum(), time.time()-t0) )
+   print( 'Analyzing %d calls common to all ranks (%d calls dropped)\n'%(ncall, tab['NCallDropped']) )
+   if ncall == 0:   sys.exit( 'no call to analyze' )
+
+   calls  = call_stats( tab['MPI'] )
+   phases = phase_stats( tab, calls )
+   crit   = calls['Critical'].sum()
+
+
+   # per-phase critical path and wait time
+   header = '#%3s  %15s  %8s  %13s  %13s  %13s  %13s  %13s  %13s  %13s'% \
+            ('Lv', 'Mode', 'NCall', 'Critical(s)', 'Wait(s)', 'MaxWait(s)', 'WaitFrac', 'Prep(s)', 'Close(s)', 'Send(MB)')
+   with open( '%s_Phase.txt'%args.prefix_out, 'w' ) as f:
+      f.write( header+'\n' )
+      print( header )
+      for i, p in enumerate( phases ):
+         line = ' %3d  %15s  %8d  %13.6e  %13.6e  %13.6e  %13.6e  %13.6e  %13.6e  %13.6e'% \
+                ( p['Lv'], store.modes[p['Mode']], p['NCall'], p['Critical'], p['Wait'], p['MaxWait'],
+                  p['Wait']/p['Critical'] if p['Critical'] > 0.0 else 0.0, p['Prep'], p['Close'], p['MB'] )
+         f.write( line+'\n' )
+         if i < args.nshow: print( line )
+   print( '\nTotal critical-path MPI time %13.6e s, mean wait time %13.6e s (%5.1f%%)'%
+          ( crit, np.nansum(np.nanmean(calls['Wait'], axis=0)), 100.0*np.nansum(np.nanmean(calls['Wait'], axis=0))/crit if crit > 0.0 else 0.0 ) )
+
+
+   # straggler ranks
+   def report( title, names, stats, filename ):
+      order = np.argsort( -stats['Caused'] )
+      print( '\n%s'%title )
+      print( '%12s  %13s  %8s  %8s  %8s  %13s'%('', 'Caused(s)', 'Share', 'Fair', 'NLast', 'OwnWait(s)') )
+      for g in order[ :args.nshow ]:
+         print( '%12s  %13.6e  %7.2f%%  %7.2f%%  %8d  %13.6e%s'%( names[g], stats['Caused'][g], 100.0*stats['Share'][g],
+                100.0*stats['Fair'][g], stats['NLast'][g], stats['Wait'][g], '  << straggler' if stats['Straggler'][g] else '' ) )
+      flagged = [ names[g] for g in order if stats['Straggler'][g] ]
+      print( 'Stragglers (> %g x fair share, significance %g): %s'%( args.factor, args.alpha, ' '.join(map(str, flagged)) if flagged else 'none' ) )
+
+      with open( filename, 'w' ) as f:
+         f.write( '#%11s  %13s  %13s  %13s  %8s  %13s  %9s\n'%('Name', 'Caused', 'Share', 'Fair', 'NLast', 'OwnWait', 'Straggler') )
+         for g in range( len(names) ):
+            f.write( ' %11s  %13.6e  %13.6e  %13.6e  %8d  %13.6e  %9d\n'%( names[g], stats['Caused'][g], stats['Share'][g],
+                     stats['Fair'][g], stats['NLast'][g], stats['Wait'][g], stats['Straggler'][g] ) )
+
+   report( 'Ranks arriving last', [ '%d'%r for r in store.ranks ], straggler_stats( calls, None, args.factor, args.alpha ),
+           '%s_Rank.txt'%args.prefix_out )
+
+
+   # straggler nodes
+   hosts = None
+   if args.hostfile is not None:
+      with open( args.hostfile ) as f: hosts = [ line.strip() for line in f if line.strip() ]
+      if len(hosts) <= store.ranks.max():   sys.exit( '%s lists %d hosts < %d ranks'%(args.hostfile, len(hosts), store.ranks.max()+1) )
+      hosts = [ hosts[r] for r in store.ranks ]
+   elif args.ranks_per_node is not None:
+      hosts = [ 'node%d'%(r//args.ranks_per_node) for r in store.ranks ]
+
+   if hosts is not None:
+      names, group = np.unique( hosts, return_inverse=True )
+      report( 'Nodes arriving last', names.tolist(), straggler_stats( calls, group, args.factor, args.alpha ), '%s_Node.txt'%args.prefix_out )
+
+
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,90 @@
+import argparse
+import sys
+import numpy as np
+import gamer_io
+from gamer_io.timing_profile import collapsed_stacks, speedscope, timing_stats, timing_tree, write_speedscope
+
+
+# load the command-line parameters
+parser = argparse.ArgumentParser( description='Rebuild the timing hierarchy of Record__Timing (per level and per phase), aggregate '
+                                              'it over steps, and output flame graphs as collapsed stacks and a speedscope profile.' )
+
+parser.add_argument( '-i', action='store', required=False, type=str, dest='filename_in',
+                     help='timing log [%(default)s]', default='Record__Timing' )
+parser.add_argument( '-s', action='store', required=False, type=int, dest='step_start',
+                     help='first step [first]', default=None )
+parser.add_argument( '-e', action='store', required=False, type=int, dest='step_end',
+                     help='last step [last]', default=None )
+parser.add_argument( '-a', action='store', required=False, type=str, dest='how', choices=['mean', 'sum'],
+                     help='aggregate the steps by the mean per step or by the sum [%(default)s]', default='mean' )
+parser.add_argument( '--stat', action='store', required=False, type=str, dest='stat', choices=['Max', 'Min', 'Ave'],
+                     help='statistic over ranks with OPT__TIMING_BALANCE [Max]', default=None )
+parser.add_argument( '--merge_levels', action='store_true', dest='merge_levels',
+                     help='sum each timer over all levels instead of showing each level [False]' )
+parser.add_argument( '-d', action='store', required=False, type=int, dest='depth',
+                     help='maximum depth of the printed tree [all]', default=None )
+parser.add_argument( '-m', action='store', required=False, type=float, dest='min_percent',
+                     help='omit the timers below this percentage of the total from the printed tree [%(default)g]',
+                     default=0.1 )
+parser.add_argument( '-o', action='store', required=False, type=str, dest='prefix_out',
+                     help='prefix of the output collapsed stacks (.folded) and speedscope profile (.speedscope.json) '
+                          '[%(default)s]', default='TimingProfile' )
+parser.add_argument( '--cache', action='store_true', dest='cache',
+                     help='resume from and update the sidecar cache of the log parser [False]' )
+
+args=parser.parse_args()
+
+# take note
+print( '\nCommand-line arguments:' )
+print( '-------------------------------------------------------------------' )
+print( ' '.join(map(str, sys.argv)) )
+print( '-------------------------------------------------------------------\n' )
+
+
+# rebuild the hierarchy of all steps and select the steps
+rec  = gamer_io.load_record( args.filename_in, cache=args.cache )
+if len( rec ) == 0:   raise SystemExit( 'ERROR : no step found in %s !!'%args.filename_in )
+tree = timing_tree( rec, args.stat, args.merge_levels )
+step = rec.column( 'Step' )
+sel  = np.ones( step.size, dtype=bool )
+if args.step_start is not None:  sel &= step >= args.step_start
+if args.step_end   is not None:  sel &= step <= args.step_end
+if not sel.any():   raise SystemExit( 'ERROR : no step found in the range [%s, %s] !!'%(args.step_start, args.step_end) )
+index = np.where( sel )[0]
+agg   = tree.reduce( index, args.how )
+
+print( '%s : %d step(s) from %d to %d%s, %s per step'%
+       ( args.filename_in, index.size, step[index[0]], step[index[-1]],
+         ' (%s over ranks)'%(args.stat or 'Max') if timing_stats( rec ) != [''] else '',
+         'mean' if args.how == 'mean' else 'summed' ) )
+if np.unique( step[index] ).size < index.size:
+   print( 'WARNING : some steps are recorded more than once (e.g., after restarting from an earlier snapshot) !!' )
+
+
+# print the tree
+total = agg.value
+frac  = lambda v: 100.0*v/total if total > 0.0 else 0.0
+print( '\n%-40s  %13s  %8s  %13s  %8s'%('Timer', 'Time [s]', '%Total', 'Self [s]', '%Self') )
+print( '-'*90 )
+excess = []
+for stack, n in agg.walk():
+   if n.excess() > 1.0e-3*n.value  and  n.excess() > 0.0:   excess.append( ( '/'.join(stack), n.excess() ) )
+   if args.depth is not None  and  len( stack ) > args.depth + 1:   continue
+   if total > 0.0  and  100.0*n.value/total < args.min_percent  and  len( stack ) > 1:   continue
+   print( '%-40s  %13.6e  %8.3f  %13.6e  %8.3f'%( '  '*(len(stack)-1) + n.name, n.value, frac(n.value),
+                                                 n.self_value(), frac(n.self_value()) ) )
+
+if excess:
+   print( '\nTimers whose children exceed them (e.g., the solver timers are the maximum over ranks) :' )
+   for name, e in excess:   print( '   %-50s  by %13.6e s'%(name, e) )
+
+
+# output
+with open( args.prefix_out+'.folded', 'w' ) as f:
+   f.write( '\n'.join( collapsed_stacks( agg ) ) + '\n' )
+
+profile = speedscope( tree, args.filename_in, aggregated=agg, index=index, exporter='gamer_timing_profile.py' )
+write_speedscope( args.prefix_out+'.speedscope.json', profile )
+
+print( '\nOutput: %s.folded (e.g., flamegraph.pl %s.folded > %s.svg), %s.speedscope.json (https://www.speedscope.app)'%
+       ((args.prefix_out,)*4) )
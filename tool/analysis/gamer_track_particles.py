@@ -0,0 +1,81 @@
+import argparse
+import sys
+import numpy as np
+import gamer_io
+from gamer_io.track import PID_ATTR, PIDIndex, track_particles
+
+
+def main():
+   # load the command-line parameters
+   parser = argparse.ArgumentParser( description='Extract the trajectories of selected particles from GAMER HDF5 snapshots. '
+                                                 'Particles are matched by an ID attribute, which must be added '
+                                                 'as a particle attribute by the test problem.' )
+
+   parser.add_argument( '-s', action='store', required=True,  type=int, dest='idx_start',
+                        help='first data index' )
+   parser.add_argument( '-e', action='store', required=True,  type=int, dest='idx_end',
+                        help='last data index' )
+   parser.add_argument( '-d', action='store', required=False, type=int, dest='didx',
+                        help='delta data index [%(default)d]', default=1 )
+   parser.add_argument( '-i', action='store', required=False, type=str, dest='prefix',
+                        help='data path prefix [%(default)s]', default='./' )
+   parser.add_argument( '-k', action='store', required=False, type=str, dest='id_attr',
+                        help='particle ID attribute [%(default)s]', default=PID_ATTR )
+   parser.add_argument( '-p', action='store', required=False, type=int, nargs='+', dest='pids',
+                        help='target particle IDs', default=None )
+   parser.add_argument( '-P', action='store', required=False, type=str, dest='pid_file',
+                        help='text file of the target particle IDs', default=None )
+   parser.add_argument( '-r', action='store', required=False, type=int, dest='nrandom',
+                        help='track this number of randomly chosen particles of the first snapshot', default=None )
+   parser.add_argument( '-t', action='store', required=False, type=int, nargs='+', dest='par_type',
+                        help='only choose the random particles from these types (ParType) [all]', default=None )
+   parser.add_argument( '-a', action='store', required=False, type=str, nargs='+', dest='attributes',
+                        help='particle attributes to be recorded [%(default)s]', default=['ParPosX', 'ParPosY', 'ParPosZ'] )
+   parser.add_argument( '-n', action='store', required=False, type=int, dest='nproc',
+                        help='number of processes [%(default)d]', default=1 )
+   parser.add_argument( '-o', action='store', required=False, type=str, dest='filename_out',
+                        help='output filename [%(default)s]', default='Trajectory.npz' )
+
+   args=parser.parse_args()
+
+   # take note
+   print( '\nCommand-line arguments:' )
+   print( '-------------------------------------------------------------------' )
+   print( ' '.join(map(str, sys.argv)) )
+   print( '-------------------------------------------------------------------\n' )
+
+
+   filenames = [ args.prefix+'/Data_%06d'%idx for idx in range(args.idx_start, args.idx_end+1, args.didx) ]
+
+
+   # set the target particle IDs
+   if   args.pids is not None:
+      pids = np.asarray( args.pids, dtype=np.int64 )
+   elif args.pid_file is not None:
+      pids = np.loadtxt( args.pid_file, dtype=np.int64, ndmin=1 )
+   elif args.nrandom is not None:
+      with gamer_io.Snapshot( filenames[0] ) as snap:
+         index = PIDIndex.open( snap, args.id_attr )
+         rows  = np.asarray( index.rows )
+         if args.par_type is not None:
+            rows = rows[ np.isin( snap.particle['ParType'].take(rows), args.par_type ) ]
+         rows  = np.random.default_rng( 0 ).choice( rows, size=min(args.nrandom, rows.size), replace=False )
+         pids  = np.asarray( index.ids )[ np.isin( index.rows, rows ) ]
+   else:
+      raise SystemExit( 'Please specify the target particles with -p, -P, or -r' )
+
+   print( '%-19s : %d'%('# of particles', pids.size) )
+   print( '%-19s : %d'%('# of snapshots', len(filenames)) )
+
+
+   traj = track_particles( filenames, pids, attributes=args.attributes, id_attr=args.id_attr, nproc=args.nproc )
+   np.savez( args.filename_out, **traj )
+
+   nmiss = np.count_nonzero( ~traj['Found'] )
+   if nmiss > 0: print( 'WARNING : %d particle records are missing (stored as NaN)'%nmiss )
+   print( 'Output trajectories to %s'%args.filename_out )
+
+
+
+if __name__ == '__main__':
+   main()
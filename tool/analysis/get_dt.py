@@ -1,71 +1,81 @@
 import argparse
 import sys
-import numpy as np
+from gamer_io.records import CHUNK_BYTES, iter_columns
+from gamer_io.window  import WindowReducer
 
 
 # load the command-line parameters
-parser = argparse.ArgumentParser( description='Analyze the average evolution time-step at the specified AMR level' )
+parser = argparse.ArgumentParser( description='Analyze the moving-window statistics of the evolution time-step at the specified AMR levels' )
 
-parser.add_argument( '-l', action='store', required=True,  type=int, dest='lv',
-                     help='AMR level' )
+parser.add_argument( '-l', action='store', required=True,  type=int, nargs='+', dest='lv',
+                     help='AMR level(s)' )
 parser.add_argument( '-n', action='store', required=False, type=int, dest='nave',
-                     help='number of sub-steps to average over [%(default)d]', default=10 )
-parser.add_argument( '-c', action='store', required=False, type=int, dest='column',
-                     help='target time-step column [%(default)d]', default=5 )
+                     help='number of sub-steps per window [%(default)d]', default=10 )
+parser.add_argument( '-s', action='store', required=False, type=int, dest='stride',
+                     help='number of sub-steps between the starts of two adjacent windows [same as -n]', default=None )
+parser.add_argument( '-c', action='store', required=False, type=str, dest='column',
+                     help='target time-step column (0-based index or name) [%(default)s]', default='5' )
+parser.add_argument( '-p', action='store', required=False, type=float, nargs='+', dest='percentiles',
+                     help='also output these percentiles of each window [none]', default=[] )
+parser.add_argument( '-e', '--ewma', action='store', required=False, type=float, dest='ewma',
+                     help='also output the exponentially weighted moving average with this smoothing factor in (0,1] [none]',
+                     default=None )
+parser.add_argument( '--drop_partial', action='store_true', dest='drop_partial',
+                     help='do not output the trailing partial window [False]' )
+parser.add_argument( '--chunk', action='store', required=False, type=float, dest='chunk',
+                     help='size of each chunk read from the log in MB [%(default)g]', default=CHUNK_BYTES/1024**2 )
 parser.add_argument( '-i', action='store', required=False, type=str, dest='filename_in',
                      help='filename of the simulation time-step log file [%(default)s]', default='Record__TimeStep' )
 parser.add_argument( '-o', action='store', required=True,  type=str, dest='filename_out',
-                     help='output filename' )
+                     help='output filename (suffixed by "_Lv<level>" if there are multiple levels)' )
 
 args=parser.parse_args()
 
 # check
-assert args.lv     >= 0, '-l (%d) < 0' % (args.lv)
-assert args.column >= 0, '-c (%d) < 0' % (args.column)
-assert args.nave   >= 1, '-n (%d) < 1' % (args.nave)
+column = int( args.column ) if args.column.isdigit() else args.column
+assert min(args.lv) >= 0, '-l (%d) < 0' % (min(args.lv))
+assert args.nave    >= 1, '-n (%d) < 1' % (args.nave)
+assert args.stride is None  or  args.stride >= 1, '-s (%d) < 1' % (args.stride)
+assert args.ewma   is None  or  0.0 < args.ewma <= 1.0, '-e (%g) is not in (0,1]' % (args.ewma)
+assert all( 0.0 <= q <= 100.0 for q in args.percentiles ), '-p must be in [0,100]'
 
 
 # take note
-File_Out = open( args.filename_out, "w" )
-
-File_Out.write( '#Command-line arguments:\n' )
-File_Out.write( '#-------------------------------------------------------------------\n' )
-File_Out.write( '#' )
-for t in range( len(sys.argv) ):
-   File_Out.write( ' %s' % str(sys.argv[t]) )
-File_Out.write( '\n' )
-File_Out.write( '#-------------------------------------------------------------------\n\n' )
-
-
-
-# load the level, time, and dt from the simulation log file
-log = np.loadtxt( args.filename_in, usecols=(0,3,args.column), unpack=True )
-
-
-# get the time and dt at the target level
-row_lv = log[ 0, : ] == args.lv
-t      = log[ 1, row_lv ]
-dt     = log[ 2, row_lv ]
-
-
-# calculate and record the average time and dt
-t_ave  = 0.0
-dt_ave = 0.0
-
-File_Out.write( "#%13s   %13s\n" % ("Time", "dt") )
-
-for i in range( 0, dt.size, 1 ):
-   t_ave  += t [i]
-   dt_ave += dt[i]
-
-   if (i+1)%args.nave == 0:
-      t_ave  = t_ave  / args.nave
-      dt_ave = dt_ave / args.nave
-
-      File_Out.write( "% 13.7e   %13.7e\n" % (t_ave, dt_ave) )
-
-      t_ave  = 0.0
-      dt_ave = 0.0
-
-File_Out.close()
-
+files    = {}
+reducers = {}
+for lv in args.lv:
+   filename = args.filename_out if len(args.lv) == 1 else '%s_Lv%d' % (args.filename_out, lv)
+   File_Out = open( filename, "w" )
+
+   File_Out.write( '#Command-line arguments:\n' )
+   File_Out.write( '#-------------------------------------------------------------------\n' )
+   File_Out.write( '#' )
+   for t in range( len(sys.argv) ):
+      File_Out.write( ' %s' % str(sys.argv[t]) )
+   File_Out.write( '\n' )
+   File_Out.write( '#-------------------------------------------------------------------\n\n' )
+
+   reducers[lv] = WindowReducer( args.nave, args.stride, args.percentiles, args.ewma )
+   keys         = reducers[lv].keys()[2:]
+   File_Out.write( "#%13s   %13s" % ("Time", "dt") + "".join( "   %13s" % k for k in keys ) + "\n" )
+   files[lv] = File_Out
+
+
+def write( File_Out, out ):
+   keys = [ k for k in out if k not in ("x", "y", "N") ]
+   for i in range( out["N"].size ):
+      File_Out.write( "% 13.7e   %13.7e   %13d" % (out["x"][i], out["y"][i], out["N"][i]) +
+                      "".join( "   %13.7e" % out[k][i] for k in keys ) + "\n" )
+
+
+# stream the level, time, and dt from the simulation log file and
+# calculate and record the window statistics of time and dt at each target level
+for chunk in iter_columns( args.filename_in, [0, 3, column], chunk_bytes=int(args.chunk*1024**2) ):
+   level = chunk[0]
+   for lv in args.lv:
+      row_lv = level == lv
+      write( files[lv], reducers[lv].push( chunk[3][row_lv], chunk[column][row_lv] ) )
+
+for lv in args.lv:
+   if not args.drop_partial:   write( files[lv], reducers[lv].finish() )
+   files[lv].close()
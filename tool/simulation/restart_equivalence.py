@@ -0,0 +1,268 @@
+#!/bin/python3
+"""
+A script for verifying that a restarted run (OPT__INIT=2) reproduces a continuous run.
+
+How to use it:
+  1. Prepare a directory containing all the input files of a test problem (e.g., `Input__*`, `UM_IC`, `PAR_IC`)
+     and a compiled `gamer` executable.
+     * The HDF5 output (OPT__OUTPUT_TOTAL=1) is required for restart.
+     * Compile with `--bitwise_reproducibility=true` and use a fixed number of MPI ranks/OpenMP threads
+       if you want a bitwise comparison (i.e., the default `-e 0.0`).
+
+  2. Compile `tool/analysis/gamer_compare_data` to get `GAMER_CompareData`.
+
+  3. Run the script. For example,
+       python3 restart_equivalence.py -i ./Riemann -n 20 -m "mpirun -np 2"
+
+     It creates two run directories under `-w` (default: `./RestartEquivalence`):
+       Continuous : run from step 0 to step N                               --> Data_A
+       Restart    : run from step 0 to step N/2, dump, restart from `RESTART`
+                    (OPT__INIT=2) and continue to step N                    --> Data_B
+     Both parameter sets are prepared before any run is launched. The continuous run and the first half of
+     the restart run are launched concurrently, and the second half is launched as soon as the first half
+     finishes. Data_A and Data_B are then compared patch by patch
+     with `GAMER_CompareData`, whose report is stored as `CompareData_Result` in the working directory.
+
+  4. The script returns 0 if no difference is detected and 1 otherwise, so it can be used in a regression
+     pipeline directly.
+-----------------------------------------------------------------------------------------------------
+For developer:
+1. Runtime parameters are replaced by `replace_parameter()` in `change_parameters.py`, or appended to
+   `Input__Parameter` if absent (i.e., left at their default values).
+2. Each run writes its stdout and stderr to `log` in its own run directory.
+"""
+#====================================================================================================
+# Import packages
+#====================================================================================================
+import argparse
+import glob
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+from change_parameters import replace_parameter
+
+
+
+#====================================================================================================
+# Global variables
+#====================================================================================================
+RETURN_FAIL     = False
+RETURN_SUCCESS  = True
+
+DIR_CONTINUOUS  = "Continuous"
+DIR_RESTART     = "Restart"
+FILE_PARAMETER  = "Input__Parameter"
+FILE_PARA_REST  = "Input__Parameter.restart"   # parameters of the second half of the restart run
+FILE_RESULT     = "CompareData_Result"
+COPY_FILES      = [ r'Input__*', r'UM_IC*', r'PAR_IC*', r'*.txt', r'*.dat' ]
+COMPARE_DATA    = os.path.join( os.path.dirname(os.path.abspath(__file__)),
+                                "../analysis/gamer_compare_data/GAMER_CompareData" )
+
+
+
+#====================================================================================================
+# Functions
+#====================================================================================================
+def set_parameter( para_file, para_name, val ):
+    """
+    Set a runtime parameter, appending it to the parameter file if it is absent.
+    """
+    with open( para_file, "r" ) as f:
+        content = f.read()
+
+    if re.search( r"^%s\s+"%para_name, content, flags=re.M ) is not None:
+        replace_parameter( para_file, para_name, val )
+        return
+
+    with open( para_file, "a" ) as f:
+        if len(content) > 0 and not content.endswith("\n"): f.write( "\n" )
+        f.write( "%-29s %-16s # set by restart_equivalence.py\n"%(para_name, str(val)) )
+    return
+
+def setup_run( input_dir, run_dir, executable, end_step, output_step ):
+    """
+    Copy the input files to the run directory and set the runtime parameters shared by all runs.
+
+    input_dir   : string. Directory storing the input files.
+    run_dir     : string. Directory to run gamer.
+    executable  : string. Path to the gamer executable.
+    end_step    : int. The value of END_STEP.
+    output_step : int. The value of OUTPUT_STEP.
+    """
+    if os.path.isdir( run_dir ): raise BaseException("ERROR: Run directory <%s> already exists."%run_dir)
+    os.makedirs( run_dir )
+
+    for f_type in COPY_FILES:
+        for f in glob.glob( os.path.join(input_dir, f_type) ):
+            shutil.copy( f, run_dir )
+
+    os.symlink( os.path.abspath(executable), os.path.join(run_dir, "gamer") )
+
+    para_file = os.path.join( run_dir, FILE_PARAMETER )
+    if not os.path.isfile( para_file ): raise BaseException("ERROR: Cannot find <%s>."%para_file)
+
+    set_parameter( para_file, "END_T",             -1          )
+    set_parameter( para_file, "END_STEP",          end_step    )
+    set_parameter( para_file, "OPT__OUTPUT_TOTAL", 1           )
+    set_parameter( para_file, "OPT__OUTPUT_MODE",  1           )
+    set_parameter( para_file, "OUTPUT_STEP",       output_step )
+    return
+
+def setup_restart_parameter( run_dir, end_step ):
+    """
+    Prepare the parameter file of the second half, which turns on the restart mode and continues to `end_step`.
+    """
+    para_file = os.path.join( run_dir, FILE_PARA_REST )
+    shutil.copy( os.path.join(run_dir, FILE_PARAMETER), para_file )
+    set_parameter( para_file, "OPT__INIT",           2        )
+    set_parameter( para_file, "OPT__OUTPUT_RESTART", 0        )
+    set_parameter( para_file, "END_STEP",            end_step )
+    return
+
+def launch_run( run_dir, mpirun ):
+    """
+    Launch gamer in the run directory without waiting for it to finish.
+    """
+    cmd = "%s ./gamer 1>>log 2>&1"%mpirun
+    return subprocess.Popen( [cmd], shell=True, cwd=run_dir )
+
+def wait_run( run_dir, proc ):
+    return_code = proc.wait()
+    if return_code != 0: raise BaseException("ERROR: gamer in <%s> failed (error code %d). Check <%s>."%(run_dir, return_code, os.path.join(run_dir, "log")))
+    return
+
+def last_snapshot( run_dir ):
+    snapshots = sorted( glob.glob(os.path.join(run_dir, "Data_[0-9][0-9][0-9][0-9][0-9][0-9]")) )
+    if len(snapshots) == 0: raise BaseException("ERROR: Cannot find any snapshot in <%s>."%run_dir)
+    return snapshots[-1]
+
+def setup_restart( run_dir ):
+    """
+    Switch to the parameter file prepared by `setup_restart_parameter()` and link `RESTART` to the last
+    snapshot of the first half.
+    """
+    restart_file = os.path.basename( last_snapshot(run_dir) )
+    os.replace( os.path.join(run_dir, FILE_PARA_REST), os.path.join(run_dir, FILE_PARAMETER) )
+    os.symlink( restart_file, os.path.join(run_dir, "RESTART") )
+    return restart_file
+
+def compare_snapshot( file_a, file_b, file_out, compare_data, tolerance ):
+    """
+    Compare two snapshots patch by patch with GAMER_CompareData.
+
+    The option `-c` is always enabled since the patch order may differ between the two runs.
+    """
+    if not os.path.isfile( compare_data ): raise BaseException("ERROR: Cannot find <%s>. Please compile tool/analysis/gamer_compare_data first."%compare_data)
+
+    cmd = [ compare_data, "-i", file_a, "-j", file_b, "-o", file_out, "-e", str(tolerance), "-c" ]
+    return subprocess.run( cmd ).returncode == 0
+
+def execution( **kwargs ):
+    """
+    Run the continuous and restarted simulations and compare their final snapshots.
+    """
+    nstep     = kwargs["nstep"]
+    nhalf     = nstep // 2
+    work_dir  = os.path.abspath( kwargs["work_dir"] )
+    dir_cont  = os.path.join( work_dir, DIR_CONTINUOUS )
+    dir_rest  = os.path.join( work_dir, DIR_RESTART )
+
+    # 1. Set up the run directories and both parameter sets of the restart run before launching any run
+    setup_run( kwargs["input_dir"], dir_cont, kwargs["executable"], nstep, nhalf )
+    setup_run( kwargs["input_dir"], dir_rest, kwargs["executable"], nhalf, nhalf )
+    setup_restart_parameter( dir_rest, nstep )
+
+    # 2. Run the continuous run and the first half of the restarted run concurrently
+    if not kwargs["quite"]: print("Running <%s> (step 0 -> %d) and <%s> (step 0 -> %d) ..."%(DIR_CONTINUOUS, nstep, DIR_RESTART, nhalf))
+    proc_cont = launch_run( dir_cont, kwargs["mpirun"] )
+    try:
+        proc_rest = launch_run( dir_rest, kwargs["mpirun"] )
+        wait_run( dir_rest, proc_rest )
+
+        # 3. Restart from the last snapshot of the first half and continue to step N
+        restart_file = setup_restart( dir_rest )
+        if not kwargs["quite"]: print("Restarting <%s> from <%s> (step %d -> %d) ..."%(DIR_RESTART, restart_file, nhalf, nstep))
+        proc_rest = launch_run( dir_rest, kwargs["mpirun"] )
+        wait_run( dir_rest, proc_rest )
+    except BaseException:
+        # do not leave the continuous run behind
+        proc_cont.kill()
+        proc_cont.wait()
+        raise
+    wait_run( dir_cont, proc_cont )
+
+    # 4. Compare the final snapshots
+    file_a   = last_snapshot( dir_cont )
+    file_b   = last_snapshot( dir_rest )
+    file_out = os.path.join( work_dir, FILE_RESULT )
+    if not kwargs["quite"]: print("Comparing <%s> and <%s> ..."%(file_a, file_b))
+    if not compare_snapshot( file_a, file_b, file_out, kwargs["compare_data"], kwargs["tolerance"] ):
+        print("FAIL: The restarted run differs from the continuous run. Check <%s>."%file_out)
+        return RETURN_FAIL
+
+    print("PASS: The restarted run matches the continuous run.")
+    return RETURN_SUCCESS
+
+
+
+#====================================================================================================
+# Main
+#====================================================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser( description = "Verify that a restarted run reproduces a continuous run.",
+                                      formatter_class = argparse.RawTextHelpFormatter,
+                                      add_help=False)
+
+    parser.add_argument( "-h", "--help",
+                         action="help", default=argparse.SUPPRESS,
+                         help="Show this help message and exit.\n"
+                       )
+
+    parser.add_argument( "-n", "--nstep",
+                         type=int, required=True,
+                         help="Total number of root-level steps N. The restart happens at step N/2.\n"
+                       )
+
+    parser.add_argument( "-i", "--input_dir",
+                         type=str, default=".",
+                         help="Directory storing the input files [%(default)s].\n"
+                       )
+
+    parser.add_argument( "-x", "--executable",
+                         type=str, default="./gamer",
+                         help="Path to the gamer executable [%(default)s].\n"
+                       )
+
+    parser.add_argument( "-w", "--work_dir",
+                         type=str, default="./RestartEquivalence",
+                         help="Directory to store the two runs [%(default)s].\n"
+                       )
+
+    parser.add_argument( "-m", "--mpirun",
+                         type=str, default="",
+                         help="Command prefix for launching gamer (e.g., \"mpirun -np 2\") [none].\n"
+                       )
+
+    parser.add_argument( "-c", "--compare_data",
+                         type=str, default=COMPARE_DATA,
+                         help="Path to GAMER_CompareData [%(default)s].\n"
+                       )
+
+    parser.add_argument( "-e", "--tolerance",
+                         type=float, default=0.0,
+                         help="Tolerant relative error passed to GAMER_CompareData [%(default)g].\n"
+                       )
+
+    parser.add_argument( "-q", "--quite",
+                         action="store_true",
+                         help="Enable silent mode.\n"
+                       )
+
+    args = vars( parser.parse_args() )
+
+    if args["nstep"] < 2: raise BaseException("ERROR: -n (%d) < 2."%args["nstep"])
+
+    sys.exit( 0 if execution( **args ) else 1 )